@@ -0,0 +1,72 @@
+import argparse
+import statistics
+import time
+
+from scraper.drivers import DriverPool, PageWaiter
+
+"""
+Benchmarks the "default" browser profile against the "lean" one by loading the same
+pages with each and reporting page load time, transferred bytes and browser memory.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_browser_profiles --urls https://www.mobile01.com/ --repeat 5
+"""
+
+NAVIGATION_SCRIPT = """
+var nav = performance.getEntriesByType('navigation')[0];
+var resources = performance.getEntriesByType('resource');
+var transferred = resources.reduce(function (total, r) { return total + (r.transferSize || 0); }, 0);
+return [nav ? nav.loadEventEnd : 0, resources.length, transferred + (nav ? nav.transferSize : 0)];
+"""
+
+
+def bench_profile(profile: str, urls, repeat: int):
+    pool = DriverPool(size=1, profile=profile, max_pages_per_driver=0, max_rss_mb=0)
+    load_times, wall_times, requests, transferred, rss = [], [], [], [], []
+
+    try:
+        with pool.driver() as driver:
+            driver.set_page_load_timeout(30)
+            for _ in range(repeat):
+                for url in urls:
+                    driver.delete_all_cookies()
+                    start = time.perf_counter()
+                    driver.get(url)
+                    PageWaiter(driver, timeout=30).network_idle()
+                    wall_times.append(time.perf_counter() - start)
+
+                    load_ms, request_count, transferred_bytes = driver.execute_script(NAVIGATION_SCRIPT)
+                    load_times.append(load_ms / 1000)
+                    requests.append(request_count)
+                    transferred.append(transferred_bytes / 1024)
+                    rss.append(pool.get_rss_mb(driver))
+    finally:
+        pool.close()
+
+    return {
+        "profile": profile,
+        "load_s": statistics.median(load_times),
+        "ready_s": statistics.median(wall_times),
+        "requests": statistics.median(requests),
+        "kb": statistics.median(transferred),
+        "rss_mb": max(rss),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the default and lean browser profiles.")
+    parser.add_argument("--urls", nargs="+", default=["https://www.mobile01.com/"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--profiles", nargs="+", default=["default", "lean"])
+    args = parser.parse_args()
+
+    results = [bench_profile(profile, args.urls, args.repeat) for profile in args.profiles]
+
+    print(f"\n{'profile':<10}{'load (s)':>10}{'ready (s)':>11}{'requests':>10}{'KB':>10}{'RSS (MB)':>10}")
+    for r in results:
+        print(f"{r['profile']:<10}{r['load_s']:>10.2f}{r['ready_s']:>11.2f}{r['requests']:>10.0f}"
+              f"{r['kb']:>10.0f}{r['rss_mb']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import json
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from scraper.tools.date_parser import parse_date, parse_many, _parse_spec
+
+"""
+Checks the date parser against the correctness corpus (date_corpus.json), then
+compares its speed with the original per-call regex implementation.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_date_parser
+"""
+
+CORPUS_PATH = Path(__file__).parent / "date_corpus.json"
+
+
+def legacy_process_date(date_text):
+    """The implementation this parser replaced, kept for comparison."""
+    date_regex = re.compile(
+        r"(\d+)\s*天前|(\d+)\s*小時前|(\d{4})年(\d{1,2})月(\d{1,2})日"
+    )
+    match = date_regex.search(date_text)
+    if match:
+        if match.group(1):  # Days ago
+            return datetime.now() - timedelta(days=int(match.group(1)))
+        elif match.group(2):  # Hours ago
+            return datetime.now() - timedelta(hours=int(match.group(2)))
+        elif match.group(3):  # Absolute date
+            year, month, day = int(match.group(3)), int(
+                match.group(4)), int(match.group(5))
+            return datetime(year, month, day)
+    return None
+
+
+def safe_legacy_process_date(date_text):
+    # the legacy implementation raises on invalid dates such as 2024年2月30日
+    try:
+        return legacy_process_date(date_text)
+    except ValueError:
+        return None
+
+
+def check_corpus() -> bool:
+    with open(CORPUS_PATH, encoding="utf-8") as file:
+        corpus = json.load(file)
+    now = datetime.fromisoformat(corpus["now"])
+
+    failures = 0
+    for case in corpus["cases"]:
+        expected = datetime.fromisoformat(case["expected"]) if case["expected"] else None
+        parsed = parse_date(case["text"], now=now)
+        if parsed != expected:
+            failures += 1
+            print(f"❌ {case['text']!r}: expected {expected}, got {parsed}")
+
+    print(f"Correctness corpus: {len(corpus['cases']) - failures}/{len(corpus['cases'])} cases passed")
+    return failures == 0
+
+
+def bench(label, func, texts, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(texts)
+    elapsed = time.perf_counter() - start
+    per_item = elapsed / (rounds * len(texts)) * 1e6
+    print(f"{label:<32}{elapsed:>10.3f} s{per_item:>10.2f} µs/date")
+
+
+def main():
+    corpus_ok = check_corpus()
+
+    # a page of snippets, repeating like real result pages do
+    with open(CORPUS_PATH, encoding="utf-8") as file:
+        texts = [case["text"] for case in json.load(file)["cases"] if case["text"]]
+    random.seed(0)
+    page = [random.choice(texts) + " ... 討論內容摘要" * 5 for _ in range(200)]
+    rounds = 200
+
+    print()
+    bench("legacy process_date", lambda t: [safe_legacy_process_date(x) for x in t], page, rounds)
+    _parse_spec.cache_clear()
+    bench("parse_date (per call)", lambda t: [parse_date(x) for x in t], page, rounds)
+    bench("parse_many (per page)", parse_many, page, rounds)
+    print(f"cache: {_parse_spec.cache_info()}")
+
+    sys.exit(0 if corpus_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
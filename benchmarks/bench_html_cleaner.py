@@ -0,0 +1,170 @@
+import argparse
+import gc
+import multiprocessing
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+import psutil
+from bs4 import BeautifulSoup, Doctype
+
+from scraper.html.cleaner import CLEANING_ENGINES, get_cleaner
+
+"""
+Compares the HTML cleaning engines (scraper/html/cleaner.py) on saved pages: checks that
+they produce the same cleaned content, then reports the cleaning time and the peak memory
+of each engine. Peak memory is the RSS growth of a fresh process while it cleans the page
+once (sampled every millisecond), so that the C allocations of lxml are counted as well.
+
+Save the pages to benchmark first, e.g. forum result pages, then run (from the repository root):
+    python -m benchmarks.bench_html_cleaner --save https://www.mobile01.com/googlesearch.php?q=iphone
+    python -m benchmarks.bench_html_cleaner --repeat 20
+
+Without saved pages, a synthetic forum result page is used.
+"""
+
+PAGES_DIR = Path(__file__).parent / "pages"
+
+# the ignored tags of the agents
+IGNORED_TAG_SETS = {
+    "sort": ("script", "footer", "style", "iframe", "a", "meta"),
+    "extract": ("script", "style", "nav", "footer", "meta", "header"),
+}
+
+
+def save_pages(urls, pages_dir: Path):
+    from scraper.tools import HttpFetchTool
+
+    pages_dir.mkdir(parents=True, exist_ok=True)
+    fetch = HttpFetchTool(timeout=20)
+    for index, url in enumerate(urls):
+        html = fetch(url)
+        if not html:
+            print(f"⚠️ Could not fetch {url}")
+            continue
+        path = pages_dir / f"page_{index}.html"
+        path.write_text(html, encoding="utf-8")
+        print(f"Saved {url} -> {path}")
+
+
+def synthetic_page(posts: int = 2000) -> str:
+    random.seed(0)
+    items = []
+    for i in range(posts):
+        items.append(f"""
+        <li class="result">
+            <a href="/topicdetail.php?f=383&amp;t={i}">iPhone 16 開箱心得 第 {i} 篇</a>
+            <span class="date">{random.randint(1, 30)} 天前</span>
+            <p class="summary">   {"使用心得與續航測試 " * random.randint(3, 20)}   </p>
+            <script>track({i});</script>
+        </li>""")
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>搜尋結果</title>
+<style>.result {{ margin: 0 }}</style><script src="/app.js"></script></head>
+<body><header><nav><a href="/">首頁</a></nav></header>
+<ul class="results">{"".join(items)}</ul>
+<footer>© forum</footer></body></html>"""
+
+
+def load_pages(pages_dir: Path):
+    pages = {path.name: path.read_text(encoding="utf-8", errors="replace")
+             for path in sorted(pages_dir.glob("*.html"))}
+    if not pages:
+        print(f"No saved pages in {pages_dir}. Using a synthetic result page.\n")
+        pages = {"synthetic.html": synthetic_page()}
+    return pages
+
+
+def content_signature(cleaned_html: str):
+    """The doctype, the tags with their attributes and the whitespace normalized text of a
+    cleaned page, independent of the serializer (<br> vs <br/>, attribute order). The page
+    is parsed with html.parser, which does not add the html, head and body tags a page lacks."""
+    if not cleaned_html:
+        return (), (), ""
+    soup = BeautifulSoup(cleaned_html, "html.parser")
+    doctypes = tuple(str(item).lower() for item in soup.contents if isinstance(item, Doctype))
+    tags = tuple(
+        (element.name, tuple(sorted(
+            (name, " ".join(value) if isinstance(value, list) else value) for name, value in element.attrs.items())))
+        for element in soup.find_all(True)
+    )
+    text = " ".join(soup.get_text(" ").split())
+    return doctypes, tags, text
+
+
+def _measure_peak(engine: str, html: str, ignored_tags, queue):
+    process = psutil.Process()
+    clean = get_cleaner(engine)
+    clean("<html><body></body></html>", ignored_tags)  # load the engine before the baseline
+    gc.collect()
+    baseline = peak = process.memory_info().rss
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.is_set():
+            peak = max(peak, process.memory_info().rss)
+            time.sleep(0.001)
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    clean(html, ignored_tags)
+    done.set()
+    sampler.join()
+    queue.put((max(peak, process.memory_info().rss) - baseline) / (1024 * 1024))
+
+
+def peak_memory_mb(engine: str, html: str, ignored_tags) -> float:
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_measure_peak, args=(engine, html, ignored_tags, queue))
+    process.start()
+    peak = queue.get()
+    process.join()
+    return peak
+
+
+def bench_page(name: str, html: str, repeat: int) -> bool:
+    print(f"{name} ({len(html) / 1024:.0f} KB)")
+    same_content = True
+    for tag_set, ignored_tags in IGNORED_TAG_SETS.items():
+        outputs = {engine: get_cleaner(engine)(html, ignored_tags) for engine in CLEANING_ENGINES}
+        signatures = {engine: content_signature(output) for engine, output in outputs.items()}
+        if len(set(signatures.values())) > 1:
+            same_content = False
+            print(f"  ❌ [{tag_set}] engines produce different content")
+
+        for engine in CLEANING_ENGINES:
+            clean = get_cleaner(engine)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                clean(html, ignored_tags)
+            per_call_ms = (time.perf_counter() - start) / repeat * 1000
+            peak_mb = peak_memory_mb(engine, html, ignored_tags)
+            print(f"  [{tag_set:<7}] {engine:<5}{per_call_ms:>10.1f} ms/page{peak_mb:>10.1f} MB peak"
+                  f"{len(outputs[engine]) / 1024:>10.0f} KB out")
+    return same_content
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages-dir", type=Path, default=PAGES_DIR)
+    parser.add_argument("--save", nargs="+", metavar="URL", help="fetch and save pages to benchmark")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.save:
+        save_pages(args.save, args.pages_dir)
+
+    all_same = True
+    for name, html in load_pages(args.pages_dir).items():
+        all_same &= bench_page(name, html, args.repeat)
+
+    print("\n✅ Same cleaned content for all engines" if all_same else "\n❌ Engines differ")
+    sys.exit(0 if all_same else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import asyncio
+import statistics
+import time
+
+from utils.llms import LLMClient, OpenAILLM, RetryPolicy
+from utils.llms.stub_server import StubLLMServer
+
+"""
+Exercises the LLM client layer (utils/llms/llm_client.py) against the local stub server:
+sequential vs batched calls, retries on 429/500, hedged requests against slow replies,
+and the requests-per-minute limiter. No API key or network access is needed.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_llm_client
+"""
+
+PROMPTS = [("You answer in JSON.", f"prompt {i}") for i in range(20)]
+
+
+def timed(label: str, function):
+    start = time.perf_counter()
+    result = function()
+    print(f"{label:<40}{time.perf_counter() - start:>8.2f} s")
+    return result
+
+
+def bench_batching():
+    with StubLLMServer(latency=0.2) as server:
+        llm = OpenAILLM(client=LLMClient(base_url=server.url, api_key="stub"), cache=False)
+        timed("20 calls, sequential", lambda: [llm(*prompt) for prompt in PROMPTS])
+        timed("20 calls, batch (8 threads)", lambda: llm.batch(PROMPTS))
+        answers = timed("20 calls, abatch (8 coroutines)", lambda: asyncio.run(llm.abatch(PROMPTS)))
+        assert answers[3] == {"echo": "prompt 3"}
+
+
+def bench_retries():
+    with StubLLMServer(failures=[429, 500, 503]) as server:
+        client = LLMClient(base_url=server.url, api_key="stub", retry_policy=RetryPolicy(base_delay=0.05))
+        llm = OpenAILLM(client=client, cache=False)
+        answer = timed("1 call after 429, 500, 503", lambda: llm(*PROMPTS[0]))
+        print(f"  answer {answer} after {len(server.requests)} requests")
+
+
+def bench_hedging():
+    for hedge_after in (None, 0.3):
+        with StubLLMServer(latency=0.1, slow_every=4, slow_latency=2.0) as server:
+            llm = OpenAILLM(client=LLMClient(base_url=server.url, api_key="stub", hedge_after=hedge_after),
+                            cache=False)
+            latencies = []
+            for prompt in PROMPTS[:12]:
+                start = time.perf_counter()
+                llm(*prompt)
+                latencies.append(time.perf_counter() - start)
+            print(f"{'hedge_after=' + str(hedge_after):<40}"
+                  f"p50 {statistics.median(latencies):.2f} s, max {max(latencies):.2f} s, "
+                  f"{len(server.requests)} requests")
+
+
+def bench_rate_limit():
+    with StubLLMServer() as server:
+        client = LLMClient(base_url=server.url, api_key="stub", requests_per_minute=60)
+        llm = OpenAILLM(client=client, cache=False)
+        # the bucket starts full with 60 requests, the next 5 come at one per second
+        timed("65 calls at 60 requests/minute", lambda: llm.batch(PROMPTS * 3 + PROMPTS[:5]))
+
+
+def main():
+    bench_batching()
+    bench_retries()
+    bench_hedging()
+    bench_rate_limit()
+
+
+if __name__ == "__main__":
+    main()
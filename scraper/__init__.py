@@ -1 +1,3 @@
-from .run_scraper import MarketScraper
\ No newline at end of file
+from .run_scraper import MarketScraper
+from .batch_scraper import scrape_many, ascrape_many
+from .errors import ScraperError, InspectionError
@@ -1,10 +1,13 @@
 from abc import ABC, abstractmethod
-from bs4 import BeautifulSoup
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple
 import html2text
 
 from utils.llms import OpenAILLM
+from utils.metrics import get_metrics
 from scraper.memories import Memory
 from scraper.knowledge import KnowledgeBase
+from scraper.html import clean_html, compress_dom, infer_selectors, check_selectors, parse_html
 
 """
 This class is an abstract base for AI-powered agents that
@@ -12,33 +15,164 @@ inspect HTML. Provides common utilities for cleaning HTML, converting
 HTML to Markdown, and storing knowledge for the HTML Inspection process.
 """
 
+CANDIDATES_INSTRUCTION = """
+Return {count} different candidates, ranked from the most to the least likely to work, in this JSON format,
+where each candidate follows the JSON format above:
+{{
+    "candidates": [<candidate 1>, <candidate 2>, ...]
+}}
+"""
+
+
+@lru_cache(maxsize=32)
+def _clean_html(html_content: str, ignored_tags: tuple | None, engine: str) -> str:
+    return clean_html(html_content, ignored_tags=ignored_tags, engine=engine)
+
+
 class BaseAgent(ABC):
-    def __init__(self, role: str, backstory: str, goal: str, llm_model_name: str, pydantic_format):
+    def __init__(self, role: str, backstory: str, goal: str, llm_model_name: str, pydantic_format,
+                 token_budget: int = 6000, heuristic_candidates: int = 3, llm_candidates: int = 3,
+                 memory_token_budget: int = 1500):
+        self.llm_candidates = llm_candidates
         self.system_prompt = f"{backstory}\n{goal}"
+        if llm_candidates > 1:
+            self.system_prompt += CANDIDATES_INSTRUCTION.format(count=llm_candidates)
         self.llm = OpenAILLM(model_name=llm_model_name, pydantic_format=pydantic_format)
-        self.memory = Memory()
+        self.memory = Memory(token_budget=memory_token_budget,
+                             count_tokens=lambda text: self.llm.get_text_token(text))
         self.knowledge_base = KnowledgeBase()
         self.ignored_tags = None
+        self.cleaning_engine = "lxml"  # see scraper/html/cleaner.py
+        self.token_budget = token_budget
+        self.dom_focus = "extract"  # see scraper/html/dom_compressor.py
+        self._prompt_html = (None, None)
+        self.heuristic_candidates = heuristic_candidates  # 0 goes straight to the LLM
     
     def clean_html(self, html_content: str) -> str:
-        """Removes irrelevant tags, whitespace, and duplicate lines from HTML content."""
-        soup = BeautifulSoup(html_content, "html.parser")
-        for element in soup.find_all(self.ignored_tags):  # irrelevant tags for search
-            element.decompose()
-
-        cleaned_content = str(soup)
-
-        # remove unecessary lines
-        lines = cleaned_content.split("\n")
-        stripped_lines = [line.strip() for line in lines]
-        non_empty_lines = [line for line in stripped_lines if line]
-        seen = set()
-        deduped_lines = [
-            line for line in non_empty_lines if not (line in seen or seen.add(line))
-        ]
-        final_cleaned_content = "".join(deduped_lines)
-
-        return final_cleaned_content
+        """Removes irrelevant tags, whitespace, and duplicate lines from HTML content.
+        Memoized, since the agents and their retries clean the same snapshot of a page."""
+        return _clean_html(
+            html_content, tuple(self.ignored_tags) if self.ignored_tags else None, self.cleaning_engine)
+
+    def prompt_html(self, html_content: str) -> str:
+        """Cleaned HTML compressed to the token budget of the agent, around the regions of its dom_focus."""
+        cleaned_html = self.clean_html(html_content)
+        if self._prompt_html[0] is not cleaned_html:
+            compressed_html = compress_dom(cleaned_html, token_budget=self.token_budget,
+                                           focus=self.dom_focus,
+                                           count_tokens=lambda text: self.llm.get_text_token(text))
+            self._prompt_html = (cleaned_html, compressed_html)
+        return self._prompt_html[1]
+
+    def ask_candidates(self, user_prompt: str) -> List[Dict]:
+        """Ask the LLM for its ranked candidate selectors (a single selector set is one candidate)."""
+        with get_metrics().span("agent.ask_llm", focus=self.dom_focus) as span:
+            output = self.llm(system_prompt=self.system_prompt, user_prompt=user_prompt)
+            candidates = output.get("candidates", [output]) if isinstance(output, dict) else []
+            candidates = [candidate for candidate in candidates if isinstance(candidate, dict)][:max(1, self.llm_candidates)]
+            span.set(candidates=len(candidates))
+        return candidates
+
+    def check_offline(self, html_content: str, candidates: List[Dict], source: str) -> Tuple[List[Dict], List[Tuple]]:
+        """Check the candidates on the captured HTML of the page, without the browser
+        (scraper/html/selector_validator.py). Returns the candidates that pass and the
+        (candidate, error) failures."""
+        try:
+            root = parse_html(html_content)
+        except Exception as e:
+            print(f"⚠️ Could not parse the page for the offline check: {e}")
+            return candidates, []
+
+        passed, failures = [], []
+        for rank, selectors in enumerate(candidates, start=1):
+            report = check_selectors(root, self.dom_focus, selectors)
+            if report["ok"]:
+                print(f"🔬 {source} candidate {rank} passes the offline check in {report['milliseconds']} ms, "
+                      f"matches: {report['matches']}, samples: {report['samples']}")
+                passed.append(selectors)
+            else:
+                print(f"⚠️ {source} candidate {rank} fails the offline check: {report['error']}")
+                failures.append((selectors, report["error"]))
+        return passed, failures
+
+    def reject_known_failures(self, candidates: List[Dict], source: str) -> List[Dict]:
+        """Drop the duplicate candidates and those that already failed for the website."""
+        fresh = []
+        for rank, selectors in enumerate(candidates, start=1):
+            known_error = self.memory.known_failure(selectors)
+            if known_error:
+                print(f"⏭️ {source} candidate {rank} is known to fail ({known_error}), skipped")
+            elif selectors not in fresh:
+                fresh.append(selectors)
+        return fresh
+
+    def validate_candidates(self, candidates: List[Dict], validate: Callable[[Dict], str],
+                            reset: Callable[[], None] = None, source: str = "LLM",
+                            html_content: str = None) -> Dict | None:
+        """Validate ranked candidate selectors, best first, and return the first that works.
+        Candidates known to fail on the page of the website are dropped. With the captured
+        html_content of the page, the others are first checked offline, and only those that pass
+        are confirmed in the browser. validate returns the error message of a candidate in the
+        browser ("" when it works); reset restores the page between browser checks. The failed
+        candidates go into memory together, for the next LLM prompt; only the browser failures
+        are kept for the next runs. The outcome of each candidate and of the round
+        are counted in the agent_candidates and agent_rounds metrics (a failed LLM round is a retry)."""
+        metrics = get_metrics()
+        with metrics.span("agent.validate", focus=self.dom_focus, source=source) as span:
+            self.memory.observe_page(html_content)
+            fresh_candidates = self.reject_known_failures(candidates, source)
+            metrics.increment("agent_candidates", len(candidates) - len(fresh_candidates),
+                              focus=self.dom_focus, source=source, result="skipped")
+            candidates, failures = fresh_candidates, []
+            if html_content:
+                candidates, offline_failures = self.check_offline(html_content, candidates, source)
+                metrics.increment("agent_candidates", len(offline_failures),
+                                  focus=self.dom_focus, source=source, result="failed_offline")
+                # the captured HTML may differ from the live page: not proof enough for the next runs
+                for failed_selectors, error_message in offline_failures:
+                    self.memory.record_failure(failed_selectors, error_message, persist=False)
+
+            for rank, selectors in enumerate(candidates, start=1):
+                if rank > 1 and reset:
+                    reset()
+                print(f"\n🧪 Confirming {source} candidate {rank}/{len(candidates)} with Selenium: {selectors}")
+                with metrics.span("agent.confirm", focus=self.dom_focus, rank=rank):
+                    error_message = validate(selectors)
+                if not error_message:
+                    print(f"🎉 {source} candidate {rank} works")
+                    metrics.increment("agent_candidates", focus=self.dom_focus, source=source, result="passed")
+                    break
+                print(f"⚠️ {source} candidate {rank} failed")
+                metrics.increment("agent_candidates", focus=self.dom_focus, source=source, result="failed_live")
+                failures.append((selectors, error_message))
+            else:
+                selectors = None
+                if candidates and reset:
+                    reset()
+
+            for failed_selectors, error_message in failures:
+                self.memory.record_failure(failed_selectors, error_message)
+            success = selectors is not None
+            span.set(success=success)
+            metrics.increment("agent_rounds", focus=self.dom_focus, source=source,
+                              result="success" if success else "failure")
+        return selectors
+
+    def try_heuristics(self, html_content: str, validate: Callable[[Dict], str],
+                       reset: Callable[[], None] = None) -> Dict | None:
+        """Try the selectors inferred from the page structure for the dom_focus of the agent
+        (scraper/html/selector_heuristics.py) before asking the LLM."""
+        self.memory.observe_page(html_content)
+        if not self.heuristic_candidates:
+            return None
+        candidates = infer_selectors(html_content, self.dom_focus, limit=self.heuristic_candidates)
+        selectors = self.validate_candidates(
+            candidates, validate, reset, source="Heuristic", html_content=html_content)
+        if selectors:
+            print("✅ No LLM call needed")
+        elif candidates:
+            print("\n⚠️ No heuristic selectors work. Asking the LLM...")
+        return selectors
 
     def html_to_markdown(self, html_content: str) -> str:
         cleaned_html = self.clean_html(html_content)
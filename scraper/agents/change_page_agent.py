@@ -1,6 +1,8 @@
 from scraper.agents.base_agent import BaseAgent
 from scraper.tools import SeleniumExtractPostsTool, SeleniumExtractHtmlTool
+from scraper.tools.page_url_template import detect_page_url_template
 from string import Template
+from typing import Dict, Tuple
 
 ROLE = "HTML expert"
 BACKSTORY = f"""
@@ -47,7 +49,7 @@ ${cleaned_html}
 
 
 class ChangePageAgent(BaseAgent):
-    def __init__(self, llm_model_name="gpt-4o", max_retry_times: int = 3):
+    def __init__(self, llm_model_name="gpt-4o", max_retry_times: int = 3, driver_pool=None):
         BaseAgent.__init__(
             self, role=ROLE, backstory=BACKSTORY,
             goal=GOAL,
@@ -58,16 +60,71 @@ class ChangePageAgent(BaseAgent):
         self.ignored_tags = ['script', 'style',
                              'nav', 'footer', 'meta', 'header']
 
-        self.extract_html_tool = SeleniumExtractHtmlTool()
+        self.dom_focus = "pager"
+        # the rendered page: the static HTML may lack the parts rendered by scripts
+        self.extract_html_tool = SeleniumExtractHtmlTool(driver_pool=driver_pool)
+
+    def change_pages(self, driver, selectors) -> Tuple[str, Dict]:
+        """Change to page 2 with the selectors, and to page 3 when there is one, recording the
+        URL of each page. Returns the error message ("" on success) and the page URLs."""
+        extract_posts_tool = SeleniumExtractPostsTool(selectors=selectors)
+        page_urls = {1: driver.current_url}
+        for page_num in (2, 3):
+            success, error_message = extract_posts_tool.change_page(
+                page_num=page_num,
+                driver=driver  # use the shared driver with sort results
+            )
+            if error_message != "":
+                # page 3 only helps to detect the page URLs: the results may have two pages
+                return ("" if page_num == 3 else str(error_message)), page_urls
+            page_urls[page_num] = driver.current_url
+        return "", page_urls
+
+    def save_selectors(self, url: str, selectors, page_urls: Dict):
+        print(
+            "🎉\n Changing one page is successfuly completed! These selectors are correct")
+
+        # If the pages are addressable by URL, they can later be fetched concurrently.
+        # Otherwise, a template saved by an earlier inspection no longer applies and is removed
+        page_url_template = detect_page_url_template(page_urls)
+        if page_url_template:
+            print(f"\n🔗 Result pages are addressable by URL: {page_url_template}")
+        selectors["page_url_template"] = page_url_template
+
+        knowledge_structure = {
+            "extract_posts_section": selectors
+
+        }
+        self.knowledge_base.save_knowledge(
+            new_url=url,  knowledge_dict=knowledge_structure
+        )
+        print("\n✅ Saved the selectors into knowledge")
 
     def learn(self, driver, result_page_url: str, url: str):
         """Learn the CSS selectors to change page."""
+        # remember the failures of this website across runs
+        self.memory.bind(site=url, focus=self.dom_focus)
         success = False
         retries = 0
+
+        visited_pages = {}
+
+        def validate(selectors) -> str:
+            error_message, visited_pages["urls"] = self.change_pages(driver, selectors)
+            return error_message
+
+        # Try the selectors inferred from the page structure first
+        selectors = self.try_heuristics(
+            self.extract_html_tool(url=result_page_url, driver=driver), validate,
+            reset=lambda: driver.get(result_page_url))
+        if selectors:
+            self.save_selectors(url, selectors, visited_pages["urls"])
+            return True
+
         while retries < self.max_retry_times:
             print(f"\n Learning for the {retries+1} time..")
-            html_content = self.extract_html_tool(url=result_page_url)
-            cleaned_html = self.clean_html(html_content)
+            html_content = self.extract_html_tool(url=result_page_url, driver=driver)
+            cleaned_html = self.prompt_html(html_content)
 
             # Retrieve the previous failed experiences
             failed_experiences = self.memory.export_memory()
@@ -75,41 +132,21 @@ class ChangePageAgent(BaseAgent):
             user_prompt = user_prompt_template.substitute(failed_experiences=failed_experiences,
                                                           cleaned_html=cleaned_html)
 
-            selectors = self.llm(
-                system_prompt=self.system_prompt, user_prompt=user_prompt)
-            print("\n🤖 ChangePage Agent output: ", selectors)
+            candidates = self.ask_candidates(user_prompt)
+            print("\n🤖 ChangePage Agent output: ", candidates)
 
-            # Initialize the tool for changing page
+            # Change a few pages with each candidate, best first, from the first result page
             print("\nTesting the selectors with Selenium...")
-            extract_posts_tool = SeleniumExtractPostsTool(selectors=selectors)
-            # Change a few pages
-            for times in range(2):
-                success, error_message = extract_posts_tool.change_page(
-                    page_num=1 + times,
-                    driver=driver  # use the shared driver with sort results
-                )
-
-            if error_message == "":
-                print(
-                    "🎉\n Changing one page is successfuly completed! These selectors are correct")
-
-                knowledge_structure = {
-                    "extract_posts_section": selectors
+            selectors = self.validate_candidates(
+                candidates, validate, reset=lambda: driver.get(result_page_url), html_content=html_content)
 
-                }
-                self.knowledge_base.save_knowledge(
-                    new_url=url,  knowledge_dict=knowledge_structure
-                )
-                print("\n✅ Saved the selectors into knowledge")
+            if selectors:
+                self.save_selectors(url, selectors, visited_pages["urls"])
                 success = True
                 break
             # If Selenium fails to change page
             else:
                 print("\n⚠️ The selectors are incorrect")
-                # Save the failed result to memory
-                next_page_button = selectors["next_page_button"]
-                failed_memory = f"next_page_button: {next_page_button}"
-                self.memory.append_memory(failed_memory=failed_memory)
                 retries += 1
                 print(
                     f"\nRetrying... Attempt {retries}/{self.max_retry_times} reties")
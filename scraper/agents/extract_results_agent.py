@@ -55,7 +55,7 @@ ${cleaned_html}
 
 
 class ExtractResultsAgent(BaseAgent):
-    def __init__(self, llm_model_name="gpt-4o", max_retry_times: int = 3):
+    def __init__(self, llm_model_name="gpt-4o", max_retry_times: int = 3, driver_pool=None):
         BaseAgent.__init__(
             self, role=ROLE, backstory=BACKSTORY,
             goal=GOAL,
@@ -66,16 +66,51 @@ class ExtractResultsAgent(BaseAgent):
         self.ignored_tags = ['script', 'style',
                              'nav', 'footer', 'meta', 'header']
 
-        self.extract_html_tool = SeleniumExtractHtmlTool()
+        self.dom_focus = "extract"
+        # the rendered page: the static HTML may lack the parts rendered by scripts
+        self.extract_html_tool = SeleniumExtractHtmlTool(driver_pool=driver_pool)
+
+    def extract(self, driver, selectors) -> str:
+        """Extract the first post with the selectors. Returns the error message, "" on success."""
+        extract_posts_tool = SeleniumExtractPostsTool(selectors=selectors)
+        success, error_message = extract_posts_tool.extract_page_one_url(
+            driver=driver  # use the shared driver with sort results,
+        )
+        return error_message
+
+    def save_selectors(self, url: str, selectors):
+        print(
+            "🎉\n Extracting one URL is successfuly completed! These selectors are correct")
+
+        knowledge_structure = {
+            "extract_posts_section": selectors
+
+        }
+        self.knowledge_base.save_knowledge(
+            new_url=url,  knowledge_dict=knowledge_structure
+        )
+        print("\n✅ Saved the selectors into knowledge")
 
     def learn(self, driver, result_page_url: str, url: str):
         """Learn the CSS selectors for extracting blog posts."""
+        # remember the failures of this website across runs
+        self.memory.bind(site=url, focus=self.dom_focus)
         success = False
         retries = 0
+
+        # Try the selectors inferred from the page structure first
+        selectors = self.try_heuristics(
+            self.extract_html_tool(url=result_page_url, driver=driver),
+            validate=lambda selectors: self.extract(driver, selectors),
+        )
+        if selectors:
+            self.save_selectors(url, selectors)
+            return True
+
         while retries < self.max_retry_times:
             print(f"\n Learning for the {retries+1} time..")
-            html_content = self.extract_html_tool(url=result_page_url)
-            cleaned_html = self.clean_html(html_content)
+            html_content = self.extract_html_tool(url=result_page_url, driver=driver)
+            cleaned_html = self.prompt_html(html_content)
 
             # Retrieve the previous failed experiences
             failed_experiences = self.memory.export_memory()
@@ -83,41 +118,20 @@ class ExtractResultsAgent(BaseAgent):
             user_prompt = user_prompt_template.substitute(failed_experiences=failed_experiences,
                                                           cleaned_html=cleaned_html)
 
-            selectors = self.llm(
-                system_prompt=self.system_prompt, user_prompt=user_prompt)
-            print("\n🤖 ExtractResults Agent output: ", selectors)
-
+            candidates = self.ask_candidates(user_prompt)
+            print("\n🤖 ExtractResults Agent output: ", candidates)
 
+            # Extracting does not change the page, so the candidates need no reset in between
             print("\nTesting the selectors with Selenium...")
-            extract_posts_tool = SeleniumExtractPostsTool(selectors=selectors)
-            
-            success, error_message = extract_posts_tool.extract_page_one_url(
-                driver=driver  # use the shared driver with sort results,
-            )
-
-            if error_message == "":
-                print(
-                    "🎉\n Extracting one URL is successfuly completed! These selectors are correct")
-
-                knowledge_structure = {
-                    "extract_posts_section": selectors
+            selectors = self.validate_candidates(
+                candidates, validate=lambda selectors: self.extract(driver, selectors), html_content=html_content)
 
-                }
-                self.knowledge_base.save_knowledge(
-                    new_url=url,  knowledge_dict=knowledge_structure
-                )
-                print("\n✅ Saved the selectors into knowledge")
+            if selectors:
+                self.save_selectors(url, selectors)
                 success = True
                 break
             else:
-                blog_item = selectors.get("blog_item", {})
-                blog_url = selectors.get("blog_url", {})
-                blog_date = selectors.get("blog_date", {})
                 print("\n⚠️ The selectors are incorrect")
-                # save the failed result to memory
-                failed_memory = f"blog_item: {blog_item}, blog_date: {
-                    blog_date}, blog_url: {blog_url}, error_message: {error_message}"
-                self.memory.append_memory(failed_memory=failed_memory)
                 retries += 1
                 print(
                     f"\nRetrying... Attempt {retries}/{self.max_retry_times} reties")
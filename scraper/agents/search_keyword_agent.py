@@ -1,4 +1,5 @@
 from string import Template
+from typing import Tuple
 
 from scraper.agents.base_agent import BaseAgent
 from scraper.tools import SeleniumExtractHtmlTool, SeleniumSearchKeywordTool
@@ -52,7 +53,7 @@ ${cleaned_html}
 
 
 class SearchKeywordAgent(BaseAgent):
-    def __init__(self, llm_model_name: str = "gpt-4o", max_retry_times: int = 3):
+    def __init__(self, llm_model_name: str = "gpt-4o", max_retry_times: int = 3, driver_pool=None):
         BaseAgent.__init__(
             self,
             role=ROLE,
@@ -72,64 +73,81 @@ class SearchKeywordAgent(BaseAgent):
             "article",
             "section",
         ]
-        self.extract_html_tool = SeleniumExtractHtmlTool()
+        self.dom_focus = "search"
+        # the rendered page: the static HTML may lack the parts rendered by scripts
+        self.extract_html_tool = SeleniumExtractHtmlTool(driver_pool=driver_pool)
+
+    def search(self, driver, url: str, keyword: str, selectors) -> Tuple[str | None, str]:
+        """Search the keyword with the selectors. Returns the result page URL and the error message."""
+        self.search_keyword_tool = SeleniumSearchKeywordTool(selectors)
+        result_page_url, error_message = self.search_keyword_tool(
+            driver=driver,
+            keyword=keyword,
+        )
+        if result_page_url and (error_message == "") and (result_page_url != url):
+            return result_page_url, ""
+        return result_page_url, error_message or "The page did not change after the search"
+
+    def save_selectors(self, url: str, selectors):
+        print(
+            "🎉\n Search is successfuly completed! These selectors are correct")
+        knowledge_structure = {
+            "search_section": selectors
+        }
+        self.knowledge_base.save_knowledge(
+            new_url=url, knowledge_dict=knowledge_structure
+        )
+        print("\n✅ Saved the selectors into knowledge")
 
     def learn(self, driver, url: str, keyword: str):
+        # remember the failures of this website across runs
+        self.memory.bind(site=url, focus=self.dom_focus)
         success = False
         retries = 0
+        result_page_url = None
+
+        searched_urls = []
+
+        def validate(selectors) -> str:
+            searched_url, error_message = self.search(driver, url, keyword, selectors)
+            searched_urls.append(searched_url)
+            return str(error_message)
+
+        # Try the selectors inferred from the page structure first
+        selectors = self.try_heuristics(
+            self.extract_html_tool(url=url, driver=driver), validate, reset=lambda: driver.get(url))
+        if selectors:
+            self.save_selectors(url, selectors)
+            return True, searched_urls[-1]
+
         while retries < self.max_retry_times:
             print(f"\n Learning for the {retries+1} time..")
             # Fetch and clean HTML content
-            html_content = self.extract_html_tool(url=url)
-            cleaned_html = self.clean_html(html_content)
+            html_content = self.extract_html_tool(url=url, driver=driver)
+            cleaned_html = self.prompt_html(html_content)
 
             # Retrieve the previous failed experiences
             failed_experiences = self.memory.export_memory()
 
-            # Locate CSS selectors and values with LLM
+            # Locate ranked candidate CSS selectors and values with LLM
             user_prompt = user_prompt_template.substitute(
                 cleaned_html=cleaned_html, failed_experiences=failed_experiences
             )
-            selectors = self.llm(
-                system_prompt=self.system_prompt, user_prompt=user_prompt
-            )
-            print("\n🤖 Search Agent output: ", selectors)
-
-           
-            selector_type = selectors["search_bar"]["selector"]
-            selector_value = selectors["search_bar"]["value"]
-            print(
-                f"\n 🤖 Identified selector type: {selector_type}")
-            print(
-                f"\n 🤖 Identified selector value: {selector_value}")
+            candidates = self.ask_candidates(user_prompt)
+            print("\n🤖 Search Agent output: ", candidates)
 
-            # Perform search
+            # Perform the search with each candidate, best first
             print("\nTesting the selectors with Selenium...")
-            self.search_keyword_tool = SeleniumSearchKeywordTool(selectors)
-            result_page_url, error_message = self.search_keyword_tool(
-                driver=driver,
-                keyword=keyword,
-            )
-            if result_page_url and (error_message == "") and (result_page_url != url):
+            selectors = self.validate_candidates(
+                candidates, validate, reset=lambda: driver.get(url), html_content=html_content)
+            if selectors:
                 # save the successful result to knowledge base
-                print(
-                    "🎉\n Search is successfuly completed! These selectors are correct")
-
-                knowledge_structure = {
-                    "search_section": selectors
-                }
-                self.knowledge_base.save_knowledge(
-                    new_url=url, knowledge_dict=knowledge_structure
-                )
-                print("\n✅ Saved the selectors into knowledge")
+                self.save_selectors(url, selectors)
                 success = True
+                result_page_url = searched_urls[-1]
                 break
             else:
                 print("⚠️ The selectors are incorrect")
-                # save the failed result to memory
-                failed_memory = f"selector_type: {selector_type}, selector_value: {
-                    selector_value}, error_message: {error_message}"
-                self.memory.append_memory(failed_memory=failed_memory)
                 retries += 1
                 print(
                     f"\nRetrying... Attempt {retries}/{self.max_retry_times} reties")
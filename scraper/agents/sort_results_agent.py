@@ -55,7 +55,7 @@ ${cleaned_html}
 
 
 class SortResultsAgent(BaseAgent):
-    def __init__(self, llm_model_name: str = "gpt-4o", max_retry_times: int = 3):
+    def __init__(self, llm_model_name: str = "gpt-4o", max_retry_times: int = 3, driver_pool=None):
         BaseAgent.__init__(
             self,
             role=ROLE,
@@ -74,72 +74,80 @@ class SortResultsAgent(BaseAgent):
             "meta"
         ]
 
-        self.extract_html_tool = SeleniumExtractHtmlTool()
+        self.dom_focus = "sort"
+        # the rendered page: the static HTML may lack the parts rendered by scripts
+        self.extract_html_tool = SeleniumExtractHtmlTool(driver_pool=driver_pool)
+
+    def sort(self, driver, selectors) -> str:
+        """Sort the results with the selectors. Returns the error message, "" on success."""
+        sort_results_tool = SeleniumSortResultsTool(selectors)
+        success, error_message = sort_results_tool(
+            driver=driver
+        )
+        if success == True and error_message == "":
+            return ""
+        return str(error_message) or "The sort option was not selected"
+
+    def save_selectors(self, url: str, selectors):
+        print(
+            "🎉\nSort is successfuly completed! These selectors are correct")
+
+        # save the successful result to knowledge base
+        knowledge_structure = {
+            "sort_section": selectors
+        }
+
+        self.knowledge_base.save_knowledge(
+            new_url=url, knowledge_dict=knowledge_structure
+        )
+        print("\n✅ Saved the selectors into knowledge")
 
     def learn(self, driver,  result_page_url: str, url: str):
+        # remember the failures of this website across runs
+        self.memory.bind(site=url, focus=self.dom_focus)
         success = False
         retries = 0
+
+        # Try the selectors inferred from the page structure first
+        selectors = self.try_heuristics(
+            self.extract_html_tool(url=result_page_url, driver=driver),
+            validate=lambda selectors: self.sort(driver, selectors),
+            reset=lambda: driver.get(result_page_url),
+        )
+        if selectors:
+            self.save_selectors(url, selectors)
+            return True
+
         while retries < self.max_retry_times:
             print(f"\n Learning for the {retries+1} time...")
             # Fetch and clean HTML content
-            html_content = self.extract_html_tool(url=result_page_url)
-            cleaned_html = self.clean_html(html_content)
+            html_content = self.extract_html_tool(url=result_page_url, driver=driver)
+            cleaned_html = self.prompt_html(html_content)
 
             # Retrieve the previous failed experiences
             failed_experiences = self.memory.export_memory()
 
-            # Locate CSS selectors and values with LLM
+            # Locate ranked candidate CSS selectors and values with LLM
             user_prompt = user_prompt_template.substitute(
                 cleaned_html=cleaned_html, failed_experiences=failed_experiences
             )
-            selectors = self.llm(
-                system_prompt=self.system_prompt, user_prompt=user_prompt
-            )
-            print("\n🤖 Sort Agent output: ", selectors)
-
-            dropdown_info = selectors.get("sort_dropdown", {})
-            dropdown_selector = dropdown_info.get("selector")
-            dropdown_value = dropdown_info.get("value")
-            sort_option_info = selectors.get("sort_date_option", {})
-            sort_option_selector = sort_option_info.get("selector")
-            sort_option_value = sort_option_info.get("value")
+            candidates = self.ask_candidates(user_prompt)
+            print("\n🤖 Sort Agent output: ", candidates)
 
-            print(
-                f"\n 🤖 Identified dropdown selector and value: {dropdown_selector} {dropdown_value}")
-            print(
-                f"\n 🤖 Identified sort option selector and value: {sort_option_selector}, {sort_option_value}")
-
-            # Sort results
+            # Sort results with each candidate, best first
             print("\nTesting the selectors with Selenium...")
-            sort_results_tool = SeleniumSortResultsTool(selectors)
-            success, error_message = sort_results_tool(
-                driver=driver
+            selectors = self.validate_candidates(
+                candidates,
+                validate=lambda selectors: self.sort(driver, selectors),
+                reset=lambda: driver.get(result_page_url),
+                html_content=html_content,
             )
-
-            # If error message is empty and the selected_option is true
-            if success == True and error_message == "":
-                print(
-                    "🎉\nSort is successfuly completed! These selectors are correct")
-
-                # save the successful result to knowledge base
-                knowledge_structure = {
-                    "sort_section": selectors
-                }
-                
-                self.knowledge_base.save_knowledge(
-                    new_url=url, knowledge_dict=knowledge_structure
-                )
-                print("\n✅ Saved the selectors into knowledge")
-                
+            if selectors:
+                self.save_selectors(url, selectors)
+                success = True
                 break
             else:
-                # save the failed result to memory
                 print("\n⚠️ The selectors are incorrect")
-                failed_memory = f"""
-                        dropdown_selector: {dropdown_selector}, dropdown_value: {dropdown_value},
-                        sort_option_selector: {sort_option_selector}, sort_option_value: {sort_option_value}
-                        """
-                self.memory.append_memory(failed_memory=failed_memory)
                 retries += 1
                 print(
                     f"\n Retrying... Attempt {retries}/{self.max_retry_times} reties")
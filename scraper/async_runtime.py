@@ -0,0 +1,35 @@
+import asyncio
+import atexit
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+"""
+Shared bounded executor for the blocking work of the async pipeline (Selenium calls,
+knowledge and checkpoint file I/O). Every await of run_blocking takes one of its threads,
+so the number of max_workers caps how many browsers are driven at the same time, no
+matter how many scrape jobs are interleaved on the event loop.
+"""
+
+_default_executor = None
+_default_executor_lock = threading.Lock()
+
+
+def get_blocking_executor(max_workers: int = 8) -> ThreadPoolExecutor:
+    """Process-wide executor. max_workers only takes effect on the first call."""
+    global _default_executor
+    with _default_executor_lock:
+        if _default_executor is None:
+            _default_executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="scraper-blocking")
+            atexit.register(_default_executor.shutdown, wait=False)
+        return _default_executor
+
+
+async def run_blocking(function, *args, **kwargs):
+    """Await a blocking call on the shared executor. The call runs in a copy of the current
+    context, like asyncio.to_thread, so its metric spans nest under the span of the caller."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_blocking_executor(), partial(context.run, function, *args, **kwargs))
@@ -0,0 +1,179 @@
+import asyncio
+import multiprocessing
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Tuple
+
+from scraper.knowledge import KnowledgeBase
+
+"""
+Runs many (home_url, keyword) scrape jobs across a pool of worker processes. Each worker
+owns its own browser(s); the knowledge of every website is loaded once in the parent
+process and handed to the workers read-only. A failed job is reported in its result
+instead of stopping the batch.
+ascrape_many is the asyncio counterpart: it interleaves the jobs on the running event
+loop of this process, with the browsers driven from the shared bounded executor.
+"""
+
+
+def _run_job(home_url: str, keyword: str, time_range_days: int, knowledge: Dict | None,
+             browser_profile: str, incremental: bool) -> List[str]:
+    # imported here so that spawned workers build their own driver pool
+    from scraper.drivers import get_driver_pool
+    from scraper.run_scraper import MarketScraper
+
+    scraper = MarketScraper(home_url=home_url, keyword=keyword,
+                            driver_pool=get_driver_pool(profile=browser_profile))
+    return scraper.scrape(time_range_days=time_range_days, knowledge=knowledge, incremental=incremental)
+
+
+def _job_result(home_url: str, keyword: str, posts_urls=None, error: str = None) -> Dict:
+    return {
+        "home_url": home_url,
+        "keyword": keyword,
+        "posts_urls": posts_urls,
+        "success": error is None,
+        "error": error,
+    }
+
+
+def _run_batch(executor, jobs: List[Tuple[int, str, str]], time_range_days: int,
+               knowledge_by_site: Dict, browser_profile: str, incremental: bool, results: List):
+    futures = {
+        executor.submit(_run_job, home_url, keyword, time_range_days,
+                        knowledge_by_site.get(home_url), browser_profile, incremental):
+            (index, home_url, keyword)
+        for index, home_url, keyword in jobs
+    }
+    for future in as_completed(futures):
+        index, home_url, keyword = futures[future]
+        try:
+            results[index] = _job_result(home_url, keyword, posts_urls=future.result())
+            print(f"✅ Finished job: {home_url} | {keyword}")
+        except Exception as e:
+            error = "".join(traceback.format_exception_only(type(e), e)).strip()
+            results[index] = _job_result(home_url, keyword, error=error)
+            print(f"⚠️ Job failed: {home_url} | {keyword}: {error}")
+
+
+def _split_new_sites(jobs: List[Tuple[int, str, str]], knowledge_by_site: Dict):
+    """Websites without knowledge are inspected by their first job only, so that the
+    agents do not learn the same website in several workers at the same time"""
+    first_jobs, other_jobs, inspected_sites = [], [], set()
+    for job in jobs:
+        home_url = job[1]
+        if knowledge_by_site[home_url] is None and home_url not in inspected_sites:
+            inspected_sites.add(home_url)
+            first_jobs.append(job)
+        else:
+            other_jobs.append(job)
+    return first_jobs, other_jobs, inspected_sites
+
+
+def scrape_many(jobs: Iterable[Tuple[str, str]], workers: int = 2, time_range_days: int = 3,
+                browser_profile: str = "lean", incremental: bool = False) -> List[Dict]:
+    """Scrape every (home_url, keyword) job and return one result dict per job, in the input order.
+    Workers launch their browsers with browser_profile ("lean" runs headless and blocks heavy resources).
+    With incremental=True, each job only returns the posts not collected by its previous scrapes."""
+    jobs = [(index, home_url, keyword) for index, (home_url, keyword) in enumerate(jobs)]
+    results = [None] * len(jobs)
+
+    # Load the knowledge of every website once, read-only for the workers
+    knowledge_by_site = {}
+    for _, home_url, _ in jobs:
+        if home_url not in knowledge_by_site:
+            knowledge_by_site[home_url] = KnowledgeBase(home_url).search_knowledge()
+
+    first_jobs, other_jobs, inspected_sites = _split_new_sites(jobs, knowledge_by_site)
+
+    # spawn, so that workers never inherit a parent's browser sessions
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        if first_jobs:
+            print(f"\n🔍 Inspecting {len(first_jobs)} new website(s) before the rest of the batch...")
+            _run_batch(executor, first_jobs, time_range_days, knowledge_by_site, browser_profile, incremental, results)
+            for home_url in inspected_sites:
+                knowledge_by_site[home_url] = KnowledgeBase(home_url).search_knowledge()
+
+            # Do not inspect a website again for each of its remaining jobs
+            remaining_jobs = []
+            for index, home_url, keyword in other_jobs:
+                if knowledge_by_site[home_url] is None:
+                    results[index] = _job_result(
+                        home_url, keyword, error=f"Skipped: HTML inspection failed for {home_url}")
+                else:
+                    remaining_jobs.append((index, home_url, keyword))
+            other_jobs = remaining_jobs
+
+        _run_batch(executor, other_jobs, time_range_days, knowledge_by_site, browser_profile, incremental, results)
+
+    failed = sum(1 for result in results if not result["success"])
+    print(f"\n🎉 Batch completed: {len(results) - failed} succeeded, {failed} failed.")
+    return results
+
+
+async def _arun_batch(jobs: List[Tuple[int, str, str]], semaphore: asyncio.Semaphore, driver_pool,
+                      time_range_days: int, knowledge_by_site: Dict, incremental: bool, results: List):
+    from scraper.run_scraper import MarketScraper
+
+    async def run(index, home_url, keyword):
+        async with semaphore:
+            scraper = MarketScraper(home_url=home_url, keyword=keyword, driver_pool=driver_pool)
+            try:
+                posts_urls = await scraper.ascrape(time_range_days=time_range_days,
+                                                   knowledge=knowledge_by_site.get(home_url),
+                                                   incremental=incremental)
+                results[index] = _job_result(home_url, keyword, posts_urls=posts_urls)
+                print(f"✅ Finished job: {home_url} | {keyword}")
+            except Exception as e:
+                error = "".join(traceback.format_exception_only(type(e), e)).strip()
+                results[index] = _job_result(home_url, keyword, error=error)
+                print(f"⚠️ Job failed: {home_url} | {keyword}: {error}")
+
+    await asyncio.gather(*(run(*job) for job in jobs))
+
+
+async def ascrape_many(jobs: Iterable[Tuple[str, str]], concurrency: int = 4, time_range_days: int = 3,
+                       browser_profile: str = "lean", incremental: bool = False,
+                       driver_pool=None) -> List[Dict]:
+    """Async version of scrape_many: runs up to concurrency jobs at a time on the current event loop,
+    in this process. Returns one result dict per job, in the input order."""
+    from scraper.async_runtime import get_blocking_executor, run_blocking
+    from scraper.drivers import get_driver_pool
+
+    # every job holds one driver and fetches result pages with a few more
+    driver_pool = driver_pool or get_driver_pool(size=concurrency * 2, profile=browser_profile)
+    get_blocking_executor(max_workers=max(8, concurrency * 2))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    jobs = [(index, home_url, keyword) for index, (home_url, keyword) in enumerate(jobs)]
+    results = [None] * len(jobs)
+
+    knowledge_by_site = {}
+    for _, home_url, _ in jobs:
+        if home_url not in knowledge_by_site:
+            knowledge_by_site[home_url] = await run_blocking(KnowledgeBase(home_url).search_knowledge)
+
+    first_jobs, other_jobs, inspected_sites = _split_new_sites(jobs, knowledge_by_site)
+    if first_jobs:
+        print(f"\n🔍 Inspecting {len(first_jobs)} new website(s) before the rest of the batch...")
+        await _arun_batch(first_jobs, semaphore, driver_pool, time_range_days, knowledge_by_site,
+                          incremental, results)
+        for home_url in inspected_sites:
+            knowledge_by_site[home_url] = await run_blocking(KnowledgeBase(home_url).search_knowledge)
+
+        remaining_jobs = []
+        for index, home_url, keyword in other_jobs:
+            if knowledge_by_site[home_url] is None:
+                results[index] = _job_result(
+                    home_url, keyword, error=f"Skipped: HTML inspection failed for {home_url}")
+            else:
+                remaining_jobs.append((index, home_url, keyword))
+        other_jobs = remaining_jobs
+
+    await _arun_batch(other_jobs, semaphore, driver_pool, time_range_days, knowledge_by_site,
+                      incremental, results)
+
+    failed = sum(1 for result in results if not result["success"])
+    print(f"\n🎉 Batch completed: {len(results) - failed} succeeded, {failed} failed.")
+    return results
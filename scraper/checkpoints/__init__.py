@@ -0,0 +1 @@
+from .checkpoint_store import CheckpointStore
@@ -0,0 +1,100 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+"""
+This class keeps a persistent high-water mark per (website, keyword): the newest post
+date and the URLs already collected by previous scrapes. SeleniumExtractPostsTool uses
+it so that incremental scrapes only return the new posts (the delta). On results sorted
+by date, it also stops paginating as soon as it reaches already-collected posts; on
+other orders (e.g. relevance), new posts can appear on any page, so only the URLs count.
+Stores one JSON file per (website, keyword) in the /sites folder.
+"""
+
+checkpoint_path = Path(__file__).parent / "sites"
+url_character_mapping_table = {
+    "/": "_",
+    ":": "_",
+    ".": "_",
+}
+
+
+class CheckpointStore:
+    def __init__(self, url: str, keyword: str, max_seen_urls: int = 5000):
+        self.url = url
+        self.keyword = keyword
+        self.max_seen_urls = max_seen_urls
+        self.file_path = self._to_file_path(url, keyword)
+
+        self.newest_post_date = None
+        self.seen_urls = []
+        self._seen_url_set = set()
+        self.load()
+
+    @staticmethod
+    def _to_file_path(url: str, keyword: str) -> Path:
+        if url.endswith("/"):
+            url = url[:-1]
+        name = f"{url}__{keyword}"
+        for character, replacement in url_character_mapping_table.items():
+            name = name.replace(character, replacement)
+        name = "".join(c if c.isalnum() or c in "_-" else "_" for c in name)
+        return checkpoint_path / f"{name}.json"
+
+    def load(self) -> Dict | None:
+        if not self.file_path.exists():
+            print(f"\n❗No checkpoint found for {self.url} | {self.keyword}. Scraping from the first page")
+            return None
+
+        with open(self.file_path, "r", encoding="utf-8") as file:
+            checkpoint = json.load(file)
+
+        if checkpoint.get("newest_post_date"):
+            self.newest_post_date = datetime.fromisoformat(checkpoint["newest_post_date"])
+        self.seen_urls = checkpoint.get("seen_urls", [])
+        self._seen_url_set = set(self.seen_urls)
+        print(f"\n✅ Checkpoint found for {self.url} | {self.keyword}: newest post {self.newest_post_date}")
+        return checkpoint
+
+    def is_collected(self, post: Dict, sorted_by_date: bool = False) -> bool:
+        """A post was collected before if its URL was seen, or, on results sorted by date,
+        if it is older than the newest collected post."""
+        if post["url"] in self._seen_url_set:
+            return True
+        if sorted_by_date and self.newest_post_date and post["date"] and post["date"] < self.newest_post_date:
+            return True
+        return False
+
+    def new_posts(self, page_data: List[Dict], sorted_by_date: bool = False) -> List[Dict]:
+        return [post for post in page_data if not self.is_collected(post, sorted_by_date=sorted_by_date)]
+
+    def update(self, posts_data: List[Dict]):
+        for post in posts_data:
+            if post["url"] not in self._seen_url_set:
+                self._seen_url_set.add(post["url"])
+                self.seen_urls.append(post["url"])
+            if post["date"] and (self.newest_post_date is None or post["date"] > self.newest_post_date):
+                self.newest_post_date = post["date"]
+
+        # keep only the most recent URLs
+        if len(self.seen_urls) > self.max_seen_urls:
+            self.seen_urls = self.seen_urls[-self.max_seen_urls:]
+            self._seen_url_set = set(self.seen_urls)
+
+    def save(self):
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        checkpoint = {
+            "url": self.url,
+            "keyword": self.keyword,
+            "newest_post_date": self.newest_post_date.isoformat() if self.newest_post_date else None,
+            "seen_urls": self.seen_urls,
+            "updated_at": datetime.now().isoformat(),
+        }
+        # write to a temporary file first, so an interrupted run never leaves a broken checkpoint
+        temp_path = self.file_path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(checkpoint, file, indent=4, ensure_ascii=False)
+        temp_path.replace(self.file_path)
+
+        print(f"✅ Checkpoint saved for {self.url} | {self.keyword}")
@@ -0,0 +1,3 @@
+from .browser_profiles import BrowserProfile, BROWSER_PROFILES, get_browser_profile
+from .driver_pool import DriverPool, get_driver_pool
+from .page_waiter import PageWaiter
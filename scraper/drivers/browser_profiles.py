@@ -0,0 +1,121 @@
+from typing import Dict, List
+
+from selenium.webdriver.chrome.options import Options
+
+"""
+Browser profiles used to launch Chrome. The "default" profile is the headed browser
+used so far. The "lean" profile runs headless and blocks images, fonts, media and
+ad/analytics scripts through the DevTools protocol (Network.setBlockedURLs), which
+cuts page load time and memory per tab on forum pages.
+
+Websites that need some of the blocked resources keep an allowlist next to their
+selectors in the knowledge file:
+
+"settings": {
+    "browser_profile": {
+        "allow_resource_types": ["stylesheet"],
+        "allow_url_patterns": ["*cse.google.com*"]
+    }
+}
+"""
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+RESOURCE_TYPE_URL_PATTERNS = {
+    "image": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.svg*", "*.ico*", "*.avif*"],
+    "font": ["*.woff*", "*.woff2*", "*.ttf*", "*.otf*", "*.eot*"],
+    "media": ["*.mp4*", "*.webm*", "*.mp3*", "*.m3u8*", "*.ogg*"],
+    "stylesheet": ["*.css*"],
+}
+
+AD_AND_ANALYTICS_URL_PATTERNS = [
+    "*doubleclick.net*",
+    "*googlesyndication.com*",
+    "*googletagmanager.com*",
+    "*google-analytics.com*",
+    "*googletagservices.com*",
+    "*adservice.google.*",
+    "*facebook.net*",
+    "*scorecardresearch.com*",
+    "*criteo.*",
+    "*taboola.com*",
+    "*outbrain.com*",
+    "*hotjar.com*",
+]
+
+
+class BrowserProfile:
+    def __init__(
+        self,
+        name: str,
+        headless: bool = False,
+        blocked_resource_types: List[str] = None,
+        blocked_url_patterns: List[str] = None,
+    ):
+        self.name = name
+        self.headless = headless
+        self.blocked_resource_types = blocked_resource_types or []
+        self.blocked_url_patterns = blocked_url_patterns or []
+
+    def build_options(self) -> Options:
+        options = Options()
+        options.add_argument(f'user-agent={USER_AGENT}')
+        options.add_argument("--disable-gpu")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--window-size=1920,1080")
+        options.add_argument("--disable-software-rasterizer")
+        options.add_argument("--ignore-certificate-errors")
+        options.add_argument("--allow-running-insecure-content")
+        options.add_argument("--disable-blink-features=AutomationControlled")
+
+        if self.headless:
+            options.add_argument("--headless=new")
+        if self.blocked_resource_types or self.blocked_url_patterns:
+            options.add_argument("--disable-extensions")
+            options.add_argument("--mute-audio")
+        return options
+
+    @property
+    def blocks_requests(self) -> bool:
+        return bool(self.blocked_resource_types or self.blocked_url_patterns)
+
+    def blocked_urls(self, allowlist: Dict = None) -> List[str]:
+        """URL patterns to block, minus the resource types and patterns allowed for a website."""
+        allowlist = allowlist or {}
+        allowed_types = set(allowlist.get("allow_resource_types", []))
+        allowed_patterns = set(allowlist.get("allow_url_patterns", []))
+
+        patterns = []
+        for resource_type in self.blocked_resource_types:
+            if resource_type not in allowed_types:
+                patterns.extend(RESOURCE_TYPE_URL_PATTERNS.get(resource_type, []))
+        patterns.extend(self.blocked_url_patterns)
+        return [pattern for pattern in patterns if pattern not in allowed_patterns]
+
+    def apply(self, driver, allowlist: Dict = None):
+        """Install the request blocking of this profile on a running driver."""
+        if not self.blocks_requests:
+            return
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.blocked_urls(allowlist)})
+
+
+BROWSER_PROFILES = {
+    "default": BrowserProfile("default"),
+    "lean": BrowserProfile(
+        "lean",
+        headless=True,
+        blocked_resource_types=["image", "font", "media"],
+        blocked_url_patterns=AD_AND_ANALYTICS_URL_PATTERNS,
+    ),
+}
+
+
+def get_browser_profile(profile: str | BrowserProfile = "default") -> BrowserProfile:
+    if isinstance(profile, BrowserProfile):
+        return profile
+    if profile not in BROWSER_PROFILES:
+        raise ValueError(f"Unknown browser profile: {profile}. Choose from {list(BROWSER_PROFILES)}")
+    return BROWSER_PROFILES[profile]
+
@@ -0,0 +1,267 @@
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+
+import psutil
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+from scraper.knowledge import KnowledgeBase
+from utils.metrics import get_metrics
+from .browser_profiles import BrowserProfile, get_browser_profile
+
+"""
+This class keeps a pool of warm Chrome drivers so that tools and agents can check a
+browser out, use it, and check it back in instead of launching a new Chrome process
+for every call. Drivers are health checked on checkout and recycled after a number
+of page loads or when the browser memory (RSS) goes above a ceiling.
+All drivers of a pool are launched with the same browser profile (see browser_profiles.py).
+Drivers are only launched on demand, so size is a ceiling. A scrape holds one shared driver,
+and returns it before the result pages fetched by URL check out up to concurrency drivers.
+The concurrent HTML inspection holds one driver per agent (at most size agents at a time).
+"""
+
+
+class PooledDriver:
+    """Bookkeeping for one driver owned by the pool."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages_loaded = 0
+        self.created_at = time.time()
+
+
+class DriverPool:
+    def __init__(
+        self,
+        size: int = 6,
+        max_pages_per_driver: int = 50,
+        max_rss_mb: int = 1500,
+        checkout_timeout: float = 120,
+        profile: str | BrowserProfile = "default",
+        driver_factory=None,
+    ):
+        self.size = size
+        self.profile = get_browser_profile(profile)
+        self.max_pages_per_driver = max_pages_per_driver
+        self.max_rss_mb = max_rss_mb
+        self.checkout_timeout = checkout_timeout
+        self.driver_factory = driver_factory
+
+        self._idle = []
+        self._slots = {}
+        self._launching = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._chromedriver_path = None
+
+    def _launch(self):
+        if self.driver_factory:
+            return self.driver_factory()
+
+        if self._chromedriver_path is None:
+            self._chromedriver_path = ChromeDriverManager().install()
+        driver = webdriver.Chrome(
+            service=Service(self._chromedriver_path), options=self.profile.build_options()
+        )
+        self.profile.apply(driver)
+        return driver
+
+    def warm_up(self, count: int = None):
+        """Launch drivers up front so the first checkouts do not pay the launch cost."""
+        count = min(count or self.size, self.size)
+        drivers = [self.checkout() for _ in range(count)]
+        for driver in drivers:
+            self.checkin(driver, reset=False)
+
+    def checkout(self, timeout: float = None, site_url: str = None):
+        """Return a healthy driver, launching one if the pool has spare capacity.
+        With site_url, the website's resource allowlist is applied to the driver."""
+        with get_metrics().span("driver.checkout"):
+            driver = self._checkout(timeout=timeout)
+            if site_url and self.profile.blocks_requests:
+                self.apply_site_profile(driver, site_url)
+        return driver
+
+    def apply_site_profile(self, driver, site_url: str):
+        allowlist = KnowledgeBase(site_url).get_setting("browser_profile")
+        try:
+            self.profile.apply(driver, allowlist=allowlist)
+        except Exception as e:
+            print(f"⚠️ Error applying the browser profile: {e}")
+
+    def _checkout(self, timeout: float = None):
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            slot = None
+            with self._condition:
+                if self._closed:
+                    raise RuntimeError("Driver pool is closed.")
+
+                while not self._idle and len(self._slots) + self._launching >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(
+                            f"No driver available after waiting {timeout} seconds.")
+                    self._condition.wait(remaining)
+
+                if self._idle:
+                    slot = self._idle.pop()
+                else:
+                    self._launching += 1
+
+            if slot is None:
+                return self._launch_slot().driver
+
+            if self._needs_recycle(slot) or not self._is_healthy(slot):
+                print("♻️ Recycling a pooled driver...")
+                get_metrics().increment("drivers_recycled")
+                self._discard(slot)
+                continue
+
+            return slot.driver
+
+    def _launch_slot(self) -> PooledDriver:
+        try:
+            with get_metrics().span("driver.launch", profile=self.profile.name):
+                driver = self._launch()
+        except Exception:
+            with self._condition:
+                self._launching -= 1
+                self._condition.notify()
+            raise
+
+        slot = PooledDriver(driver)
+        with self._condition:
+            self._launching -= 1
+            self._slots[id(driver)] = slot
+        get_metrics().increment("drivers_launched")
+        print("Pooled driver initialized.")
+        return slot
+
+    def checkin(self, driver, reset: bool = True):
+        """Give a driver back to the pool. Drivers due for recycling are quit instead."""
+        slot = self._slots.get(id(driver))
+        if slot is None:
+            return
+
+        if self._closed or self._needs_recycle(slot):
+            if not self._closed:
+                get_metrics().increment("drivers_recycled")
+            self._discard(slot)
+            return
+
+        if reset:
+            try:
+                # start the next user with a fresh session
+                driver.delete_all_cookies()
+                driver.get("about:blank")
+                self.profile.apply(driver)
+            except Exception as e:
+                print(f"⚠️ Error resetting pooled driver: {e}")
+                self._discard(slot)
+                return
+
+        with self._condition:
+            self._idle.append(slot)
+            self._condition.notify()
+
+    def discard(self, driver):
+        """Quit a driver and remove it from the pool, e.g. after it crashed."""
+        slot = self._slots.get(id(driver))
+        if slot:
+            self._discard(slot)
+
+    def _discard(self, slot: PooledDriver):
+        with self._condition:
+            self._slots.pop(id(slot.driver), None)
+            if slot in self._idle:
+                self._idle.remove(slot)
+            self._condition.notify()
+        try:
+            slot.driver.quit()
+        except Exception as e:
+            print(f"⚠️ Error closing pooled driver: {e}")
+
+    @contextmanager
+    def driver(self, timeout: float = None, site_url: str = None):
+        driver = self.checkout(timeout=timeout, site_url=site_url)
+        try:
+            yield driver
+        finally:
+            self.checkin(driver)
+
+    def record_page(self, driver):
+        """Count a page load against the driver's recycling budget."""
+        get_metrics().increment("pages_loaded", mode="browser")
+        slot = self._slots.get(id(driver))
+        if slot:
+            slot.pages_loaded += 1
+
+    def _needs_recycle(self, slot: PooledDriver) -> bool:
+        if self.max_pages_per_driver and slot.pages_loaded >= self.max_pages_per_driver:
+            return True
+        if self.max_rss_mb and self.get_rss_mb(slot.driver) >= self.max_rss_mb:
+            return True
+        return False
+
+    @staticmethod
+    def _is_healthy(slot: PooledDriver) -> bool:
+        try:
+            return slot.driver.execute_script("return 1;") == 1
+        except Exception:
+            return False
+
+    @staticmethod
+    def get_rss_mb(driver) -> float:
+        """Resident memory of chromedriver plus all the Chrome processes it spawned."""
+        try:
+            process = psutil.Process(driver.service.process.pid)
+            processes = [process] + process.children(recursive=True)
+        except Exception:
+            return 0.0
+
+        rss = 0
+        for p in processes:
+            try:
+                rss += p.memory_info().rss
+            except psutil.Error:
+                continue
+        rss_mb = rss / (1024 * 1024)
+        get_metrics().observe("browser_rss_mb", rss_mb)
+        return rss_mb
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "size": self.size,
+                "alive": len(self._slots),
+                "idle": len(self._idle),
+                "launching": self._launching,
+            }
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            slots = list(self._slots.values())
+        for slot in slots:
+            self._discard(slot)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_driver_pool(**pool_kwargs) -> DriverPool:
+    """Process-wide pool shared by MarketScraper, the Selenium tools and the agents.
+    Keyword arguments only take effect on the first call."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = DriverPool(**pool_kwargs)
+            atexit.register(_default_pool.close)
+        return _default_pool
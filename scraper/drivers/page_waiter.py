@@ -0,0 +1,151 @@
+import time
+from functools import wraps
+
+from selenium.common.exceptions import (
+    JavascriptException,
+    NoSuchElementException,
+    StaleElementReferenceException,
+    TimeoutException,
+)
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from utils.metrics import get_metrics
+
+"""
+This class replaces fixed time.sleep calls with explicit waits. Each wait polls the
+browser for a condition (element present/clickable, URL changed, network idle, DOM
+mutations quiet) and returns as soon as the page is actually ready, or when the
+timeout expires.
+The time spent in each kind of wait is recorded in the page_wait_seconds metric.
+"""
+
+# Installs a MutationObserver once per document and returns the milliseconds since the last DOM mutation
+DOM_OBSERVER_SCRIPT = """
+if (!window.__pageWaiter) {
+    window.__pageWaiter = {mutations: 0, last: performance.now()};
+    new MutationObserver(function () {
+        window.__pageWaiter.mutations += 1;
+        window.__pageWaiter.last = performance.now();
+    }).observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+}
+return [performance.now() - window.__pageWaiter.last, window.__pageWaiter.mutations];
+"""
+
+NETWORK_STATE_SCRIPT = """
+return [document.readyState, performance.getEntriesByType('resource').length];
+"""
+
+
+def _timed(wait):
+    @wraps(wait)
+    def timed_wait(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return wait(self, *args, **kwargs)
+        finally:
+            get_metrics().observe("page_wait_seconds", time.perf_counter() - start, wait=wait.__name__)
+    return timed_wait
+
+
+class PageWaiter:
+    def __init__(self, driver, timeout: float = 10, poll_frequency: float = 0.2):
+        self.driver = driver
+        self.timeout = timeout
+        self.poll_frequency = poll_frequency
+
+    def _wait(self, timeout: float = None) -> WebDriverWait:
+        return WebDriverWait(
+            self.driver,
+            self.timeout if timeout is None else timeout,
+            poll_frequency=self.poll_frequency,
+            # the page may navigate while a condition is being polled
+            ignored_exceptions=(NoSuchElementException, StaleElementReferenceException, JavascriptException),
+        )
+
+    @_timed
+    def element_present(self, by: str, value: str, timeout: float = None):
+        """Return the element once it is in the DOM. Raises NoSuchElementException on timeout."""
+        try:
+            return self._wait(timeout).until(EC.presence_of_element_located((by, value)))
+        except TimeoutException:
+            raise NoSuchElementException(
+                f"Unable to locate element: {{\"method\":\"{by}\",\"selector\":\"{value}\"}}")
+
+    @_timed
+    def element_clickable(self, by: str, value: str, timeout: float = None):
+        """Return the element once it is visible and enabled. Raises NoSuchElementException on timeout."""
+        try:
+            return self._wait(timeout).until(EC.element_to_be_clickable((by, value)))
+        except TimeoutException:
+            raise NoSuchElementException(
+                f"Element is not clickable: {{\"method\":\"{by}\",\"selector\":\"{value}\"}}")
+
+    @_timed
+    def element_gone(self, by: str, value: str, timeout: float = None) -> bool:
+        try:
+            return self._wait(timeout).until(EC.invisibility_of_element_located((by, value)))
+        except TimeoutException:
+            return False
+
+    @_timed
+    def url_changed(self, old_url: str, timeout: float = None) -> bool:
+        try:
+            return self._wait(timeout).until(EC.url_changes(old_url))
+        except TimeoutException:
+            return False
+
+    @_timed
+    def network_idle(self, idle_time: float = 0.5, timeout: float = None) -> bool:
+        """Wait until the document is loaded and no new resource requests started for idle_time seconds."""
+        state = {"count": -1, "since": time.monotonic()}
+
+        def is_idle(driver):
+            ready_state, resource_count = driver.execute_script(NETWORK_STATE_SCRIPT)
+            if ready_state != "complete" or resource_count != state["count"]:
+                state["count"] = resource_count
+                state["since"] = time.monotonic()
+                return False
+            return time.monotonic() - state["since"] >= idle_time
+
+        try:
+            return self._wait(timeout).until(is_idle)
+        except TimeoutException:
+            return False
+
+    def mark_dom(self) -> int:
+        """Install the DOM observer and return the current mutation count, for use with dom_changed."""
+        _, mutations = self.driver.execute_script(DOM_OBSERVER_SCRIPT)
+        return mutations
+
+    @_timed
+    def dom_changed(self, since_mutations: int, old_url: str = None, timeout: float = None) -> bool:
+        """Wait until the DOM mutated after mark_dom, or the browser navigated away from old_url."""
+        def has_changed(driver):
+            if old_url and driver.current_url != old_url:
+                return True
+            _, mutations = driver.execute_script(DOM_OBSERVER_SCRIPT)
+            # a reloaded document starts a new observer, so any different count means a change
+            return mutations != since_mutations
+
+        try:
+            return self._wait(timeout).until(has_changed)
+        except TimeoutException:
+            return False
+
+    @_timed
+    def dom_quiet(self, quiet_time: float = 0.5, timeout: float = None) -> bool:
+        """Wait until no DOM mutation happened for quiet_time seconds."""
+        def is_quiet(driver):
+            quiet_ms, _ = driver.execute_script(DOM_OBSERVER_SCRIPT)
+            return quiet_ms >= quiet_time * 1000
+
+        try:
+            return self._wait(timeout).until(is_quiet)
+        except TimeoutException:
+            return False
+
+    def page_settled(self, since_mutations: int, old_url: str = None, timeout: float = None) -> bool:
+        """Wait for a click to take effect and for the page to stop changing afterwards."""
+        changed = self.dom_changed(since_mutations, old_url=old_url, timeout=timeout)
+        return self.dom_quiet(timeout=timeout) and changed
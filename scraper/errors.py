@@ -0,0 +1,12 @@
+"""
+Exceptions raised by the scraping workflow, so callers (e.g. a batch of scrape jobs)
+can handle a failed website without stopping the whole process.
+"""
+
+
+class ScraperError(Exception):
+    """Base class for scraping errors."""
+
+
+class InspectionError(ScraperError):
+    """The agents could not learn the HTML tags of a website."""
@@ -0,0 +1,6 @@
+from .locators import compile_locator
+from .static_selector import parse_html, find_static, element_text, element_href
+from .cleaner import clean_html, get_cleaner, CLEANING_ENGINES
+from .dom_compressor import compress_dom
+from .selector_heuristics import infer_selectors
+from .selector_validator import check_selectors
@@ -0,0 +1,107 @@
+import re
+from typing import Callable, Dict, Iterable
+
+import lxml.html
+from bs4 import BeautifulSoup
+
+"""
+HTML cleaning engines for the agent prompts. Both engines drop the irrelevant tags,
+strip every line, drop empty lines and lines already seen, and join the rest:
+
+- "lxml" (default): parses with libxml2, drops the tags in the C tree, and strips and
+  dedupes the serialized lines in a single pass.
+- "bs4": the original BeautifulSoup html.parser implementation, kept as a fallback
+  and as the baseline of benchmarks/bench_html_cleaner.py.
+
+The serializers differ in details (e.g. <br> vs <br/>, attribute order), the cleaned
+content does not: like BeautifulSoup, the lxml engine only outputs the doctype and the
+html, head and body tags that the page has, not the ones libxml2 implies.
+Without ignored_tags the lxml engine keeps every tag, where BeautifulSoup's find_all(None)
+matched and dropped all of them.
+"""
+
+_HTML_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+_DOCTYPE = re.compile(r"\s*<!doctype\s+([^>]*)>", re.IGNORECASE)
+_DOCUMENT_TAGS = {tag: re.compile(rf"<{tag}[\s>/]", re.IGNORECASE) for tag in ("html", "head", "body")}
+
+
+def _dedupe_lines(content: str) -> str:
+    seen = set()
+    kept = []
+    for line in content.split("\n"):
+        line = line.strip()
+        if line and line not in seen:
+            seen.add(line)
+            kept.append(line)
+    return "".join(kept)
+
+
+def _serialize(element) -> str:
+    return lxml.html.tostring(element, encoding="unicode", method="html")
+
+
+def clean_html_lxml(html_content: str, ignored_tags: Iterable[str] = None) -> str:
+    if not html_content or not html_content.strip():
+        return ""
+
+    # bytes, so that pages with an XML encoding declaration parse as well
+    tree = lxml.html.document_fromstring(html_content.encode("utf-8"), parser=_HTML_PARSER)
+    if ignored_tags:
+        # drop_tree keeps the text that follows an element, as BeautifulSoup's decompose does
+        for element in list(tree.iter(*ignored_tags)):
+            element.drop_tree()
+
+    # libxml2 adds the html, head and body elements a page leaves out
+    for tag in ("head", "body"):
+        element = tree.find(tag)
+        if element is not None and not _DOCUMENT_TAGS[tag].search(html_content):
+            element.drop_tag()
+    if _DOCUMENT_TAGS["html"].search(html_content):
+        parts = [_serialize(tree)]
+    else:
+        parts = [tree.text or ""] + [_serialize(child) for child in tree]
+    # the comments around the html element
+    parts = ([_serialize(sibling) for sibling in reversed(list(tree.itersiblings(preceding=True)))]
+             + parts + [_serialize(sibling) for sibling in tree.itersiblings()])
+
+    doctype = _DOCTYPE.match(html_content)
+    if doctype:
+        parts.insert(0, f"<!DOCTYPE {doctype.group(1)}>\n")
+    return _dedupe_lines("".join(parts))
+
+
+def clean_html_bs4(html_content: str, ignored_tags: Iterable[str] = None) -> str:
+    soup = BeautifulSoup(html_content, "html.parser")
+    for element in soup.find_all(list(ignored_tags) if ignored_tags else None):  # irrelevant tags for search
+        element.decompose()
+
+    cleaned_content = str(soup)
+
+    # remove unecessary lines
+    lines = cleaned_content.split("\n")
+    stripped_lines = [line.strip() for line in lines]
+    non_empty_lines = [line for line in stripped_lines if line]
+    seen = set()
+    deduped_lines = [
+        line for line in non_empty_lines if not (line in seen or seen.add(line))
+    ]
+    final_cleaned_content = "".join(deduped_lines)
+
+    return final_cleaned_content
+
+
+CLEANING_ENGINES: Dict[str, Callable[[str, Iterable[str]], str]] = {
+    "lxml": clean_html_lxml,
+    "bs4": clean_html_bs4,
+}
+
+
+def get_cleaner(engine: str = "lxml") -> Callable[[str, Iterable[str]], str]:
+    if engine not in CLEANING_ENGINES:
+        raise ValueError(f"Unknown HTML cleaning engine: {engine}. Choose from {list(CLEANING_ENGINES)}")
+    return CLEANING_ENGINES[engine]
+
+
+def clean_html(html_content: str, ignored_tags: Iterable[str] = None, engine: str = "lxml") -> str:
+    """Removes irrelevant tags, whitespace, and duplicate lines from HTML content."""
+    return get_cleaner(engine)(html_content, ignored_tags)
@@ -0,0 +1,253 @@
+import re
+from copy import deepcopy
+from typing import Callable, List
+
+import lxml.html
+from lxml import etree
+
+"""
+Compresses the cleaned HTML of a page before it goes into an agent prompt, so that the
+prompt fits a token budget while keeping everything a selector can be built from:
+
+1. Attributes that selectors do not use (style, src, on*, long data-*) are dropped, and
+   long attribute values and texts are shortened.
+2. Runs of structurally identical siblings (result lists, menus) keep their first items;
+   the rest is replaced by a comment such as <!-- 47 more <li.result> -->.
+3. When the page is still over the budget, only the candidate regions for the agent's
+   focus are kept (forms for "search", dropdowns for "sort", the largest repeated sibling
+   structure for "extract", pager link runs for "pager"), each preceded by the path of
+   its ancestors, and added by score until the budget is used.
+
+count_tokens is the tokenizer of the LLM (BaseLLM.get_text_token); when it is not
+available, tokens are estimated from the length of the text.
+"""
+
+KEPT_ATTRIBUTES = {
+    "id", "class", "name", "type", "href", "role", "aria-label", "placeholder", "value",
+    "title", "action", "method", "for", "selected", "datetime", "onclick",
+}
+MAX_ATTRIBUTE_LENGTH = 120
+MAX_TEXT_LENGTH = 80
+MAX_DATA_ATTRIBUTE_LENGTH = 40
+
+CJK_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+
+FOCUS_PATTERNS = {
+    "search": re.compile(r"search|query|keyword|搜尋|搜索|検索", re.IGNORECASE),
+    "sort": re.compile(r"sort|order|dropdown|select|menu|排序|並び", re.IGNORECASE),
+    "pager": re.compile(r"pag|next|prev|下一|上一|次へ|›|»", re.IGNORECASE),
+    "extract": re.compile(r"result|post|item|list|article|topic|thread|blog", re.IGNORECASE),
+}
+
+
+def _estimate_tokens(text: str) -> int:
+    # CJK characters are about one token each, latin text about four characters per token
+    cjk = len(CJK_PATTERN.findall(text))
+    return max(1, cjk + (len(text) - cjk) // 4)
+
+
+def _make_token_counter(count_tokens: Callable[[str], int] | None) -> Callable[[str], int]:
+    def counter(text: str) -> int:
+        if count_tokens:
+            try:
+                tokens = count_tokens(text)
+                if tokens is not None:
+                    return tokens
+            except Exception:
+                pass
+        return _estimate_tokens(text)
+    return counter
+
+
+def _shorten(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+def _strip_attributes(tree):
+    for element in tree.iter():
+        if not isinstance(element.tag, str):
+            continue
+        for name, value in list(element.attrib.items()):
+            if name.startswith("data-"):
+                if len(value) > MAX_DATA_ATTRIBUTE_LENGTH:
+                    del element.attrib[name]
+            elif name not in KEPT_ATTRIBUTES:
+                del element.attrib[name]
+            elif name == "onclick":
+                # inline handlers of pagers often hold the page number, e.g. goPage(2)
+                element.attrib[name] = _shorten(value, 60)
+            elif len(value) > MAX_ATTRIBUTE_LENGTH:
+                element.attrib[name] = _shorten(value, MAX_ATTRIBUTE_LENGTH)
+
+
+def _shorten_text(text: str | None) -> str | None:
+    if not text:
+        return text
+    # whitespace between tags costs tokens and does not matter to selectors
+    collapsed = " ".join(text.split())
+    if not collapsed:
+        return ""
+    if text[0].isspace():
+        collapsed = " " + collapsed
+    return _shorten(collapsed, MAX_TEXT_LENGTH)
+
+
+def _shorten_texts(tree):
+    for element in tree.iter():
+        if isinstance(element.tag, str):
+            element.text = _shorten_text(element.text)
+        element.tail = _shorten_text(element.tail)
+
+
+def _signature(element) -> str:
+    """Tag and classes, e.g. li.result.odd: siblings with the same signature are repeated items."""
+    classes = ".".join(sorted(element.get("class", "").split()))
+    return f"{element.tag}.{classes}" if classes else element.tag
+
+
+def _describe(element) -> str:
+    element_id = element.get("id")
+    classes = element.get("class", "").split()
+    description = element.tag
+    if element_id:
+        description += f"#{element_id}"
+    if classes:
+        description += "." + ".".join(classes[:3])
+    return description
+
+
+def _ancestor_path(element) -> str:
+    path = [_describe(ancestor) for ancestor in reversed(list(element.iterancestors()))
+            if isinstance(ancestor.tag, str) and ancestor.tag not in ("html",)]
+    return " > ".join(path + [_describe(element)])
+
+
+def _repeated_runs(tree, min_run: int = 3):
+    """Yield (parent, signature, items) for each run of at least min_run similar children."""
+    for parent in tree.iter():
+        if not isinstance(parent.tag, str):
+            continue
+        groups = {}
+        for child in parent:
+            if isinstance(child.tag, str):
+                groups.setdefault(_signature(child), []).append(child)
+        for signature, items in groups.items():
+            if len(items) >= min_run:
+                yield parent, signature, items
+
+
+def _collapse_repeats(tree, keep: int):
+    for parent, signature, items in list(_repeated_runs(tree, min_run=keep + 2)):
+        if items[0].getparent() is None:
+            continue
+        for item in items[keep:-1]:
+            item.drop_tree()
+        # keep the last item too, e.g. the "next" link at the end of a pager
+        comment = etree.Comment(f" {len(items) - keep - 1} more <{signature}> ")
+        items[keep - 1].addnext(comment)
+
+
+def _candidate_regions(tree, focus: str) -> List:
+    """Elements worth showing to the agent, best first."""
+    pattern = FOCUS_PATTERNS.get(focus)
+    scored = {}
+
+    def add(element, score):
+        if element is not None and isinstance(element.tag, str):
+            scored[element] = max(scored.get(element, 0), score)
+
+    def matches(element) -> bool:
+        text = " ".join([element.get("id", ""), element.get("class", ""), element.get("name", ""),
+                         element.get("aria-label", ""), element.get("placeholder", "")])
+        return bool(pattern and pattern.search(text))
+
+    if focus == "search":
+        for form in tree.iter("form"):
+            add(form, 10 if matches(form) or any(matches(i) for i in form.iter("input")) else 5)
+        for field in tree.iter("input"):
+            if matches(field) or field.get("type") in ("search", "text"):
+                add(field.getparent(), 8)
+    elif focus == "sort":
+        for select in tree.iter("select"):
+            add(select.getparent(), 10)
+        for element in tree.iter():
+            if isinstance(element.tag, str) and (matches(element) or element.get("role") in ("listbox", "menu")):
+                add(element, 6)
+    elif focus == "pager":
+        for parent, signature, items in _repeated_runs(tree, min_run=3):
+            links = [item for item in items if item.tag == "a" or item.find(".//a") is not None]
+            numeric = sum(1 for item in links if item.text_content().strip().isdigit())
+            if numeric >= 2:
+                add(parent, 10 + numeric)
+        for element in tree.iter():
+            if isinstance(element.tag, str) and matches(element):
+                add(element, 6)
+    else:  # extract
+        for parent, signature, items in _repeated_runs(tree, min_run=3):
+            size = sum(len(item.text_content()) for item in items)
+            links = sum(1 for item in items if item.tag == "a" or item.find(".//a") is not None)
+            score = len(items) + links + min(size // 200, 20) + (10 if matches(parent) or matches(items[0]) else 0)
+            add(parent, score)
+
+    # skip the regions that contain or are contained in a better one
+    kept, kept_set = [], set()
+    for region in sorted(scored, key=scored.get, reverse=True):
+        if any(ancestor in kept_set for ancestor in region.iterancestors()):
+            continue
+        if any(region in set(other.iterancestors()) for other in kept):
+            continue
+        kept.append(region)
+        kept_set.add(region)
+    return kept
+
+
+def _serialize(element) -> str:
+    return lxml.html.tostring(element, encoding="unicode", method="html")
+
+
+def compress_dom(cleaned_html: str, token_budget: int = 6000, focus: str = "extract",
+                 count_tokens: Callable[[str], int] = None) -> str:
+    """Return the HTML compressed to at most token_budget tokens (see the module docstring)."""
+    if not cleaned_html or not cleaned_html.strip():
+        return cleaned_html
+    counter = _make_token_counter(count_tokens)
+    if counter(cleaned_html) <= token_budget:
+        return cleaned_html
+
+    tree = lxml.html.document_fromstring(cleaned_html.encode("utf-8"),
+                                         parser=lxml.html.HTMLParser(encoding="utf-8"))
+    _strip_attributes(tree)
+    _shorten_texts(tree)
+    html = _serialize(tree)
+    if counter(html) <= token_budget:
+        return html
+
+    for keep in (3, 2, 1):
+        collapsed = deepcopy(tree)
+        _collapse_repeats(collapsed, keep=keep)
+        html = _serialize(collapsed)
+        if counter(html) <= token_budget:
+            return html
+
+    # still too large: keep the candidate regions for the focus, best first, with as
+    # many repeated items as fit
+    parts, used = [], 0
+    for region in _candidate_regions(tree, focus):
+        path = _ancestor_path(region)
+        for keep in (3, 1):
+            region_copy = deepcopy(region)
+            region_copy.tail = None
+            _collapse_repeats(region_copy, keep=keep)
+            part = f"<!-- {path} -->\n{_serialize(region_copy)}"
+            tokens = counter(part)
+            if used + tokens <= token_budget:
+                parts.append(part)
+                used += tokens
+                break
+    if parts:
+        return "\n".join(parts)
+
+    # no region fits: cut the page at the budget
+    html = _serialize(collapsed)
+    ratio = token_budget / counter(html)
+    return html[:int(len(html) * ratio)]
@@ -0,0 +1,41 @@
+from typing import Dict
+
+"""
+Translates the Selenium (selector, value) pairs stored in the knowledge files into
+CSS or XPath queries, the same way Selenium does, so that they can be evaluated
+outside of WebDriver (in injected JavaScript or with lxml).
+"""
+
+
+def _css_string(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _xpath_string(value: str) -> str:
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    parts = value.split("'")
+    return "concat(" + ", \"'\", ".join(f"'{part}'" for part in parts) + ")"
+
+
+def compile_locator(selector: str, value: str) -> Dict:
+    """Translate a Selenium (by, value) pair into a CSS or XPath query, the same way Selenium does."""
+    if selector == "css selector":
+        return {"kind": "css", "query": value}
+    if selector == "id":
+        return {"kind": "css", "query": f"[id={_css_string(value)}]"}
+    if selector == "name":
+        return {"kind": "css", "query": f"[name={_css_string(value)}]"}
+    if selector == "class name":
+        return {"kind": "css", "query": "." + ".".join(value.split())}
+    if selector == "tag name":
+        return {"kind": "css", "query": value}
+    if selector == "xpath":
+        return {"kind": "xpath", "query": value}
+    if selector == "link text":
+        return {"kind": "xpath", "query": f".//a[normalize-space(.)={_xpath_string(value.strip())}]"}
+    if selector == "partial link text":
+        return {"kind": "xpath", "query": f".//a[contains(., {_xpath_string(value)})]"}
+    raise ValueError(f"Unsupported selector type: {selector}")
@@ -0,0 +1,303 @@
+import re
+from collections import Counter
+from typing import Callable, Dict, List, Tuple
+
+from scraper.tools.date_parser import parse_date
+from .static_selector import parse_html, find_static, element_text
+
+"""
+Deterministic inference of the selectors the agents look for, from the structure of the
+rendered HTML of a page. Most forum engines follow the same patterns:
+
+- search: input[type=search], or an input named q/query/keyword, or one inside a search form
+- extract: a run of similar siblings that each hold a link and a date-like text
+- pager: a run of numbered links (or a "next" link) next to each other
+- sort: a <select> or a menu with a date/newest option
+
+Each inference returns candidate selectors ranked best first, in the same JSON format as
+the output of the matching agent, so they go through the same Selenium validation.
+The agents only ask the LLM when every candidate fails.
+"""
+
+SEARCH_NAMES = {"q", "query", "keyword", "keywords", "kw", "search", "s", "wd", "term", "text"}
+SEARCH_PATTERN = re.compile(r"search|query|keyword|搜尋|搜索|検索|查詢|查询", re.IGNORECASE)
+SORT_PATTERN = re.compile(r"sort|order|dropdown|排序|並び|排列", re.IGNORECASE)
+DATE_SORT_PATTERN = re.compile(
+    r"date|time|newest|latest|recent|日期|時間|时间|最新|發表|发表|發布|发布|新着|新しい|投稿日", re.IGNORECASE)
+NEXT_PATTERN = re.compile(r"^\s*(next|下一頁|下一页|下頁|下页|次へ|次のページ|›|»|>|>>)\s*$", re.IGNORECASE)
+# classes that change with the state or the layout of an element, or are generated
+UNSTABLE_CLASS = re.compile(
+    r"^(active|current|selected|hover|focus|open|show|hidden|disabled|odd|even|first|last|clearfix)$"
+    r"|^(css|sc|jsx|emotion)-|[0-9a-f]{6,}|^(col|row|d|m|p|mt|mb|ml|mr|pt|pb|px|py)-",
+    re.IGNORECASE,
+)
+MAX_DATE_TEXT_LENGTH = 40
+
+
+def _stable_classes(element) -> List[str]:
+    return [name for name in element.get("class", "").split() if not UNSTABLE_CLASS.search(name)]
+
+
+def _stable_id(element) -> str | None:
+    element_id = element.get("id")
+    if element_id and not re.search(r"\d{3,}|[0-9a-f]{8,}|:", element_id):
+        return element_id
+    return None
+
+
+def _css_step(element) -> str:
+    """tag.class1.class2 of the element, with the stable classes only."""
+    classes = _stable_classes(element)
+    return element.tag + "".join(f".{name}" for name in classes[:2])
+
+
+def _count(root, selector: str, value: str) -> int:
+    try:
+        return len(find_static(root, selector, value))
+    except Exception:
+        return 0
+
+
+def _locate(root, element, max_depth: int = 3) -> Tuple[str, str] | None:
+    """A (selector, value) pair that finds the element first in the page: its id, its name,
+    or a CSS path anchored on the closest ancestor with an id or stable classes."""
+    element_id = _stable_id(element)
+    if element_id and _count(root, "id", element_id) == 1:
+        return "id", element_id
+    name = element.get("name")
+    if name and _count(root, "name", name) == 1:
+        return "name", name
+
+    path = _css_step(element)
+    for ancestor in list(element.iterancestors())[:max_depth]:
+        if _count(root, "css selector", path) == 1:
+            return "css selector", path
+        ancestor_id = _stable_id(ancestor)
+        if ancestor_id:
+            path = f"#{ancestor_id} {path}"
+            break
+        path = f"{_css_step(ancestor)} > {path}"
+    matches = find_static(root, "css selector", path) if _count(root, "css selector", path) else []
+    if matches and matches[0] is element:
+        return "css selector", path
+    return None
+
+
+def _relative_path(item, element) -> str:
+    """CSS path from a container down to one of its descendants, e.g. div.title > a."""
+    steps = []
+    for node in [element] + list(element.iterancestors()):
+        if node is item:
+            break
+        steps.append(_css_step(node))
+    return " > ".join(reversed(steps))
+
+
+def _dedupe(candidates: List[Tuple[float, Dict]], limit: int) -> List[Dict]:
+    ranked, seen = [], set()
+    for _, selectors in sorted(candidates, key=lambda candidate: -candidate[0]):
+        key = repr(selectors)
+        if key not in seen:
+            seen.add(key)
+            ranked.append(selectors)
+    return ranked[:limit]
+
+
+def _repeated_runs(root, min_run: int = 3):
+    """Yield (parent, items) for each run of at least min_run children with the same tag and classes."""
+    for parent in root.iter():
+        if not isinstance(parent.tag, str):
+            continue
+        groups = {}
+        for child in parent:
+            if isinstance(child.tag, str):
+                groups.setdefault(_css_step(child), []).append(child)
+        for items in groups.values():
+            if len(items) >= min_run:
+                yield parent, items
+
+
+def infer_search_bar(root, limit: int = 3) -> List[Dict]:
+    candidates = []
+    for field in root.iter("input", "textarea"):
+        field_type = (field.get("type") or "text").lower()
+        if field_type not in ("text", "search"):
+            continue
+        labels = " ".join(field.get(name, "") for name in ("id", "class", "name", "placeholder", "aria-label", "title"))
+        score = 0
+        if field_type == "search":
+            score += 5
+        if (field.get("name") or "").lower() in SEARCH_NAMES:
+            score += 4
+        if SEARCH_PATTERN.search(labels):
+            score += 3
+        form = next(field.iterancestors("form"), None)
+        if form is not None and SEARCH_PATTERN.search(" ".join([form.get("action", ""), form.get("id", ""),
+                                                                 form.get("class", ""), form.get("role", "")])):
+            score += 2
+        if not score:
+            continue
+
+        locator = _locate(root, field)
+        if locator:
+            selector, value = locator
+            candidates.append((score, {"search_bar": {"selector": selector, "value": value}}))
+    return _dedupe(candidates, limit)
+
+
+def _is_date_text(text: str) -> bool:
+    return 0 < len(text) <= MAX_DATE_TEXT_LENGTH and parse_date(text) is not None
+
+
+def _date_element(item):
+    """The innermost element of an item whose text reads as a date."""
+    for element in item.iter():
+        if not isinstance(element.tag, str) or element is item:
+            continue
+        if element.tag == "time" or _is_date_text(element_text(element)):
+            if not any(_is_date_text(element_text(child)) for child in element if isinstance(child.tag, str)):
+                return element
+    return None
+
+
+def _title_link(item):
+    """The link of an item with the longest text, i.e. the title of the post."""
+    links = [link for link in item.iter("a") if link.get("href") and not link.get("href").startswith("#")]
+    return max(links, key=lambda link: len(element_text(link)), default=None)
+
+
+def _most_common_path(item_paths: List[str | None], min_share: float = 0.8) -> str | None:
+    paths = [path for path in item_paths if path]
+    if not paths:
+        return None
+    path, count = Counter(paths).most_common(1)[0]
+    return path if count >= min_share * len(item_paths) else None
+
+
+def infer_extract_posts(root, limit: int = 3) -> List[Dict]:
+    candidates = []
+    for parent, items in _repeated_runs(root):
+        url_paths, date_paths = [], []
+        for item in items:
+            link, date = _title_link(item), _date_element(item)
+            url_paths.append(_relative_path(item, link) if link is not None else None)
+            date_paths.append(_relative_path(item, date) if date is not None else None)
+
+        url_path, date_path = _most_common_path(url_paths), _most_common_path(date_paths)
+        if not url_path or not date_path:
+            continue
+
+        item_step = _css_step(items[0])
+        parent_id = _stable_id(parent)
+        item_path = f"#{parent_id} > {item_step}" if parent_id else f"{_css_step(parent)} > {item_step}"
+        if _count(root, "css selector", item_path) < len(items):
+            continue
+
+        # more posts with more text make a more likely result list
+        score = len(items) + min(sum(len(element_text(item)) for item in items) // 500, 20)
+        candidates.append((score, {
+            "blog_item": {"selector": "css selector", "value": item_path},
+            "blog_date": {"selector": "css selector", "value": date_path},
+            "blog_url": {"selector": "css selector", "value": url_path},
+        }))
+    return _dedupe(candidates, limit)
+
+
+def _container_xpath(container) -> str | None:
+    container_id = _stable_id(container)
+    if container_id:
+        return f"//*[@id='{container_id}']"
+    classes = _stable_classes(container)
+    if classes:
+        return f"//{container.tag}[contains(concat(' ', normalize-space(@class), ' '), ' {classes[0]} ')]"
+    return None
+
+
+def infer_next_page_button(root, limit: int = 3) -> List[Dict]:
+    candidates = []
+    # numbered links of a pager, e.g. <a>2</a> <a>3</a>: the value holds {page_num}
+    for parent, items in _repeated_runs(root):
+        links = [link for item in items for link in ([item] if item.tag == "a" else item.iter("a"))]
+        numbers = [link for link in links if element_text(link).isdigit()]
+        if len(numbers) < 2:
+            continue
+        container_xpath = _container_xpath(parent)
+        if not container_xpath and parent.getparent() is not None:
+            container_xpath = _container_xpath(parent.getparent())
+        if not container_xpath:
+            continue
+        value = container_xpath + "//a[normalize-space(.)='{page_num}']"
+        if _count(root, "xpath", value.format(page_num=2)) == 1:
+            candidates.append((10 + len(numbers), {"next_page_button": {"selector": "xpath", "value": value}}))
+
+    # a "next" link, clicked once per page
+    for link in root.iter("a"):
+        if link.get("rel") == "next" and _count(root, "css selector", "a[rel=next]") == 1:
+            candidates.append((8, {"next_page_button": {"selector": "css selector", "value": "a[rel=next]"}}))
+        text = element_text(link)
+        if NEXT_PATTERN.match(text) and _count(root, "link text", text) == 1:
+            candidates.append((6, {"next_page_button": {"selector": "link text", "value": text}}))
+    return _dedupe(candidates, limit)
+
+
+def infer_sort(root, limit: int = 3) -> List[Dict]:
+    candidates = []
+    # a native <select> with a date option
+    for select in root.iter("select"):
+        options = [option for option in select.iter("option") if DATE_SORT_PATTERN.search(element_text(option))]
+        locator = _locate(root, select)
+        if not options or not locator:
+            continue
+        option_text = element_text(options[0])
+        if "'" in option_text:
+            continue
+        select_xpath = _container_xpath(select) or f"//select[@name='{select.get('name')}']"
+        score = 10 if SORT_PATTERN.search(" ".join([select.get("id", ""), select.get("name", ""),
+                                                     select.get("class", "")])) else 6
+        candidates.append((score, {
+            "sort_dropdown": {"selector": locator[0], "value": locator[1]},
+            "sort_date_option": {"selector": "xpath",
+                                 "value": f"{select_xpath}/option[normalize-space(.)='{option_text}']"},
+        }))
+
+    # a menu opened by a toggle, e.g. <div class="sort"><button>Relevance</button><ul><li><a>Newest</a>
+    for option in root.iter("a", "li", "button", "span"):
+        option_text = element_text(option)
+        if not option_text or len(option_text) > 20 or "'" in option_text \
+                or not DATE_SORT_PATTERN.search(option_text):
+            continue
+        menu = next((ancestor for ancestor in list(option.iterancestors())[:4]
+                     if SORT_PATTERN.search(" ".join([ancestor.get("id", ""), ancestor.get("class", "")]))), None)
+        if menu is None:
+            continue
+        toggle = next((element for element in menu.iter("button", "a", "span")
+                       if option_text not in element_text(element)), menu)
+        toggle_locator, menu_xpath = _locate(root, toggle), _container_xpath(menu)
+        if not toggle_locator or not menu_xpath:
+            continue
+        candidates.append((5 if option.tag in ("a", "button") else 4, {
+            "sort_dropdown": {"selector": toggle_locator[0], "value": toggle_locator[1]},
+            "sort_date_option": {"selector": "xpath",
+                                 "value": f"{menu_xpath}//{option.tag}[normalize-space(.)='{option_text}']"},
+        }))
+    return _dedupe(candidates, limit)
+
+
+# keyed by the dom_focus of the agents
+INFERENCES: Dict[str, Callable] = {
+    "search": infer_search_bar,
+    "extract": infer_extract_posts,
+    "pager": infer_next_page_button,
+    "sort": infer_sort,
+}
+
+
+def infer_selectors(html: str, focus: str, limit: int = 3) -> List[Dict]:
+    """Candidate selectors for the agent focus ("search", "extract", "pager" or "sort"), best first."""
+    if not html or focus not in INFERENCES:
+        return []
+    try:
+        return INFERENCES[focus](parse_html(html), limit=limit)
+    except Exception as e:
+        print(f"⚠️ Selector inference failed: {e}")
+        return []
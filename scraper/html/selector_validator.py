@@ -0,0 +1,130 @@
+import time
+from typing import Dict, List
+
+from scraper.tools.date_parser import parse_date
+from .static_selector import parse_html, find_static, element_text, element_href
+
+"""
+Checks candidate selectors against a captured snapshot of the page with lxml, without a
+browser: the same (selector, value) pairs Selenium uses ("id", "name", "xpath", "css selector",
+"class name", "link text", "tag name") are evaluated on the static DOM, and the check reports
+how many elements each component matches and a few sample values, in milliseconds.
+
+A candidate that fails here would fail in Selenium too, so the agents only confirm the
+candidates that pass with a live browser. Components that only exist after an interaction
+(the options of a sort menu that opens on click) are reported, but do not fail the check.
+"""
+
+SAMPLE_SIZE = 3
+MIN_POST_SHARE = 0.5  # share of the blog items that must have a URL and a date
+CLICKABLE_TAGS = {"a", "button", "input", "select", "option", "li", "span", "label"}
+
+
+def _find(root, component: Dict) -> List:
+    selector, value = component.get("selector"), component.get("value")
+    if not selector or not value or "none" in (selector, value):
+        raise ValueError(f"no selector given ({selector}, {value})")
+    return find_static(root, selector, value)
+
+
+def _describe(element) -> str:
+    attributes = " ".join(f'{name}="{element.get(name)}"' for name in ("id", "name", "type", "href")
+                          if element.get(name))
+    return f"<{element.tag}{' ' + attributes if attributes else ''}> {element_text(element)[:40]}".strip()
+
+
+def _check_search(root, selectors: Dict, report: Dict):
+    fields = _find(root, selectors["search_bar"])
+    report["matches"]["search_bar"] = len(fields)
+    report["samples"] = [_describe(field) for field in fields[:SAMPLE_SIZE]]
+    if not fields:
+        return "search_bar matches no element"
+    field = fields[0]
+    if field.tag not in ("input", "textarea") and field.get("contenteditable") != "true":
+        return f"search_bar matches a <{field.tag}>, where no keyword can be typed"
+    if (field.get("type") or "text").lower() in ("hidden", "submit", "button", "checkbox", "radio"):
+        return f"search_bar matches an input of type {field.get('type')}"
+    return ""
+
+
+def _check_extract(root, selectors: Dict, report: Dict):
+    items = _find(root, selectors["blog_item"])
+    report["matches"]["blog_item"] = len(items)
+    if not items:
+        return "blog_item matches no element"
+
+    with_url, with_date = 0, 0
+    for item in items:
+        urls = _find(item, selectors["blog_url"])
+        dates = _find(item, selectors["blog_date"])
+        url = element_href(urls[0]) if urls else None
+        date_text = element_text(dates[0]) if dates else None
+        date = parse_date(date_text) if date_text else None
+        with_url += bool(url)
+        with_date += date is not None
+        if len(report["samples"]) < SAMPLE_SIZE:
+            report["samples"].append({"url": url, "date_text": date_text, "date": date})
+    report["matches"]["blog_url"] = with_url
+    report["matches"]["blog_date"] = with_date
+
+    if with_url < MIN_POST_SHARE * len(items):
+        return f"blog_url finds no link with an href in {len(items) - with_url} of {len(items)} blog items"
+    if with_date < MIN_POST_SHARE * len(items):
+        return f"blog_date finds no readable date in {len(items) - with_date} of {len(items)} blog items"
+    return ""
+
+
+def _check_pager(root, selectors: Dict, report: Dict):
+    button = dict(selectors["next_page_button"])
+    button["value"] = button.get("value", "").replace("{page_num}", "2")
+    elements = _find(root, button)
+    report["matches"]["next_page_button"] = len(elements)
+    report["samples"] = [_describe(element) for element in elements[:SAMPLE_SIZE]]
+    if not elements:
+        return "next_page_button matches no element for page 2"
+    element = elements[0]
+    if element.tag not in CLICKABLE_TAGS and not element.get("onclick") and not element.get("href"):
+        return f"next_page_button matches a <{element.tag}>, which is not clickable"
+    return ""
+
+
+def _check_sort(root, selectors: Dict, report: Dict):
+    dropdowns = _find(root, selectors["sort_dropdown"])
+    report["matches"]["sort_dropdown"] = len(dropdowns)
+    if not dropdowns:
+        return "sort_dropdown matches no element"
+    options = _find(root, selectors["sort_date_option"])
+    report["matches"]["sort_date_option"] = len(options)
+    report["samples"] = [_describe(element) for element in (dropdowns[:1] + options[:SAMPLE_SIZE - 1])]
+    if not options:
+        # menus are often rendered when the dropdown opens: leave it to the live check
+        report["warnings"].append("sort_date_option matches no element before the dropdown is opened")
+    return ""
+
+
+# keyed by the dom_focus of the agents
+CHECKS = {
+    "search": _check_search,
+    "extract": _check_extract,
+    "pager": _check_pager,
+    "sort": _check_sort,
+}
+
+
+def check_selectors(html_or_root, focus: str, selectors: Dict) -> Dict:
+    """Check the selectors of an agent ("search", "extract", "pager" or "sort") on a page snapshot.
+    Returns {"ok", "error", "matches", "samples", "warnings", "milliseconds"}."""
+    if focus not in CHECKS:
+        raise ValueError(f"Unknown focus: {focus}")
+    start = time.perf_counter()
+    report = {"ok": False, "error": "", "matches": {}, "samples": [], "warnings": []}
+    try:
+        root = parse_html(html_or_root) if isinstance(html_or_root, str) else html_or_root
+        report["error"] = CHECKS[focus](root, selectors, report)
+    except KeyError as e:
+        report["error"] = f"missing component {e}"
+    except Exception as e:
+        report["error"] = f"invalid selector: {e}"
+    report["ok"] = not report["error"]
+    report["milliseconds"] = round((time.perf_counter() - start) * 1000, 2)
+    return report
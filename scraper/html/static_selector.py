@@ -0,0 +1,35 @@
+from typing import List
+
+import lxml.html
+from lxml.cssselect import CSSSelector
+from lxml.etree import XPath
+
+from .locators import compile_locator
+
+"""
+Evaluates the Selenium (selector, value) pairs from the knowledge files against static
+HTML with lxml, so we can check learned selectors without a browser.
+"""
+
+
+def parse_html(html: str, base_url: str = None):
+    root = lxml.html.fromstring(html)
+    if base_url:
+        root.make_links_absolute(base_url, resolve_base_href=True)
+    return root
+
+
+def find_static(root, selector: str, value: str) -> List:
+    """Same lookup as driver.find_elements(by=selector, value=value), on an lxml tree or element."""
+    locator = compile_locator(selector, value)
+    if locator["kind"] == "css":
+        return CSSSelector(locator["query"])(root)
+    return [node for node in XPath(locator["query"])(root) if hasattr(node, "tag")]
+
+
+def element_text(element) -> str:
+    return " ".join(element.text_content().split())
+
+
+def element_href(element) -> str | None:
+    return element.get("href")
@@ -1 +1,2 @@
-from .knowledge_base import KnowledgeBase
\ No newline at end of file
+from .knowledge_base import KnowledgeBase
+from .knowledge_store import KnowledgeStore, get_knowledge_store, normalize_domain, site_key
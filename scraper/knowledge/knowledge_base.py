@@ -1,67 +1,48 @@
-import os
-import json
-from pathlib import Path
-from typing import Dict
+from typing import Dict, List
+
+from .knowledge_store import KnowledgeStore, get_knowledge_store
 
 """
-This class manages storage and retrieval of the HTML tags of a website for data scraping. 
-Stores the tags in JSON files in the /websites folder
+This class manages storage and retrieval of the HTML tags of a website for data scraping,
+together with per-website settings (e.g. the browser profile allowlist).
+The knowledge lives in a SQLite store (knowledge_store.py) indexed by normalized domain:
+section merges are atomic, reads are cached until the website changes, and every saved
+section is versioned so that a previous selector set can be rolled back. The JSON files
+of the /websites folder are imported into the store on first use.
 """
 
-knowledge_base_path = Path("./scraper/knowledge/websites")
-url_character_mapping_table = {
-    "/": "_",
-    ":": "_",
-    ".": "_",
-}
-
 
 class KnowledgeBase:
-    def __init__(self, url: str = None):
-        self.knowledge_base_path = knowledge_base_path
+    def __init__(self, url: str = None, store: KnowledgeStore = None):
+        self.store = store or get_knowledge_store()
         self.url = url
 
-    def _url_to_file_path(self, url: str = None) -> Path:
-        if url.endswith("/"):
-            url = url[:-1]
-        for character, replacement in url_character_mapping_table.items():
-            url = url.replace(character, replacement)
-        
-        file_path = self.knowledge_base_path / f"{url}.json"
-        print(f"\n 🔎Looking for knowledge file at: {file_path}")
-        # changed to save files
-        return file_path
-
     def search_knowledge(self) -> Dict | None:
-        file_path = self._url_to_file_path(self.url)
-        print("🔗File path: ", file_path)
-        if os.path.exists(file_path):
-            with open(file_path, "r", encoding='utf-8') as file:
-                print(f"\n✅ Knowledge found for URL: {self.url}")
-                return json.load(file)
+        knowledge = self.store.get(self.url)
+        if knowledge and knowledge["sections"]:
+            print(f"\n✅ Knowledge found for URL: {self.url}")
+            return knowledge
         print(f"\n❗No knowledge found for URL: {self.url}")
         return None
 
     def save_knowledge(self, new_url: str, knowledge_dict: Dict):
-        file_path = self._url_to_file_path(url=new_url)
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-
-        # Load existing knowledge if present
-        if file_path.exists():
-            with open(file_path, "r") as file:
-                existing_data = json.load(file)
-        else:
-            existing_data = {"url": new_url, "sections": {}}
-
-        # Merge knowledge correctly to prevent overwriting
-        for section, data in knowledge_dict.items():
-            if section in existing_data["sections"]:
-                existing_data["sections"][section].update(data)  # Merge
-            else:
-                existing_data["sections"][section] = data  # Add new section
-
-        # Save back to file
-        with open(file_path, "w") as file:
-            json.dump(existing_data, file, indent=4)
-
-        print(f"✅ Knowledge successfully saved for URL: {new_url}")
+        # the components of each section are merged into the saved ones, in one transaction;
+        # a None component is removed
+        version = self.store.merge_sections(new_url, knowledge_dict)
+        print(f"✅ Knowledge successfully saved for URL: {new_url} (version {version})")
+
+    def get_setting(self, name: str, default=None):
+        """Read a website setting (e.g. its browser profile allowlist) stored next to the selectors."""
+        return self.store.get_setting(self.url, name, default)
+
+    def save_setting(self, new_url: str, name: str, value):
+        self.store.save_setting(new_url, name, value)
+        print(f"✅ Setting '{name}' successfully saved for URL: {new_url}")
+
+    def history(self, section: str, url: str = None) -> List[Dict]:
+        """Saved versions of a section of the website, newest first."""
+        return self.store.history(url or self.url, section)
+
+    def rollback(self, section: str, version: int = None, url: str = None) -> Dict:
+        """Restore a previous version of a section (by default the one before the current one)."""
+        return self.store.rollback(url or self.url, section, version)
@@ -0,0 +1,325 @@
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+"""
+SQLite backend of the knowledge base. Every website is a row keyed by its normalized
+address (lowercase host without "www." and default port, plus the path), with one row
+per section of selectors and per setting. The sections are read and written with the
+home URL of the website; a setting can also be read or written with any page of a known
+website, e.g. one of its result pages (site_key_for):
+
+- A section merge (or a setting write) is one IMMEDIATE transaction, so concurrent agents,
+  threads and processes never lose each other's updates.
+- Every section write bumps the version of the website; the sections are served from an
+  in-process cache as long as the version in the database has not changed. Settings are
+  small and written on every scrape (e.g. the selector health), so they are read from the
+  database and do not bump the version.
+- Each saved section is kept in the history, so a previous selector set can be rolled back.
+- The JSON files of the websites folder are imported the first time the store is opened.
+
+The database is knowledge.sqlite next to this module, or the path in the KNOWLEDGE_STORE
+environment variable.
+"""
+
+KNOWLEDGE_DIR = Path(__file__).parent
+DEFAULT_STORE_PATH = KNOWLEDGE_DIR / "knowledge.sqlite"
+JSON_KNOWLEDGE_DIR = KNOWLEDGE_DIR / "websites"
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_domain(url: str) -> str:
+    """https://WWW.Mobile01.com:443/x -> mobile01.com"""
+    parts = urlsplit(url if "//" in url else f"//{url}")
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port != DEFAULT_PORTS.get(parts.scheme):
+        host = f"{host}:{parts.port}"
+    return host
+
+
+def site_key(url: str) -> str:
+    """The website a URL belongs to: its normalized domain and path, e.g. mobile01.com or example.com/forum"""
+    path = urlsplit(url if "//" in url else f"//{url}").path.rstrip("/")
+    return normalize_domain(url) + path
+
+
+class KnowledgeStore:
+    def __init__(self, path: str | Path = None, json_dir: str | Path = None):
+        self.path = Path(path) if path else DEFAULT_STORE_PATH
+        self.json_dir = Path(json_dir) if json_dir else JSON_KNOWLEDGE_DIR
+        self._local = threading.local()
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = self._connection()
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS sites (
+                key TEXT PRIMARY KEY,
+                domain TEXT NOT NULL,
+                url TEXT NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS sites_domain ON sites (domain);
+            CREATE TABLE IF NOT EXISTS sections (
+                site TEXT NOT NULL,
+                name TEXT NOT NULL,
+                data TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (site, name)
+            );
+            CREATE TABLE IF NOT EXISTS section_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                site TEXT NOT NULL,
+                name TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                saved_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS section_history_site ON section_history (site, name, version);
+            CREATE TABLE IF NOT EXISTS settings (
+                site TEXT NOT NULL,
+                name TEXT NOT NULL,
+                value TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (site, name)
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        self.import_json()
+
+    def site_key_for(self, url: str) -> str:
+        """The key of the known website a URL belongs to: the longest known site key that the
+        URL's address starts with (example.com/forum for example.com/forum/search?q=x), or the
+        site_key of the URL for a new website."""
+        key = site_key(url)
+        rows = self._connection().execute("SELECT key FROM sites WHERE domain = ?", (normalize_domain(url),))
+        known = [site for site, in rows if key == site or key.startswith(site + "/")]
+        return max(known, key=len) if known else key
+
+    def _connection(self) -> sqlite3.Connection:
+        # one connection per thread; transactions are opened explicitly
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _transaction(self):
+        """BEGIN IMMEDIATE takes the write lock up front, so a read-modify-write cannot interleave."""
+        store = self
+
+        class Transaction:
+            def __enter__(self):
+                self.connection = store._connection()
+                self.connection.execute("BEGIN IMMEDIATE")
+                return self.connection
+
+            def __exit__(self, exc_type, exc_value, traceback):
+                self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+
+        return Transaction()
+
+    @staticmethod
+    def _touch_site(connection, key: str, url: str, now: float, bump: bool = True) -> int:
+        """Create the website row if needed and bump its version. Returns the new version."""
+        connection.execute(
+            "INSERT INTO sites (key, domain, url, version, updated_at) VALUES (?, ?, ?, 0, ?) "
+            "ON CONFLICT (key) DO NOTHING",
+            (key, normalize_domain(url), url, now),
+        )
+        if bump:
+            connection.execute("UPDATE sites SET version = version + 1, updated_at = ? WHERE key = ?", (now, key))
+        return connection.execute("SELECT version FROM sites WHERE key = ?", (key,)).fetchone()[0]
+
+    @staticmethod
+    def _write_section(connection, key: str, name: str, data: Dict, version: int, now: float):
+        serialized = json.dumps(data, ensure_ascii=False)
+        connection.execute(
+            "INSERT OR REPLACE INTO sections (site, name, data, version, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (key, name, serialized, version, now),
+        )
+        connection.execute(
+            "INSERT INTO section_history (site, name, version, data, saved_at) VALUES (?, ?, ?, ?, ?)",
+            (key, name, version, serialized, now),
+        )
+
+    # reads
+
+    def site_version(self, url: str) -> int | None:
+        row = self._connection().execute("SELECT version FROM sites WHERE key = ?", (site_key(url),)).fetchone()
+        return row[0] if row else None
+
+    def get(self, url: str) -> Dict | None:
+        """{"url", "sections", "settings"} of the website, or None when nothing is known about it."""
+        key = site_key(url)
+        connection = self._connection()
+        row = connection.execute("SELECT url, version FROM sites WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        site_url, version = row
+
+        with self._cache_lock:
+            cached = self._cache.get(key)
+        if cached and cached[0] == version:
+            sections = cached[1]
+        else:
+            sections = {name: json.loads(data) for name, data in
+                        connection.execute("SELECT name, data FROM sections WHERE site = ?", (key,))}
+            with self._cache_lock:
+                self._cache[key] = (version, sections)
+
+        settings = {name: json.loads(value) for name, value in
+                    connection.execute("SELECT name, value FROM settings WHERE site = ?", (key,))}
+        return {"url": site_url, "sections": copy.deepcopy(sections), "settings": settings}
+
+    def get_setting(self, url: str, name: str, default=None):
+        """A setting of the website of url, which may be any page of the website."""
+        row = self._connection().execute(
+            "SELECT value FROM settings WHERE site = ? AND name = ?", (self.site_key_for(url), name)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def sites_for_domain(self, domain: str) -> List[str]:
+        """URLs of the known websites of a domain, e.g. the forums of a host."""
+        rows = self._connection().execute(
+            "SELECT url FROM sites WHERE domain = ? ORDER BY key", (normalize_domain(domain),))
+        return [url for url, in rows]
+
+    def history(self, url: str, section: str) -> List[Dict]:
+        """Saved versions of a section, newest first."""
+        rows = self._connection().execute(
+            "SELECT version, data, saved_at FROM section_history WHERE site = ? AND name = ? ORDER BY version DESC",
+            (site_key(url), section),
+        )
+        return [{"version": version, "data": json.loads(data), "saved_at": saved_at}
+                for version, data, saved_at in rows]
+
+    # writes
+
+    def merge_sections(self, url: str, sections: Dict[str, Dict]) -> int:
+        """Merge the components of each section into the stored ones, atomically; a None component
+        is removed from the section. Returns the new version."""
+        key, now = site_key(url), time.time()
+        with self._transaction() as connection:
+            version = self._touch_site(connection, key, url, now)
+            for name, data in sections.items():
+                row = connection.execute(
+                    "SELECT data FROM sections WHERE site = ? AND name = ?", (key, name)).fetchone()
+                merged = json.loads(row[0]) if row else {}
+                for component, value in data.items():
+                    if value is None:
+                        merged.pop(component, None)
+                    else:
+                        merged[component] = value
+                self._write_section(connection, key, name, merged, version, now)
+        return version
+
+    def save_setting(self, url: str, name: str, value) -> int:
+        key, now = self.site_key_for(url), time.time()
+        with self._transaction() as connection:
+            # settings are not cached, so the cached sections stay valid
+            version = self._touch_site(connection, key, url, now, bump=False)
+            connection.execute(
+                "INSERT OR REPLACE INTO settings (site, name, value, updated_at) VALUES (?, ?, ?, ?)",
+                (key, name, json.dumps(value, ensure_ascii=False), now),
+            )
+        return version
+
+    def rollback(self, url: str, section: str, version: int = None) -> Dict:
+        """Restore a previous version of a section (by default the one before the current one),
+        saved as a new version. Returns the restored section."""
+        key, now = site_key(url), time.time()
+        with self._transaction() as connection:
+            current = connection.execute(
+                "SELECT version FROM sections WHERE site = ? AND name = ?", (key, section)).fetchone()
+            if current is None:
+                raise KeyError(f"No {section} saved for {url}")
+            if version is None:
+                row = connection.execute(
+                    "SELECT data, version FROM section_history WHERE site = ? AND name = ? AND version < ? "
+                    "ORDER BY version DESC LIMIT 1", (key, section, current[0])).fetchone()
+            else:
+                row = connection.execute(
+                    "SELECT data, version FROM section_history WHERE site = ? AND name = ? AND version = ?",
+                    (key, section, version)).fetchone()
+            if row is None:
+                raise KeyError(f"No earlier version of {section} saved for {url}")
+
+            data = json.loads(row[0])
+            new_version = self._touch_site(connection, key, url, now)
+            self._write_section(connection, key, section, data, new_version, now)
+        print(f"↩️ Rolled back {section} of {url} to version {row[1]}")
+        return data
+
+    def delete(self, url: str):
+        key = site_key(url)
+        with self._transaction() as connection:
+            for table, column in (("sections", "site"), ("section_history", "site"),
+                                  ("settings", "site"), ("sites", "key")):
+                connection.execute(f"DELETE FROM {table} WHERE {column} = ?", (key,))
+        with self._cache_lock:
+            self._cache.pop(key, None)
+
+    def import_json(self):
+        """Import the JSON knowledge files once; websites already in the store are kept as they are."""
+        connection = self._connection()
+        if connection.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone():
+            return
+
+        imported = 0
+        with self._transaction() as connection:
+            if connection.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone():
+                return
+            for file_path in sorted(self.json_dir.glob("*.json")) if self.json_dir.exists() else []:
+                try:
+                    data = json.loads(file_path.read_text(encoding="utf-8"))
+                    url = data["url"]
+                except (ValueError, KeyError) as e:
+                    print(f"⚠️ Skipping knowledge file {file_path.name}: {e}")
+                    continue
+                key = site_key(url)
+                if connection.execute("SELECT 1 FROM sites WHERE key = ?", (key,)).fetchone():
+                    continue
+
+                now = file_path.stat().st_mtime
+                version = self._touch_site(connection, key, url, now)
+                for name, section in data.get("sections", {}).items():
+                    self._write_section(connection, key, name, section, version, now)
+                for name, value in data.get("settings", {}).items():
+                    connection.execute(
+                        "INSERT OR REPLACE INTO settings (site, name, value, updated_at) VALUES (?, ?, ?, ?)",
+                        (key, name, json.dumps(value, ensure_ascii=False), now),
+                    )
+                imported += 1
+            connection.execute("INSERT INTO meta (key, value) VALUES ('json_imported', ?)", (str(time.time()),))
+
+        if imported:
+            print(f"📥 Imported {imported} knowledge files from {self.json_dir}")
+
+
+_shared_stores = {}
+_shared_stores_lock = threading.Lock()
+
+
+def get_knowledge_store(path: str | Path = None, **store_kwargs) -> KnowledgeStore:
+    """One store per database path in the process, so that its read cache is shared."""
+    path = Path(path or os.getenv("KNOWLEDGE_STORE") or DEFAULT_STORE_PATH).resolve()
+    with _shared_stores_lock:
+        if path not in _shared_stores:
+            _shared_stores[path] = KnowledgeStore(path, **store_kwargs)
+        return _shared_stores[path]
@@ -1 +1,2 @@
-from .memory import Memory
\ No newline at end of file
+from .memory import Memory, compress_error
+from .failure_store import FailureStore, get_failure_store
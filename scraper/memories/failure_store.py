@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+"""
+Persistent store of the failed selector candidates of the agents, keyed by website, agent
+focus ("search", "sort", "extract", "pager") and page fingerprint (the structure of the page
+the candidates failed on, see memory.py). A candidate failing again with the same
+(compressed) error only bumps its count, so the store holds one row per distinct
+selector/error pair. Failures older than max_age_days are ignored, since websites change.
+
+The database is failures.sqlite next to this module, or the path in the
+FAILURE_MEMORY_STORE environment variable.
+"""
+
+DEFAULT_STORE_PATH = Path(__file__).parent / "failures.sqlite"
+
+
+class FailureStore:
+    def __init__(self, path: str | Path = None, max_age_days: float = 30):
+        self.path = Path(path) if path else DEFAULT_STORE_PATH
+        self.max_age_seconds = max_age_days * 24 * 60 * 60
+        self._local = threading.local()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as connection:
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(failures)")]
+            if columns and "page" not in columns:
+                # failures stored before they were scoped to a page: they may not apply anymore
+                connection.execute("DROP TABLE failures")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS failures (
+                    site TEXT NOT NULL,
+                    focus TEXT NOT NULL,
+                    page TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    error TEXT NOT NULL,
+                    candidate TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL,
+                    PRIMARY KEY (site, focus, page, fingerprint, error)
+                )""")
+
+    def _connection(self) -> sqlite3.Connection:
+        # one connection per thread; SQLite serializes the writers across threads and processes
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def record(self, site: str, focus: str, page: str, fingerprint: str, candidate: str, error: str):
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT INTO failures (site, focus, page, fingerprint, error, candidate, count, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?) "
+                "ON CONFLICT (site, focus, page, fingerprint, error) DO UPDATE SET count = count + 1, last_seen = ?",
+                (site, focus, page, fingerprint, error, candidate, now, now, now),
+            )
+
+    def failures(self, site: str, focus: str, page: str) -> List[Dict]:
+        """The recent failures of a website, focus and page fingerprint, most recent first."""
+        rows = self._connection().execute(
+            "SELECT fingerprint, candidate, error, count, last_seen FROM failures "
+            "WHERE site = ? AND focus = ? AND page = ? AND last_seen > ? ORDER BY last_seen DESC, count DESC",
+            (site, focus, page, time.time() - self.max_age_seconds),
+        )
+        return [{"fingerprint": fingerprint, "candidate": candidate, "error": error, "count": count,
+                 "last_seen": last_seen} for fingerprint, candidate, error, count, last_seen in rows]
+
+    def known_failure(self, site: str, focus: str, page: str, fingerprint: str) -> str | None:
+        row = self._connection().execute(
+            "SELECT error FROM failures WHERE site = ? AND focus = ? AND page = ? AND fingerprint = ? AND last_seen > ? "
+            "ORDER BY last_seen DESC LIMIT 1",
+            (site, focus, page, fingerprint, time.time() - self.max_age_seconds),
+        ).fetchone()
+        return row[0] if row else None
+
+    def clear(self, site: str, focus: str):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM failures WHERE site = ? AND focus = ?", (site, focus))
+
+
+_shared_stores = {}
+_shared_stores_lock = threading.Lock()
+
+
+def get_failure_store(path: str | Path = None, **store_kwargs) -> FailureStore:
+    path = Path(path or os.getenv("FAILURE_MEMORY_STORE") or DEFAULT_STORE_PATH).resolve()
+    with _shared_stores_lock:
+        if path not in _shared_stores:
+            _shared_stores[path] = FailureStore(path, **store_kwargs)
+        return _shared_stores[path]
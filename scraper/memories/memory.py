@@ -1,35 +1,179 @@
-from typing import List
+import hashlib
+import json
+import re
+from typing import Callable, Dict, List
+
+from scraper.html import parse_html
+from scraper.knowledge import site_key
+from .failure_store import FailureStore, get_failure_store
+
 """
 memory.py
 
 This class tracks failed experiences during the HTML Inspection of LLM Agents.
 
-Entirely Developed by another Software Engineer
+Once bound to a website and an agent focus, the failures are kept in a persistent store
+(failure_store.py), so the next inspection of the website starts from what already failed:
+identical selector/error pairs are kept once, Selenium errors are compressed to their error
+class, export_memory fits the failures into a token budget, and known_failure lets the
+agents reject a candidate before validating it.
 
+Stored failures are scoped to the layout of the inspected page (page_fingerprint), so
+they no longer apply once the website changes its layout. Transient errors (timeouts, stale
+elements) and failures not confirmed in the browser are only kept for the current run.
 """
 
+# Selenium error messages -> error class; the message adds nothing to the selectors already listed
+SELENIUM_ERRORS = [
+    (re.compile(r"no such element|unable to locate element|NoSuchElement", re.IGNORECASE), "NoSuchElementException"),
+    (re.compile(r"not clickable|click intercepted", re.IGNORECASE), "ElementClickInterceptedException"),
+    (re.compile(r"not interactable", re.IGNORECASE), "ElementNotInteractableException"),
+    (re.compile(r"stale element", re.IGNORECASE), "StaleElementReferenceException"),
+    (re.compile(r"invalid selector|InvalidSelector|not a valid (xpath|selector)", re.IGNORECASE), "InvalidSelectorException"),
+    (re.compile(r"timed? ?out|page load|still loading", re.IGNORECASE), "TimeoutException"),
+]
+# errors of a slow or changing page rather than of the selectors: not worth keeping across runs
+TRANSIENT_ERRORS = {"TimeoutException", "StaleElementReferenceException"}
+# classes numbered per item, e.g. thread-123, are not part of the layout
+PER_ITEM_CLASS = re.compile(r"\d{3,}")
+MAX_ERROR_LENGTH = 160
+
+
+def compress_error(error) -> str:
+    """Selenium errors become their error class; other errors keep their first line."""
+    text = str(error)
+    for pattern, error_class in SELENIUM_ERRORS:
+        if pattern.search(text):
+            return error_class
+    text = text.split("Stacktrace:")[0].split("(Session info:")[0].strip()
+    first_line = text.splitlines()[0] if text else ""
+    if isinstance(error, BaseException):
+        first_line = f"{type(error).__name__}: {first_line}" if first_line else type(error).__name__
+    return first_line[:MAX_ERROR_LENGTH]
+
+
+def candidate_fingerprint(candidate) -> str:
+    serialized = json.dumps(candidate, sort_keys=True, ensure_ascii=False) if isinstance(candidate, dict) else str(candidate)
+    return hashlib.sha1(serialized.encode("utf-8")).hexdigest()[:16]
+
+
+def page_fingerprint(html_content: str) -> str:
+    """Hash of the distinct tag/class signatures of a page: it ignores the texts, the ids
+    (often per post, e.g. post_98765) and the number of items, so it only changes with the
+    layout of the page."""
+    try:
+        root = parse_html(html_content)
+    except Exception:
+        return ""
+    signatures = set()
+    for element in root.iter():
+        if not isinstance(element.tag, str):
+            continue
+        classes = ".".join(sorted(
+            name for name in (element.get("class") or "").split() if not PER_ITEM_CLASS.search(name)))
+        signatures.add(f"{element.tag}.{classes}")
+    return hashlib.sha1("\n".join(sorted(signatures)).encode("utf-8")).hexdigest()[:16]
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 3)
+
+
 class Memory:
-    def __init__(self):
+    def __init__(self, site: str = None, focus: str = None, token_budget: int = 1500,
+                 count_tokens: Callable[[str], int] = None, store: FailureStore = None):
         self._failed_memories = []
+        self.site = site_key(site) if site else None
+        self.focus = focus
+        self.page = ""
+        self.token_budget = token_budget
+        self.count_tokens = count_tokens or _estimate_tokens
+        self._store = store
+
+    @property
+    def store(self) -> FailureStore | None:
+        if self.site is None:
+            return None
+        if self._store is None:
+            self._store = get_failure_store()
+        return self._store
+
+    def bind(self, site: str, focus: str):
+        """Keep the failures of this website and agent focus across runs."""
+        self.site, self.focus, self.page = site_key(site), focus, ""
+
+    def observe_page(self, html_content: str) -> None:
+        """Scope the stored failures to the structure of the inspected page."""
+        if html_content:
+            self.page = page_fingerprint(html_content)
+
+    def record_failure(self, candidate, error, persist: bool = True) -> None:
+        """Remember a failed candidate (selectors dict or free text) with its compressed error.
+        It is only stored for the next runs with persist and when the error is not transient."""
+        entry = {"candidate": candidate, "error": compress_error(error) if error else "",
+                 "fingerprint": candidate_fingerprint(candidate), "count": 1}
+        for existing in self._failed_memories:
+            if (existing["fingerprint"], existing["error"]) == (entry["fingerprint"], entry["error"]):
+                existing["count"] += 1
+                break
+        else:
+            self._failed_memories.append(entry)
+
+        if persist and entry["error"] not in TRANSIENT_ERRORS and self.store:
+            serialized = json.dumps(candidate, ensure_ascii=False) if isinstance(candidate, dict) else str(candidate)
+            self.store.record(self.site, self.focus, self.page, entry["fingerprint"], serialized, entry["error"])
 
     def append_memory(self, failed_memory: str) -> None:
-        self._failed_memories.append(failed_memory)
+        self.record_failure(failed_memory, "")
+
+    def known_failure(self, candidate) -> str | None:
+        """The error of a candidate that already failed for this website, if any."""
+        fingerprint = candidate_fingerprint(candidate)
+        for entry in self._failed_memories:
+            if entry["fingerprint"] == fingerprint:
+                return entry["error"] or "failed before"
+        if self.store:
+            error = self.store.known_failure(self.site, self.focus, self.page, fingerprint)
+            if error is not None:
+                return error or "failed before"
+        return None
+
+    def get_memory(self) -> List[Dict]:
+        """The failures of this run, followed by the earlier ones on the same page of the website, deduplicated."""
+        memories = list(self._failed_memories)
+        seen = {(entry["fingerprint"], entry["error"]) for entry in memories}
+        if self.store:
+            for entry in self.store.failures(self.site, self.focus, self.page):
+                if (entry["fingerprint"], entry["error"]) not in seen:
+                    memories.append(entry)
+        return memories
 
-    def get_memory(self) -> List[str]:
-        return self._failed_memories
-    
     def export_memory(self) -> str:
-        if not self._failed_memories:
+        memories = self.get_memory()
+        if not memories:
             return "There is no previous failed experience."
-        
-        failed_experiences = ""
-        for i, memory in enumerate(self._failed_memories, start=1):
-            # Note: The following cleaning processes are specific to the selenium unable to locate element error message
-            cleaned_memory = memory.split("Stacktrace:")[0]
-            cleaned_memory = cleaned_memory.split("(Session info:")[0].strip()
-            failed_experiences += f"{i}. {cleaned_memory}\n"
+
+        failed_experiences, used = "", 0
+        for i, memory in enumerate(memories, start=1):
+            candidate = memory["candidate"]
+            if isinstance(candidate, dict):
+                candidate = json.dumps(candidate, ensure_ascii=False)
+            line = f"{i}. {candidate}"
+            if memory["error"]:
+                line += f", error: {memory['error']}"
+            if memory["count"] > 1:
+                line += f" (failed {memory['count']} times)"
+            tokens = self.count_tokens(line) or _estimate_tokens(line)
+            if used + tokens > self.token_budget:
+                failed_experiences += f"... and {len(memories) - i + 1} older failed cases.\n"
+                break
+            failed_experiences += line + "\n"
+            used += tokens
 
         return failed_experiences
 
     def clear_memory(self) -> None:
-        self._failed_memories.clear()
\ No newline at end of file
+        """Forget the failures of this run, and the stored ones of the website and focus."""
+        self._failed_memories.clear()
+        if self.store:
+            self.store.clear(self.site, self.focus)
@@ -1,66 +1,59 @@
-from typing import Dict
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-import time
-import sys 
-
-from scraper.tools import SeleniumExtractPostsTool, SeleniumSearchKeywordTool, SeleniumSortResultsTool
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, Tuple
+
+from scraper.tools import SeleniumExtractPostsTool, SeleniumSearchKeywordTool, SeleniumSortResultsTool, PageFetcher
 from scraper.agents import SearchKeywordAgent, SortResultsAgent, ExtractResultsAgent, ChangePageAgent
 from scraper.knowledge import KnowledgeBase
+from scraper.checkpoints import CheckpointStore
+from scraper.errors import InspectionError
+from scraper.streaming import aiter_in_thread
+from scraper.async_runtime import get_blocking_executor, run_blocking
+from scraper.drivers import DriverPool, PageWaiter, get_driver_pool
+from scraper.selector_health import SelectorHealthChecker, DEFAULT_HEALTH_TTL
+from utils.metrics import get_metrics
 
 
 """This class automates web scraping by leveraging Selenium and AI-powered agents 
-    to inspect, search, sort, and extract relevant data from a website."""
+    to inspect, search, sort, and extract relevant data from a website.
+    Each scrape is traced as a "scrape" span with the spans of its stages nested inside
+    (see utils/metrics), and ends with a snapshot of the metrics in the JSON lines file."""
 
 class MarketScraper:
-    def __init__(self, home_url: str, keyword:str):
+    def __init__(self, home_url: str, keyword:str, driver_pool: DriverPool = None,
+                 health_ttl_seconds: float | None = DEFAULT_HEALTH_TTL):
         self.driver = None
         self.home_url = home_url
         self.keyword = keyword
-        
-
-    def init_driver(self):
+        self.driver_pool = driver_pool or get_driver_pool()
+        self.page_fetcher = PageFetcher(driver_pool=self.driver_pool)
+        # how long selector health checks stay valid; None skips them
+        self.health_ttl_seconds = health_ttl_seconds
 
-        user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 
-        options = Options()
-        options.add_argument(f'user-agent={user_agent}')
-        options.add_argument("--disable-gpu")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--window-size=1920,1080")
-        options.add_argument("--disable-software-rasterizer")
-        options.add_argument("--ignore-certificate-errors")
-        options.add_argument("--allow-running-insecure-content")
-        options.add_argument("--disable-blink-features=AutomationControlled")
-
-        #options.add_argument("--headless=new")
-       
-
-        self.driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()), options=options
-        )
-        print("Shared driver initialized.")
-        time.sleep(3)
+    def init_driver(self):
+        self.driver = self.driver_pool.checkout(site_url=self.home_url)
+        print("Shared driver checked out from the pool.")
 
-    def get_url(self, url: str):
-        self.driver.set_page_load_timeout(10)
-        try:
-            self.driver.get(url)
-        except:
-            self.driver.execute_script("window.stop();")
+    def get_url(self, url: str, driver=None):
+        driver = driver or self.driver
+        with get_metrics().span("page.load", url=url):
+            driver.set_page_load_timeout(10)
+            try:
+                driver.get(url)
+            except:
+                driver.execute_script("window.stop();")
+            self.driver_pool.record_page(driver)
+            PageWaiter(driver).network_idle()
 
     def close_driver(self):
-        time.sleep(2)
         if self.driver:
             try:
-                self.driver.quit()
-                print("\nShared driver closed successfully.")
+                self.driver_pool.checkin(self.driver)
+                print("\nShared driver returned to the pool.")
             except Exception as e:
-                print(f"\n⚠️Error closing shared driver: {e}")
-        time.sleep(2)
+                print(f"\n⚠️Error returning shared driver: {e}")
+            self.driver = None
 
     def get_tools(self, knowledge: Dict):
         """Initialize the Selenium tools by mapping the respective HTML tags from knowledge folder"""
@@ -81,20 +74,65 @@ class MarketScraper:
 
             # Initialize the tool and store it in the tools dictionary
 
-            tools[section_name] = tool_class(selectors=section_data)
+            if tool_class is SeleniumExtractPostsTool:
+                tools[section_name] = tool_class(selectors=section_data, driver_pool=self.driver_pool)
+            else:
+                tools[section_name] = tool_class(selectors=section_data)
            
         return tools
         
-    def inspect_html(self):
-        """Use LLM to inspect HTML tags for search, sort, extract, and change pages."""
-        search_agent = SearchKeywordAgent()
-        sort_agent = SortResultsAgent()
-        extract_agent = ExtractResultsAgent()
-        change_page_agent = ChangePageAgent()
+    def inspect_stage(self, name: str, agent, result_page_url: str) -> bool:
+        """Run one agent on its own pooled driver, opened on the result page."""
+        with get_metrics().span("agent.learn", agent=name) as span, \
+                self.driver_pool.driver(site_url=self.home_url) as driver:
+            self.get_url(result_page_url, driver=driver)
+            success = agent.learn(url=self.home_url, result_page_url=result_page_url, driver=driver)
+            span.set(success=success)
+
+        if success:
+            print(f"✅ [SUCCESS] {name} HTML tags successfully inspected.\n")
+        else:
+            print(f"⚠️ [ERROR] {name} HTML inspection failed. Human intervention required.")
+        return success
+
+    def run_stages(self, stages: Dict, result_page_url: str, concurrency: int = 3) -> bool:
+        """Run the agents of the result page concurrently, each on its own driver.
+        The caller must not hold a driver meanwhile, so that concurrent scrapes sharing the pool
+        cannot take every driver and wait for each other."""
+        # each stage holds a single driver: its agent captures the page HTML in it too
+        workers = min(concurrency, len(stages), self.driver_pool.size)
+        print(f"\n🔍 Inspecting HTML Tags for {', '.join(stages)} ({workers} at a time)...")
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # each stage runs in a copy of the current context, so its spans nest under the caller's
+            futures = {
+                name: executor.submit(contextvars.copy_context().run,
+                                      self.inspect_stage, name, agent, result_page_url)
+                for name, agent in stages.items()
+            }
+            results = {}
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    print(f"⚠️ [ERROR] {name} HTML inspection raised an error: {e}")
+                    results[name] = False
+        return all(results.values())
+
+    def inspect_html(self, concurrency: int = 3):
+        """Use LLM to inspect HTML tags for search, sort, extract, and change pages.
+        Once the result page is known, the sort, extract and change page agents only depend on
+        its URL, so they run concurrently, each on its own driver."""
+        search_agent = SearchKeywordAgent(driver_pool=self.driver_pool)
+        sort_agent = SortResultsAgent(driver_pool=self.driver_pool)
+        extract_agent = ExtractResultsAgent(driver_pool=self.driver_pool)
+        change_page_agent = ChangePageAgent(driver_pool=self.driver_pool)
 
         print("\n🔍 [STEP 1] Inspecting HTML Tags for Search...")
-        success, result_page_url = search_agent.learn(
-            url=self.home_url, keyword=self.keyword, driver=self.driver)
+        with get_metrics().span("agent.learn", agent="Searching") as span:
+            success, result_page_url = search_agent.learn(
+                url=self.home_url, keyword=self.keyword, driver=self.driver)
+            span.set(success=success)
 
         result_page_url = self.driver.current_url
         self.close_driver()
@@ -107,76 +145,69 @@ class MarketScraper:
         print("✅ [SUCCESS] Search HTML tags successfully inspected.")
         print(f" [INFO] Result Page URL: {result_page_url}\n")
 
-        print(" Initializing a new driver for the next steps...")
-        self.init_driver()
-        self.get_url(result_page_url)
-
-        print("\n Inspecting HTML Tags for Sorting...")
-        sort_success = sort_agent.learn(
-            url=self.home_url, result_page_url=result_page_url, driver=self.driver)
-
-        if not sort_success:
-            print(
-                "⚠️ [ERROR] Sorting HTML inspection failed. Human intervention required.")
-            return False
-
-        print("✅ [SUCCESS] Sorting HTML tags successfully inspected.\n")
-
-        print(" Inspecting HTML Tags for Extracting Results...")
-        extract_success = extract_agent.learn(
-            url=self.home_url, result_page_url=result_page_url, driver=self.driver)
-
-        if not extract_success:
-            print(
-                "⚠️ [ERROR] Extracting Results HTML inspection failed. Human intervention required.")
-            return False
-
-        print("✅ [SUCCESS] Extracting Results HTML tags successfully inspected.\n")
-
-        print("Inspecting HTML Tags for Changing Pages...")
-        change_page_success = change_page_agent.learn(
-            url=self.home_url, result_page_url=result_page_url, driver=self.driver)
-
-        if not change_page_success:
-            print(
-                "⚠️ [ERROR] Changing Pages HTML inspection failed. Human intervention required.")
+        self.remember_result_page(result_page_url)
+        stages = {
+            "Sorting": sort_agent,
+            "Extracting Results": extract_agent,
+            "Changing Pages": change_page_agent,
+        }
+        if not self.run_stages(stages, result_page_url, concurrency=concurrency):
             return False
 
-        print("✅ [SUCCESS] Changing Pages HTML tags successfully inspected.\n")
+        # keep a driver checked out on the home page, as after the other scrape steps
+        self.init_driver()
+        self.get_url(self.home_url)
 
         print(" [COMPLETED] HTML inspection process finished successfully!")
         return True
 
 
-    def extract_urls(self,tools,  time_range_days):
-
-        posts_urls = None
+    def iter_extracted_posts(self, tools, time_range_days, checkpoint: CheckpointStore = None,
+                             date_range: Tuple = None) -> Iterator[Dict]:
+        """Search, sort and yield each post of the result pages as soon as its page is parsed."""
+        metrics = get_metrics()
         # search
         if "search_section" in tools:
             search_function =  tools['search_section']
             print(f" Searching for {self.keyword}\n")
 
-            search_function(driver=self.driver, keyword= self.keyword)
+            with metrics.span("search"):
+                search_function(driver=self.driver, keyword= self.keyword)
 
         # initiate another driver for skipping captcha
         result_page_url = self.driver.current_url
 
         print(f"\nResult page url: {result_page_url}")
         self.close_driver()
+        self.remember_result_page(result_page_url)
+
+        # Decide once per website whether its result pages can be fetched without a browser
+        if "extract_posts_section" in tools and self.page_fetcher.get_fetch_mode(result_page_url) is None:
+            blog_selectors = {
+                component: tools['extract_posts_section'].selectors[component]
+                for component in ("blog_item", "blog_url", "blog_date")
+            }
+            self.page_fetcher.check_http(result_page_url, selectors=blog_selectors)
 
-        print(f"\nStarting a new driver for Sorting")
+        print(f"\nChecking out a fresh driver for Sorting")
         self.init_driver()
 
 
         self.get_url(result_page_url)
 
         # sort
+        sorted_by_date, sort_in_url = False, False
         if "sort_section" in tools:
 
             sort_function = tools['sort_section']
             print(f"\n🗃 Sorting results\n")
 
-            sort_function(driver=self.driver)
+            unsorted_url = self.driver.current_url
+            with metrics.span("sort") as span:
+                sorted_by_date, _ = sort_function(driver=self.driver)
+                # a sort that changes the URL is kept by the result pages opened by URL
+                sort_in_url = sorted_by_date and self.driver.current_url != unsorted_url
+                span.set(sorted_by_date=sorted_by_date, sort_in_url=sort_in_url)
 
         # extract results
         if "extract_posts_section" in tools:
@@ -184,53 +215,242 @@ class MarketScraper:
             extract_posts_function = tools['extract_posts_section']
             print(f"\n Extracting results\n")
 
-            # Call the tool's __call__ method directly
-            posts_data = extract_posts_function(
-                driver=self.driver,
-                time_range_days=time_range_days
-            )
-
-            posts_urls = [post_data['url'] for post_data in posts_data]
-
+            collected_posts = []
+            with metrics.span("extract") as span:
+                posts_count = 0
+                for post_data in extract_posts_function.iter_posts(
+                    driver=self.driver,
+                    time_range_days=time_range_days,
+                    page_fetcher=self.page_fetcher,
+                    checkpoint=checkpoint,
+                    date_range=date_range,
+                    sorted_by_date=sorted_by_date,
+                    sort_in_url=sort_in_url,
+                    # the pages fetched by URL check out their own drivers
+                    release_driver=self.close_driver
+                ):
+                    if checkpoint:
+                        collected_posts.append(post_data)
+                    posts_count += 1
+                    metrics.increment("posts_collected")
+                    span.set(posts=posts_count)
+                    yield post_data
+
+            # only a complete scrape moves the checkpoint forward, otherwise the posts
+            # left on the unread pages would be skipped by the next incremental scrape
+            if checkpoint:
+                checkpoint.update(collected_posts)
+                checkpoint.save()
+
+    def extract_urls(self,tools,  time_range_days, checkpoint: CheckpointStore = None, date_range: Tuple = None):
+        posts_urls = [
+            post_data['url'] for post_data in self.iter_extracted_posts(
+                tools, time_range_days, checkpoint=checkpoint, date_range=date_range)
+        ]
+        print(f"\n Total blogs collected: {len(posts_urls)}")
         return posts_urls
-    
-    def scrape(self, time_range_days=3):
-        """Manages and Executes the full scraping process, including knowledge retrieval, 
-        HTML inspection, and data extraction."""
 
-        print("Starting scraping.....")
+    def remember_result_page(self, result_page_url: str):
+        """Keep the URL of a result page of the website, to check its selectors at the next scrape."""
+        knowledge_base = KnowledgeBase(self.home_url)
+        if result_page_url and knowledge_base.get_setting("result_page_url") != result_page_url:
+            knowledge_base.save_setting(new_url=self.home_url, name="result_page_url", value=result_page_url)
+
+    def relearn(self, focuses, result_page_url: str | None) -> bool:
+        """Re-run only the agents of the broken parts of the knowledge. The shared driver is
+        returned to the pool while the other agents run, and is back on the home page afterwards."""
+        if "search" in focuses:
+            print("\n🔧 Re-learning the search selectors...")
+            success, _ = SearchKeywordAgent(driver_pool=self.driver_pool).learn(
+                url=self.home_url, keyword=self.keyword, driver=self.driver)
+            if not success:
+                return False
+            result_page_url = self.driver.current_url
+            self.remember_result_page(result_page_url)
+            self.get_url(self.home_url)
+
+        agents = {
+            "sort": ("Sorting", SortResultsAgent),
+            "extract": ("Extracting Results", ExtractResultsAgent),
+            "pager": ("Changing Pages", ChangePageAgent),
+        }
+        stages = {name: agent_class(driver_pool=self.driver_pool)
+                  for focus, (name, agent_class) in agents.items() if focus in focuses}
+        if not stages:
+            return True
+
+        self.close_driver()
+        try:
+            return self.run_stages(stages, result_page_url)
+        finally:
+            self.init_driver()
+            self.get_url(self.home_url)
+
+    def repair_knowledge(self, knowledge: Dict) -> Dict:
+        """Check the learned selectors on the current pages of the website (see selector_health.py)
+        and re-learn only the broken parts. The shared driver must be on the home page."""
+        if self.health_ttl_seconds is None:
+            return knowledge
+
+        checker = SelectorHealthChecker(self.home_url, ttl_seconds=self.health_ttl_seconds)
+        result_page_url = KnowledgeBase(self.home_url).get_setting("result_page_url")
+        left_home = []
+
+        def get_result_html():
+            # rendered in the shared driver, so that the scrape never holds two drivers
+            left_home.append(True)
+            return self.page_fetcher.browser_fetch_tool(url=result_page_url, driver=self.driver)
+
+        with get_metrics().span("health_check") as span:
+            results = checker.check(
+                knowledge,
+                get_home_html=lambda: self.driver.page_source,
+                get_result_html=get_result_html if result_page_url else None,
+            )
+            broken = checker.broken(results)
+            span.set(broken=broken)
+        if left_home:
+            self.get_url(self.home_url)
+        if not broken:
+            return knowledge
+
+        print(f"\n🩺 Broken selectors for: {', '.join(broken)}. Re-learning only these parts")
+        get_metrics().increment("selector_relearns", len(broken))
+        with get_metrics().span("relearn", focuses=broken):
+            relearned = self.relearn(broken, result_page_url)
+        if not relearned:
+            raise InspectionError(
+                f"Re-learning the {', '.join(broken)} selectors failed for {self.home_url}. "
+                "Human intervention required.")
+
+        knowledge = KnowledgeBase(self.home_url).search_knowledge()
+        checker.mark_healthy(knowledge, broken)
+        return knowledge
+
+    def load_knowledge(self, knowledge: Dict = None) -> Dict:
+        """Return the knowledge of the website, triggering the agents when there is none yet,
+        or only the agents of its broken parts when some selectors stopped working."""
+        if knowledge:
+            return self.repair_knowledge(knowledge)
 
-        self.init_driver()
-        self.get_url(self.home_url)
-        
         #Retrieve Knowledge
         knowledge_base = KnowledgeBase(self.home_url)
         knowledge = knowledge_base.search_knowledge()
-        if not knowledge:
-            print("\n There is no knowledge for this website.")
-            print(" Triggering agents to inspect the HTML")
-            
-            
+        if knowledge:
+            return self.repair_knowledge(knowledge)
+
+        print("\n There is no knowledge for this website.")
+        print(" Triggering agents to inspect the HTML")
+        
+        
+        with get_metrics().span("inspect_html"):
             inspect_success = self.inspect_html() 
-            if inspect_success == False:
-                print("⚠️[ERROR] Inspection failed! Human intervention required. Stopping execution.")
-                self.close_driver()  
-                sys.exit(1)  
+        if inspect_success == False:
+            print("⚠️[ERROR] Inspection failed! Human intervention required. Stopping execution.")
+            raise InspectionError(
+                f"HTML inspection failed for {self.home_url}. Human intervention required.")
 
-            print("\n ✅[SUCCESS] Successfuly learned all the HTML tags to scrape this website!")
+        print("\n ✅[SUCCESS] Successfuly learned all the HTML tags to scrape this website!")
 
         #Search Knowledge again after inspecting 
         knowledge = knowledge_base.search_knowledge()
+        return knowledge
 
-        print("\nUpdating knowledge and preparing the tools to scrape ")
-        tools = self.get_tools(knowledge)
-        print("\nScraping the website ")
-        posts_urls = self.extract_urls(tools= tools,
-             time_range_days=time_range_days)
-        print("\n ✅[SUCCESS] Finished Scraping the Website")
-        print(posts_urls)
+    def iter_posts(self, time_range_days=3, knowledge: Dict = None, incremental: bool = False,
+                   date_range: Tuple = None) -> Iterator[Dict]:
+        """Streaming version of scrape: yields each post record ({"url", "date"}) as soon as its
+        result page is parsed, so that the posts can be processed while the next pages load.
+        The result pages are only loaded as fast as the posts are consumed."""
 
-        self.close_driver()
+        print("Starting scraping.....")
+
+        metrics = get_metrics()
+        try:
+            with metrics.span("scrape", site=self.home_url, keyword=self.keyword):
+                self.init_driver()
+                try:
+                    self.get_url(self.home_url)
+                    with metrics.span("load_knowledge"):
+                        knowledge = self.load_knowledge(knowledge)
+
+                    print("\nUpdating knowledge and preparing the tools to scrape ")
+                    tools = self.get_tools(knowledge)
+                    print("\nScraping the website ")
+                    checkpoint = CheckpointStore(self.home_url, self.keyword) if incremental else None
+                    yield from self.iter_extracted_posts(tools= tools,
+                         time_range_days=time_range_days, checkpoint=checkpoint, date_range=date_range)
+                    print("\n ✅[SUCCESS] Finished Scraping the Website")
+
+                finally:
+                    self.close_driver()
+        finally:
+            metrics.write_snapshot(site=self.home_url, keyword=self.keyword)
+
+    def aiter_posts(self, time_range_days=3, knowledge: Dict = None, incremental: bool = False,
+                    date_range: Tuple = None, max_buffered: int = 20) -> AsyncIterator[Dict]:
+        """Async iterator over iter_posts. The scraping runs in a worker thread and pauses
+        when max_buffered posts are waiting for the consumer."""
+        return aiter_in_thread(
+            self.iter_posts(time_range_days=time_range_days, knowledge=knowledge,
+                            incremental=incremental, date_range=date_range),
+            max_buffered=max_buffered,
+            executor=get_blocking_executor(),
+        )
+
+    async def ascrape(self, time_range_days=3, knowledge: Dict = None, incremental: bool = False,
+                      date_range: Tuple = None):
+        """Async version of scrape, so that many scrape jobs can be interleaved on one event loop.
+        Page loads, the HTML inspection and the knowledge and checkpoint file I/O run on the
+        shared bounded executor (see async_runtime.py) while the event loop stays free."""
+
+        print("Starting scraping.....")
+
+        metrics = get_metrics()
+        try:
+            with metrics.span("scrape", site=self.home_url, keyword=self.keyword):
+                await run_blocking(self.init_driver)
+                try:
+                    await run_blocking(self.get_url, self.home_url)
+                    with metrics.span("load_knowledge"):
+                        knowledge = await run_blocking(self.load_knowledge, knowledge)
+
+                    print("\nUpdating knowledge and preparing the tools to scrape ")
+                    tools = self.get_tools(knowledge)
+                    print("\nScraping the website ")
+                    checkpoint = await run_blocking(CheckpointStore, self.home_url, self.keyword) if incremental else None
+
+                    posts_urls = []
+                    async for post_data in aiter_in_thread(
+                        self.iter_extracted_posts(tools=tools, time_range_days=time_range_days,
+                                                  checkpoint=checkpoint, date_range=date_range),
+                        executor=get_blocking_executor(),
+                    ):
+                        posts_urls.append(post_data['url'])
+                    print("\n ✅[SUCCESS] Finished Scraping the Website")
+
+                finally:
+                    await run_blocking(self.close_driver)
+        finally:
+            await run_blocking(metrics.write_snapshot, site=self.home_url, keyword=self.keyword)
 
+        print(posts_urls)
         return posts_urls
+    
+    def scrape(self, time_range_days=3, knowledge: Dict = None, incremental: bool = False,
+               date_range: Tuple = None):
+        """Manages and Executes the full scraping process, including knowledge retrieval, 
+        HTML inspection, and data extraction. 
+        A knowledge dict loaded by the caller can be passed in to skip the lookup.
+        With incremental=True, only the posts not collected by previous scrapes are returned.
+        date_range is an optional (start, end) pair of datetimes used instead of time_range_days;
+        either bound may be None.
+        See iter_posts and aiter_posts to process the posts while scraping."""
+
+        posts_urls = [
+            post_data['url'] for post_data in self.iter_posts(
+                time_range_days=time_range_days, knowledge=knowledge,
+                incremental=incremental, date_range=date_range)
+        ]
+        print(posts_urls)
 
+        return posts_urls
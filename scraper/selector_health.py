@@ -0,0 +1,112 @@
+import hashlib
+import json
+import time
+from typing import Callable, Dict, List
+
+from scraper.html import check_selectors
+from scraper.knowledge import KnowledgeBase
+
+"""
+Health checks of the learned selectors of a website, run at the start of a scrape so that
+selector drift (e.g. a renamed pager class) is repaired by re-running only the agent of the
+broken part, instead of inspecting the whole website again.
+
+Each part is checked offline on a snapshot of its page (scraper/html/selector_validator.py):
+the search bar on the home page; the sort menu, the posts and the pager on a result page.
+The results are saved in the "selector_health" setting of the website and reused until
+they expire (ttl_seconds) or the selectors change. A part that was not learned, e.g. after
+one of the concurrent agents failed, is broken too, so that its agent alone is run again.
+"""
+
+HEALTH_SETTING = "selector_health"
+DEFAULT_HEALTH_TTL = 6 * 60 * 60
+
+# agent focus -> knowledge section and the components checked for it
+SECTION_CHECKS = {
+    "search": ("search_section", ("search_bar",)),
+    "sort": ("sort_section", ("sort_dropdown", "sort_date_option")),
+    "extract": ("extract_posts_section", ("blog_item", "blog_url", "blog_date")),
+    "pager": ("extract_posts_section", ("next_page_button",)),
+}
+HOME_PAGE_CHECKS = {"search"}
+
+
+def _fingerprint(selectors: Dict) -> str:
+    return hashlib.sha1(json.dumps(selectors, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def _checked_selectors(knowledge: Dict, focus: str) -> Dict | None:
+    section_name, components = SECTION_CHECKS[focus]
+    section = knowledge.get("sections", {}).get(section_name) or {}
+    if not all(component in section for component in components):
+        return None
+    return {component: section[component] for component in components}
+
+
+class SelectorHealthChecker:
+    def __init__(self, home_url: str, ttl_seconds: float = DEFAULT_HEALTH_TTL):
+        self.home_url = home_url
+        self.ttl_seconds = ttl_seconds
+        self.knowledge_base = KnowledgeBase(home_url)
+
+    def check(self, knowledge: Dict, get_home_html: Callable[[], str],
+              get_result_html: Callable[[], str] = None, force: bool = False) -> Dict[str, Dict]:
+        """Health of each part of the website, by agent focus: {"ok", "error", "checked_at"}.
+        The pages are only loaded when a part has no fresh result. Parts whose page is not
+        available (no result page known yet) are not checked. Parts missing from the knowledge
+        are broken, with a "not learned" error."""
+        saved = self.knowledge_base.get_setting(HEALTH_SETTING, {})
+        pages = {}
+        results, changed = {}, False
+        now = time.time()
+
+        for focus in SECTION_CHECKS:
+            page = "home" if focus in HOME_PAGE_CHECKS else "results"
+            get_html = get_home_html if page == "home" else get_result_html
+            selectors = _checked_selectors(knowledge, focus)
+            if selectors is None:
+                if get_html:
+                    results[focus] = {"ok": False, "error": "not learned", "checked_at": now, "fingerprint": None}
+                    print(f"🩺 {focus}: broken, not learned")
+                continue
+            fingerprint = _fingerprint(selectors)
+            previous = saved.get(focus)
+            if (not force and previous and previous["fingerprint"] == fingerprint
+                    and now - previous["checked_at"] < self.ttl_seconds):
+                results[focus] = previous
+                continue
+
+            if page not in pages:
+                try:
+                    pages[page] = get_html() if get_html else None
+                except Exception as e:
+                    print(f"⚠️ Could not load the {page} page for the health check: {e}")
+                    pages[page] = None
+            if not pages[page]:
+                continue
+
+            report = check_selectors(pages[page], focus, selectors)
+            results[focus] = {"ok": report["ok"], "error": report["error"],
+                              "checked_at": now, "fingerprint": fingerprint}
+            changed = True
+            print(f"🩺 {focus}: {'healthy' if report['ok'] else 'broken, ' + report['error']} "
+                  f"({report['milliseconds']} ms)")
+
+        if changed:
+            checked = {focus: result for focus, result in results.items() if result["fingerprint"]}
+            self.knowledge_base.save_setting(self.home_url, HEALTH_SETTING, {**saved, **checked})
+        return results
+
+    @staticmethod
+    def broken(results: Dict[str, Dict]) -> List[str]:
+        return [focus for focus, result in results.items() if not result["ok"]]
+
+    def mark_healthy(self, knowledge: Dict, focuses: List[str]):
+        """Record parts as healthy after their agent confirmed the selectors in the browser."""
+        saved = self.knowledge_base.get_setting(HEALTH_SETTING, {})
+        now = time.time()
+        for focus in focuses:
+            selectors = _checked_selectors(knowledge, focus)
+            if selectors is not None:
+                saved[focus] = {"ok": True, "error": "", "checked_at": now, "fingerprint": _fingerprint(selectors)}
+        self.knowledge_base.save_setting(self.home_url, HEALTH_SETTING, saved)
@@ -0,0 +1,62 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Executor
+from typing import AsyncIterator, Iterable
+
+"""
+Turns a blocking iterator (e.g. MarketScraper.iter_posts, which drives Selenium) into an
+async iterator. The iterator runs in a worker thread and hands its items over through a
+bounded queue: when the consumer falls behind, the queue fills up and the worker waits,
+so no more pages are loaded than the consumer can take (backpressure).
+Leaving the async for loop early stops the worker and closes the blocking iterator.
+"""
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+async def aiter_in_thread(iterable: Iterable, max_buffered: int = 20,
+                          executor: Executor = None) -> AsyncIterator:
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=max_buffered)
+    stop = threading.Event()
+
+    def put(item):
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if stop.is_set():
+                    break
+                put(item)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            if hasattr(iterator, "close"):
+                iterator.close()
+            put(_DONE)
+
+    # the worker runs in a copy of the current context, so its metric spans nest under the caller's
+    producer = loop.run_in_executor(executor, contextvars.copy_context().run, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        # keep draining so that a worker blocked on a full queue can see the stop flag
+        while not producer.done():
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.wait([producer], timeout=0.05)
@@ -2,3 +2,6 @@ from .selenium_search_keyword_tool import SeleniumSearchKeywordTool
 from .selenium_extract_html_tool import SeleniumExtractHtmlTool
 from .selenium_extract_results_tool import SeleniumExtractPostsTool
 from .selenium_sort_results_tool import SeleniumSortResultsTool
+from .http_fetch_tool import HttpFetchTool
+from .page_fetcher import PageFetcher
+from .page_snapshot_cache import PageSnapshotCache, get_snapshot_cache
@@ -0,0 +1,154 @@
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Iterable, List
+
+"""
+Converts the raw date text of blog items into datetime objects. All patterns are
+compiled once into a pattern table covering relative dates (seconds to years ago,
+yesterday/today) and absolute dates in English, Chinese and Japanese. The parsed
+form of each distinct text is kept in an LRU cache, since the same strings repeat
+across pages; "now" is applied afterwards so cached results stay correct over time.
+Use parse_many to parse all the dates of a page with a single "now".
+"""
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+MONTH_NAMES = r"(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?"
+
+UNIT_SECONDS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 60 * 60,
+    "day": 24 * 60 * 60,
+    "week": 7 * 24 * 60 * 60,
+    "month": 30 * 24 * 60 * 60,
+    "year": 365 * 24 * 60 * 60,
+}
+
+# Each entry: (name, regex, kind). kind tells how the groups are read:
+#   ("relative", unit): group 1 is the amount of units ago
+#   ("fixed", seconds): a fixed offset from now, e.g. yesterday
+#   "ymd" / "mdy_en" / "dmy_en" / "md": absolute dates
+#   "relative_en": amount and unit of an English "... ago"
+PATTERN_TABLE = [
+    # absolute dates first, so that "2024年3月5日" is not read as "2024年前"
+    ("zh_ymd", r"(\d{4})\s*年\s*(\d{1,2})\s*月\s*(\d{1,2})\s*日(?:\s*(\d{1,2}):(\d{2}))?", "ymd"),
+    ("iso_ymd", r"(?<!\d)(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})(?:[T\s]+(\d{1,2}):(\d{2}))?(?!\d)", "ymd"),
+    ("en_mdy", MONTH_NAMES + r"\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4})", "mdy_en"),
+    ("en_dmy", r"(?<!\d)(\d{1,2})(?:st|nd|rd|th)?\s+" + MONTH_NAMES + r",?\s+(\d{4})", "dmy_en"),
+    ("zh_md", r"(?<!\d)(\d{1,2})\s*月\s*(\d{1,2})\s*日", "md"),
+
+    # relative dates in Chinese (traditional and simplified) and Japanese
+    ("zh_seconds", r"(\d+)\s*秒(?:鐘|钟)?前", ("relative", "second")),
+    ("zh_minutes", r"(\d+)\s*分(?:鐘|钟)?前", ("relative", "minute")),
+    ("zh_hours", r"(\d+)\s*(?:小時|小时|時間|时间|個小時|个小时)前", ("relative", "hour")),
+    ("zh_days", r"(\d+)\s*(?:天|日)前", ("relative", "day")),
+    ("zh_weeks", r"(\d+)\s*(?:週間|週|周|星期|個星期|个星期|個禮拜|个礼拜|禮拜)前", ("relative", "week")),
+    ("zh_months", r"(\d+)\s*(?:個月|个月|ヶ月|ケ月|か月|カ月)前", ("relative", "month")),
+    ("zh_years", r"(\d+)\s*年前", ("relative", "year")),
+    ("zh_just_now", r"剛剛|刚刚|たった今", ("fixed", 0)),
+    ("zh_day_before_yesterday", r"前天|一昨日", ("fixed", 2 * UNIT_SECONDS["day"])),
+    ("zh_yesterday", r"昨天|昨日", ("fixed", UNIT_SECONDS["day"])),
+    ("zh_today", r"今天|今日", ("fixed", 0)),
+
+    # relative dates in English
+    ("en_relative", r"\b(\d+|an?|one)\s+(second|sec|minute|min|hour|hr|day|week|month|year)s?\s+ago", "relative_en"),
+    ("en_just_now", r"\bjust now\b", ("fixed", 0)),
+    ("en_yesterday", r"\byesterday\b", ("fixed", UNIT_SECONDS["day"])),
+    ("en_today", r"\btoday\b", ("fixed", 0)),
+]
+
+EN_UNIT_ALIASES = {"sec": "second", "min": "minute", "hr": "hour"}
+
+COMPILED_PATTERNS = {
+    name: (re.compile(regex, re.IGNORECASE), kind) for name, regex, kind in PATTERN_TABLE
+}
+# One alternation over the whole table finds the leftmost date in a single pass
+MASTER_PATTERN = re.compile(
+    "|".join(f"(?P<{name}>{regex})" for name, regex, _ in PATTERN_TABLE),
+    re.IGNORECASE,
+)
+
+
+def _absolute(kind: str, groups) -> tuple | None:
+    if kind == "ymd":
+        year, month, day = int(groups[0]), int(groups[1]), int(groups[2])
+        hour, minute = (int(groups[3]), int(groups[4])) if groups[3] else (0, 0)
+    elif kind == "mdy_en":
+        month, day, year = MONTHS[groups[0].lower()[:3]], int(groups[1]), int(groups[2])
+        hour, minute = 0, 0
+    elif kind == "dmy_en":
+        day, month, year = int(groups[0]), MONTHS[groups[1].lower()[:3]], int(groups[2])
+        hour, minute = 0, 0
+    else:
+        return None
+
+    try:
+        return ("absolute", datetime(year, month, day, hour, minute))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _parse_spec(date_text: str) -> tuple | None:
+    """Parse a date text into a now-independent spec: ("absolute", datetime),
+    ("ago", seconds) or ("month_day", (month, day))."""
+    master_match = MASTER_PATTERN.search(date_text)
+    if not master_match:
+        return None
+
+    pattern, kind = COMPILED_PATTERNS[master_match.lastgroup]
+    match = pattern.match(date_text, master_match.start())
+    groups = match.groups()
+
+    if isinstance(kind, tuple):
+        if kind[0] == "fixed":
+            return ("ago", kind[1])
+        return ("ago", int(groups[0]) * UNIT_SECONDS[kind[1]])
+
+    if kind == "relative_en":
+        amount = 1 if groups[0].lower() in ("a", "an", "one") else int(groups[0])
+        unit = groups[1].lower()
+        return ("ago", amount * UNIT_SECONDS[EN_UNIT_ALIASES.get(unit, unit)])
+
+    if kind == "md":
+        return ("month_day", (int(groups[0]), int(groups[1])))
+
+    return _absolute(kind, groups)
+
+
+def _apply_spec(spec: tuple | None, now: datetime) -> datetime | None:
+    if spec is None:
+        return None
+
+    kind, value = spec
+    if kind == "absolute":
+        return value
+    if kind == "ago":
+        return now - timedelta(seconds=value)
+
+    # month/day without a year: the most recent such date that is not in the future
+    month, day = value
+    try:
+        date = datetime(now.year, month, day)
+        if date > now:
+            date = datetime(now.year - 1, month, day)
+        return date
+    except ValueError:
+        return None
+
+
+def parse_date(date_text: str, now: datetime = None) -> datetime | None:
+    """Convert raw date text into a datetime object, or None when no date is found."""
+    if not date_text:
+        return None
+    return _apply_spec(_parse_spec(date_text), now or datetime.now())
+
+
+def parse_many(date_texts: Iterable[str], now: datetime = None) -> List[datetime | None]:
+    """Parse all the date texts of a page against the same "now"."""
+    now = now or datetime.now()
+    return [_apply_spec(_parse_spec(text), now) if text else None for text in date_texts]
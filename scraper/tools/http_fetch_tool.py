@@ -0,0 +1,56 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scraper.drivers.browser_profiles import USER_AGENT
+from utils.metrics import get_metrics
+
+"""
+Fetches pages over plain HTTP with a pooled keep-alive session shared by the whole
+process. Used as the fast path for websites whose HTML is rendered on the server.
+"""
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session(pool_size: int = 16) -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _session.headers.update({
+                "User-Agent": USER_AGENT,
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "zh-TW,zh;q=0.9,en;q=0.8",
+            })
+        return _session
+
+
+class HttpFetchTool():
+    def __init__(self, timeout: float = 10):
+        self.timeout = timeout
+        self.session = get_http_session()
+
+    def __call__(self, url: str) -> str | None:
+        """Return the page HTML, or None when the page cannot be fetched without a browser."""
+        try:
+            with get_metrics().span("page.fetch_http", url=url):
+                response = self.session.get(url, timeout=self.timeout)
+                response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"⚠️ HTTP fetch failed for {url}: {e}")
+            get_metrics().increment("http_fetch_failures")
+            return None
+        get_metrics().increment("pages_loaded", mode="http")
+
+        if "html" not in response.headers.get("Content-Type", ""):
+            return None
+        # requests falls back to ISO-8859-1 without a charset, which garbles Chinese pages
+        if response.encoding is None or response.encoding.lower() == "iso-8859-1":
+            response.encoding = response.apparent_encoding
+        return response.text
@@ -0,0 +1,66 @@
+import json
+from functools import lru_cache
+from typing import Dict
+
+from scraper.html.locators import compile_locator
+
+"""
+Compiles the blog_item / blog_url / blog_date selectors of a knowledge file into a
+single JavaScript extraction plan. Running the plan with one execute_script call
+returns every {url, date_text} record of the page, instead of paying several
+WebDriver roundtrips per blog item. Compiled plans are cached per selector set,
+i.e. per site.
+"""
+
+EXTRACTION_SCRIPT_TEMPLATE = """
+var plan = %s;
+
+function findAll(root, locator) {
+    if (locator.kind === "css") {
+        return Array.prototype.slice.call(root.querySelectorAll(locator.query));
+    }
+    var snapshot = document.evaluate(
+        locator.query, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    var nodes = [];
+    for (var i = 0; i < snapshot.snapshotLength; i++) {
+        nodes.push(snapshot.snapshotItem(i));
+    }
+    return nodes;
+}
+
+function findFirst(root, locator) {
+    var nodes = findAll(root, locator);
+    return nodes.length ? nodes[0] : null;
+}
+
+var records = [];
+findAll(document, plan.blog_item).forEach(function (item) {
+    var urlNode = findFirst(item, plan.blog_url);
+    var dateNode = findFirst(item, plan.blog_date);
+    records.push({
+        url: urlNode ? (urlNode.href || urlNode.getAttribute("href")) : null,
+        date_text: dateNode ? (dateNode.innerText || dateNode.textContent || "").trim() : null
+    });
+});
+return records;
+"""
+
+
+@lru_cache(maxsize=256)
+def _compile_plan(selectors_key: str) -> str:
+    selectors = json.loads(selectors_key)
+    plan = {
+        component: compile_locator(selectors[component]["selector"], selectors[component]["value"])
+        for component in ("blog_item", "blog_url", "blog_date")
+    }
+    return EXTRACTION_SCRIPT_TEMPLATE % json.dumps(plan, ensure_ascii=False)
+
+
+def get_extraction_script(selectors: Dict) -> str:
+    """Return the compiled extraction script for the extract_posts_section selectors."""
+    selectors_key = json.dumps(
+        {component: selectors[component] for component in ("blog_item", "blog_url", "blog_date")},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return _compile_plan(selectors_key)
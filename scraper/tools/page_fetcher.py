@@ -0,0 +1,88 @@
+import time
+from typing import Dict, Tuple
+
+from scraper.drivers import DriverPool
+from scraper.html import parse_html, find_static
+from scraper.knowledge import KnowledgeBase
+from .http_fetch_tool import HttpFetchTool
+from .selenium_extract_html_tool import SeleniumExtractHtmlTool
+
+"""
+Fetches the HTML of a page through the cheapest way that works for the website.
+It first tries a plain HTTP request and checks whether the learned selectors match
+in the static HTML; only when they do not, the page is rendered with Selenium.
+The decision is recorded per website in the knowledge base ("fetch_mode" setting),
+so later fetches go straight to the right path.
+The decision only holds for the selectors it was checked with (the posts of the result
+pages): widgets rendered by scripts, like sort menus and pagers, may be missing from the
+static HTML, so pages fetched without selectors are always rendered with Selenium.
+"""
+
+HTTP_MODE = "http"
+BROWSER_MODE = "browser"
+
+
+class PageFetcher():
+    def __init__(self, driver_pool: DriverPool = None):
+        self.http_fetch_tool = HttpFetchTool()
+        self.browser_fetch_tool = SeleniumExtractHtmlTool(driver_pool=driver_pool)
+
+    @staticmethod
+    def selectors_match(html: str, selectors: Dict) -> bool:
+        """Check that every (selector, value) pair of a knowledge section finds an element in the HTML.
+        Selectors with a {page_num} placeholder or "none" values are skipped."""
+        root = parse_html(html)
+        for component in selectors.values():
+            if not isinstance(component, dict):
+                continue
+            selector, value = component.get("selector"), component.get("value")
+            if not selector or not value or "none" in (selector, value) or "{page_num}" in value:
+                continue
+            try:
+                if not find_static(root, selector, value):
+                    return False
+            except Exception:
+                return False
+        return True
+
+    def get_fetch_mode(self, url: str) -> str | None:
+        # url may be any page of the website: the store resolves it to the website
+        setting = KnowledgeBase(url).get_setting("fetch_mode")
+        return setting["mode"] if setting else None
+
+    def save_fetch_mode(self, url: str, mode: str):
+        KnowledgeBase().save_setting(
+            new_url=url,
+            name="fetch_mode",
+            value={"mode": mode, "checked_at": time.time()},
+        )
+
+    def check_http(self, url: str, selectors: Dict) -> str | None:
+        """Fetch the page over HTTP and record whether the selectors match its static HTML.
+        Returns the HTML when the HTTP fast path works for the website."""
+        html = self.http_fetch_tool(url)
+        if html and self.selectors_match(html, selectors):
+            print(f"⚡ Fetched {url} over HTTP")
+            if self.get_fetch_mode(url) != HTTP_MODE:
+                self.save_fetch_mode(url, HTTP_MODE)
+            return html
+
+        print(f"\n🌐 Selectors do not match the static HTML of {url}. Using the browser for this website")
+        self.save_fetch_mode(url, BROWSER_MODE)
+        return None
+
+    def fetch(self, url: str, selectors: Dict = None) -> Tuple[str, str]:
+        """Return (html, mode). selectors are the knowledge section the page must contain."""
+        mode = self.get_fetch_mode(url)
+
+        # without selectors we cannot tell whether the static HTML holds what the caller needs
+        if mode != BROWSER_MODE and selectors:
+            html = self.check_http(url, selectors)
+            if html:
+                return html, HTTP_MODE
+
+        return self.browser_fetch_tool(url=url), BROWSER_MODE
+
+    def __call__(self, url: str, selectors: Dict = None) -> str:
+        html, _ = self.fetch(url=url, selectors=selectors)
+        return html
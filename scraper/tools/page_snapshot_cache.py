@@ -0,0 +1,165 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+
+from utils.metrics import get_metrics
+
+"""
+Keeps the rendered HTML of pages, keyed by URL and render options (e.g. the browser
+profile), so that the inspection agents and their retries share a single render of
+the result page instead of launching a browser for each attempt.
+Entries expire after ttl_seconds and the least recently used ones are evicted above
+max_entries. With disk_dir, snapshots are also written to disk and survive restarts.
+Concurrent requests for the same page wait for the first render instead of starting
+their own.
+"""
+
+
+class PageSnapshotCache:
+    def __init__(self, max_entries: int = 64, ttl_seconds: float = 600, disk_dir: str | Path = None,
+                 max_disk_entries: int = 512):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.max_disk_entries = max_disk_entries
+
+        self._entries = OrderedDict()  # key -> (created_at, html)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(url: str, **render_options) -> Tuple:
+        return (url,) + tuple(sorted(render_options.items()))
+
+    def _is_fresh(self, created_at: float) -> bool:
+        return not self.ttl_seconds or time.time() - created_at < self.ttl_seconds
+
+    def _disk_path(self, key: Tuple) -> Path:
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return self.disk_dir / f"{digest}.json"
+
+    def _read_disk(self, key: Tuple) -> Tuple[float, str] | None:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                snapshot = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if snapshot.get("key") != repr(key) or not self._is_fresh(snapshot["created_at"]):
+            return None
+        return snapshot["created_at"], snapshot["html"]
+
+    def _write_disk(self, key: Tuple, created_at: float, html: str):
+        if not self.disk_dir:
+            return
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            path = self._disk_path(key)
+            temp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump({"key": repr(key), "created_at": created_at, "html": html}, file, ensure_ascii=False)
+            temp_path.replace(path)
+
+            snapshots = sorted(self.disk_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+            for old_path in snapshots[:max(0, len(snapshots) - self.max_disk_entries)]:
+                old_path.unlink(missing_ok=True)
+        except OSError as e:
+            print(f"⚠️ Error writing page snapshot to disk: {e}")
+
+    def get(self, key: Tuple) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self._is_fresh(entry[0]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                get_metrics().increment("snapshot_cache_lookups", result="hit")
+                return entry[1]
+            if entry:
+                del self._entries[key]
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry:
+                self._store(key, entry)
+                self.hits += 1
+                get_metrics().increment("snapshot_cache_lookups", result="disk_hit")
+                return entry[1]
+            self.misses += 1
+        get_metrics().increment("snapshot_cache_lookups", result="miss")
+        return None
+
+    def _store(self, key: Tuple, entry: Tuple[float, str]):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def put(self, key: Tuple, html: str):
+        created_at = time.time()
+        with self._lock:
+            self._store(key, (created_at, html))
+        self._write_disk(key, created_at, html)
+
+    def get_or_render(self, key: Tuple, render: Callable[[], str]) -> str:
+        """Return the cached HTML, or render it once even when several threads ask at the same time."""
+        while True:
+            html = self.get(key)
+            if html is not None:
+                return html
+
+            with self._lock:
+                event = self._in_flight.get(key)
+                if event is None:
+                    event = self._in_flight[key] = threading.Event()
+                    break
+            # another thread is rendering the page: wait, then use its snapshot,
+            # or render the page here if that render failed
+            event.wait()
+
+        try:
+            html = render()
+            if html:
+                self.put(key, html)
+            return html
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            event.set()
+
+    def invalidate(self, url: str = None):
+        """Drop the snapshots of a URL, or all of them."""
+        with self._lock:
+            for key in [key for key in self._entries if url is None or key[0] == url]:
+                del self._entries[key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_snapshot_cache(**cache_kwargs) -> PageSnapshotCache:
+    """Process-wide cache shared by all agents. Keyword arguments only take effect on the first call."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PageSnapshotCache(**cache_kwargs)
+        return _default_cache
@@ -0,0 +1,151 @@
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+"""
+Detects whether result pages are addressable by URL. Given the URLs observed after
+clicking to a few pages, it looks for the query parameter, fragment parameter
+(e.g. Google CSE's #gsc.page=2) or path segment that follows the page number, and
+returns a template that builds the URL of any page. The value may follow the page
+number linearly, e.g. start=0, 10, 20 for pages 1, 2, 3 (step 10, offset -10).
+
+Saved in the extract_posts_section of the knowledge file. Templates only keep the
+parameter name or the index of the path segment, and are rebuilt on the first result
+page of the current search, so they apply to the result page of any keyword:
+
+"page_url_template": {
+    "selector": "fragment",
+    "value": "gsc.page",
+    "step": 1,
+    "offset": 0
+}
+
+Path templates also keep the path learned, e.g. "path": "/search/iphone/page/{page_num}/",
+only to append the page segments that a first result page without page number lacks
+(/search/pixel -> /search/pixel/page/2/).
+"""
+
+PAGE_PLACEHOLDER = "{page_num}"
+
+
+def _split_pairs(raw: str) -> List[List[str]]:
+    return [pair.split("=", 1) if "=" in pair else [pair] for pair in raw.split("&")] if raw else []
+
+
+def _join_pairs(pairs: List[List[str]]) -> str:
+    return "&".join("=".join(pair) for pair in pairs)
+
+
+def _url_components(url: str) -> Dict[Tuple, str]:
+    """Map each addressable component of a URL to its raw value, e.g. ("query", "page") -> "2"."""
+    parts = urlsplit(url)
+    components = {}
+    for index, segment in enumerate(parts.path.split("/")):
+        components[("path", index)] = segment
+    for pair in _split_pairs(parts.query):
+        if len(pair) == 2:
+            components.setdefault(("query", pair[0]), pair[1])
+    if "=" in parts.fragment:
+        for pair in _split_pairs(parts.fragment):
+            if len(pair) == 2:
+                components.setdefault(("fragment", pair[0]), pair[1])
+    return components
+
+
+def _replace_component(url: str, component: Tuple, new_value: str) -> str:
+    """Set a path segment, query or fragment parameter of a URL. Missing parameters are appended."""
+    parts = urlsplit(url)
+    kind, key = component
+    path, query, fragment = parts.path, parts.query, parts.fragment
+
+    if kind == "path":
+        segments = path.split("/")
+        segments[key] = new_value
+        path = "/".join(segments)
+    else:
+        raw = query if kind == "query" else fragment
+        pairs = _split_pairs(raw)
+        for pair in pairs:
+            if len(pair) == 2 and pair[0] == key:
+                pair[1] = new_value
+                break
+        else:
+            pairs.append([key, new_value])
+        if kind == "query":
+            query = _join_pairs(pairs)
+        else:
+            fragment = _join_pairs(pairs)
+
+    return urlunsplit((parts.scheme, parts.netloc, path, query, fragment))
+
+
+def _build_page_path(template: Dict, page_value: str, base_url: str) -> str:
+    parts = urlsplit(base_url)
+    index, learned_path = template["value"], template.get("path")
+    if isinstance(index, str):
+        # templates learned before the path was rebuilt on base_url keep the whole URL
+        learned_path = urlsplit(index).path
+        index = learned_path.split("/").index(PAGE_PLACEHOLDER)
+    segments = parts.path.split("/")
+    if index < len(segments) and segments[index].isdigit():
+        segments[index] = page_value
+    else:
+        # the first result page has no page segment: append the learned ones after its path
+        if segments[-1] == "":
+            segments.pop()
+        if len(segments) > index:
+            raise ValueError(f"The page URL template {template} does not apply to {base_url}")
+        segments += [segment.replace(PAGE_PLACEHOLDER, page_value)
+                     for segment in learned_path.split("/")[len(segments):]]
+    return urlunsplit((parts.scheme, parts.netloc, "/".join(segments), parts.query, parts.fragment))
+
+
+def build_page_url(template: Dict, page_num: int, base_url: str) -> str:
+    """URL of a result page. base_url is the first result page of the current search: its
+    parameter or path segment holding the page number is set. Raises ValueError when a path
+    template does not apply to base_url."""
+    page_value = str(template.get("step", 1) * page_num + template.get("offset", 0))
+    if template["selector"] == "path":
+        return _build_page_path(template, page_value, base_url)
+    return _replace_component(base_url, (template["selector"], template["value"]), page_value)
+
+
+def detect_page_url_template(page_urls: Dict[int, str]) -> Dict | None:
+    """page_urls maps page numbers to the URL observed on that page. Page 1 is only used when
+    there is a single other page, since the first result page often has no page parameter."""
+    pages = sorted(page_num for page_num in page_urls if page_num >= 2)
+    if len(pages) < 2:
+        pages = sorted(page_urls)
+    if len(pages) < 2:
+        return None
+
+    first_page, second_page = pages[0], pages[1]
+    first_components = _url_components(page_urls[first_page])
+    second_components = _url_components(page_urls[second_page])
+
+    for component, first_value in first_components.items():
+        second_value = second_components.get(component)
+        if not (first_value.isdigit() and second_value and second_value.isdigit()):
+            continue
+        if first_value == second_value:
+            continue
+
+        value_step = int(second_value) - int(first_value)
+        page_step = second_page - first_page
+        if value_step % page_step:
+            continue
+        step = value_step // page_step
+        offset = int(first_value) - step * first_page
+
+        kind, key = component
+        template = {"selector": kind, "value": key, "step": step, "offset": offset}
+        if kind == "path":
+            template["path"] = urlsplit(_replace_component(page_urls[first_page], component, PAGE_PLACEHOLDER)).path
+        # the template must rebuild every observed URL
+        if all(
+            _url_components(build_page_url(template, page_num, base_url=page_urls[first_page]))
+            == _url_components(page_urls[page_num])
+            for page_num in pages
+        ):
+            return template
+
+    return None
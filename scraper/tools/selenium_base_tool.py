@@ -1,44 +1,39 @@
-
 from abc import ABC, abstractmethod
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 
-"""This is a Abstract base class for Selenium-based tools, providing shared utilities, including driver initialization, 
+from scraper.drivers import DriverPool, get_driver_pool
+from utils.metrics import get_metrics
+
+"""This is a Abstract base class for Selenium-based tools, providing shared utilities, including driver checkout from the pool, 
     URL handling, and controlled driver management during the scraping process with Selenium"""
 
 class BaseSeleniumTool(ABC):
-    def __init__(self, driver=None):
+    def __init__(self, driver=None, driver_pool: DriverPool = None):
         self.driver = driver
+        self.driver_pool = driver_pool or get_driver_pool()
+        self._owns_driver = False
 
-    def init_driver(self):
+    def init_driver(self, site_url: str = None):
         if not self.driver:
-            user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.159 Safari/537.36"
-            options = Options()
-            options.add_argument(f'user-agent={user_agent}')
-            options.add_argument("--disable-gpu")
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-            options.add_argument("--window-size=1920,1080")
-            self.driver = webdriver.Chrome(
-                service=Service(ChromeDriverManager().install()), options=options
-            )
+            self.driver = self.driver_pool.checkout(site_url=site_url)
+            self._owns_driver = True
         return self.driver
 
     def get_url(self, url: str):
-        self.driver.set_page_load_timeout(10)
-        try:
-            self.driver.get(url)
-        except:
-            self.driver.execute_script("window.stop();")
+        with get_metrics().span("page.load", url=url):
+            self.driver.set_page_load_timeout(10)
+            try:
+                self.driver.get(url)
+            except:
+                self.driver.execute_script("window.stop();")
+            self.driver_pool.record_page(self.driver)
 
-    # only close driver when it's initialized by the tool
+    # only return the driver to the pool when it's checked out by the tool
     def close_driver(self):
-        if self.driver:
+        if self.driver and self._owns_driver:
             try:
-                self.driver.quit()
+                self.driver_pool.checkin(self.driver)
             except Exception as e:
-                print(f"⚠️ Error closing driver: {e}")
+                print(f"⚠️ Error returning driver to the pool: {e}")
             finally:
                 self.driver = None
+                self._owns_driver = False
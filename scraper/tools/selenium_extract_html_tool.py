@@ -1,20 +1,47 @@
-import time
 from .selenium_base_tool import BaseSeleniumTool
+from .page_snapshot_cache import PageSnapshotCache, get_snapshot_cache
+from scraper.drivers import DriverPool, PageWaiter
+from utils.metrics import get_metrics
 
 
 class SeleniumExtractHtmlTool(BaseSeleniumTool):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, driver_pool: DriverPool = None, cache: PageSnapshotCache = None):
+        super().__init__(driver_pool=driver_pool)
+        self.cache = cache or get_snapshot_cache()
 
-    def __call__(self, url: str) -> str:
-        self.driver = self.init_driver()
-        self.get_url(url=url)
-        time.sleep(3)
+    def __call__(self, url: str, use_cache: bool = True, driver=None) -> str:
+        """Return the rendered HTML of the page. Renders are shared through the snapshot cache,
+        keyed by the URL and the browser profile of the pool.
+        With a driver (e.g. the one an agent validates its selectors on), a page missing from the
+        cache is rendered in it instead of a driver checked out from the pool. The driver is not
+        navigated on a cache hit: callers that use it afterwards load the page themselves."""
+        if not use_cache:
+            return self.render(url, driver=driver)
+        key = self.cache.make_key(url, profile=self.driver_pool.profile.name, scrolled=True)
+        return self.cache.get_or_render(key, lambda: self.render(url, driver=driver))
 
-        # Scroll to the bottom of the page to load all content
-        self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(3)
-        html = self.driver.page_source
+    def render(self, url: str, driver=None) -> str:
+        with get_metrics().span("tool.render_html", url=url) as span:
+            html = self._render(url, driver=driver)
+            span.set(html_chars=len(html or ""))
+        return html
+
+    def _render(self, url: str, driver=None) -> str:
+        self.driver = driver or self.init_driver(site_url=url)
+        try:
+            self.get_url(url=url)
+            waiter = PageWaiter(self.driver)
+            waiter.network_idle()
 
-        self.close_driver()
+            # Scroll to the bottom of the page to load all content
+            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            get_metrics().increment("webdriver_calls", call="execute_script")
+            waiter.network_idle()
+            waiter.dom_quiet()
+            html = self.driver.page_source
+        finally:
+            if driver is None:
+                self.close_driver()
+            else:
+                self.driver = None
         return html
@@ -1,13 +1,60 @@
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException
 from datetime import datetime, timedelta
-import time
-import re
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List
+
+from scraper.drivers import DriverPool, PageWaiter, get_driver_pool
+from scraper.html import parse_html, find_static, element_text, element_href
+from scraper.streaming import aiter_in_thread
+from scraper.async_runtime import get_blocking_executor
+from utils.metrics import get_metrics
+from .js_extraction_plan import get_extraction_script
+from .page_url_template import build_page_url
+from .page_fetcher import HTTP_MODE
+from .date_parser import parse_date, parse_many
+
+
+class PageLoader:
+    """Loads result pages by number and keeps them until their posts were yielded."""
+
+    def __init__(self, load_function, first_page=None):
+        self.load_function = load_function
+        self.pages = {1: first_page}
+        self.loaded_count = 1
+
+    def is_loaded(self, page_num: int) -> bool:
+        return page_num in self.pages
+
+    def load(self, page_num: int):
+        if page_num not in self.pages:
+            self.pages[page_num] = self.load_function(page_num)
+            self.loaded_count += 1
+        return self.pages[page_num]
+
+    def add(self, page_num: int, page_data):
+        self.pages[page_num] = page_data
+        self.loaded_count += 1
+
+    def prefetch(self, page_nums: List[int], executor):
+        # each load runs in a copy of the current context, so its metric spans nest under the caller's
+        contexts = [contextvars.copy_context() for _ in page_nums]
+        loads = executor.map(lambda context, page_num: context.run(self.load_function, page_num), contexts, page_nums)
+        for page_num, page_data in zip(page_nums, loads):
+            self.pages[page_num] = page_data
+            self.loaded_count += 1
+
+    def forget(self, page_num: int):
+        self.pages.pop(page_num, None)
 
 
 class SeleniumExtractPostsTool():
-    def __init__(self, selectors):
+    def __init__(self, selectors, driver_pool: DriverPool = None, concurrency: int = 3, max_pages: int = 100):
         self.selectors = selectors
+        self.driver_pool = driver_pool
+        self.concurrency = concurrency
+        self.max_pages = max_pages
 
     def extract_page_one_url(self, driver):
         self.driver = driver
@@ -60,61 +107,84 @@ class SeleniumExtractPostsTool():
         """ Extract blog posts' url and date from a single page """
 
         self.driver = driver
-        posts_data = []  # Collect data across all pages
-        unique_urls = set()
+        posts_data = []
 
         try:
-
-            # Locate blog items
-            print("🔎 Locating a blog item ...")
-            blog_items = driver.find_elements(
-                by=self.selectors['blog_item']['selector'],
-                value=self.selectors['blog_item']['value']
-            )
+            # Locate blog items, urls and dates in a single roundtrip
+            print("🔎 Locating the blog items, urls and dates ...")
+            with get_metrics().span("tool.extract_page", mode="browser") as span:
+                records = driver.execute_script(get_extraction_script(self.selectors))
+                get_metrics().increment("webdriver_calls", call="execute_script")
+                span.set(blog_items=len(records))
 
         except Exception as e:
             print(f"⚠️ Error finding blog item: {e}")
             return posts_data, e
 
-        print("\n 🎉 Located the blog item!")
-        for blog_item in blog_items:
-            try:
-                # Extract URL
-                print("🔎 Locating the blogs' urls...")
-                blog_url_element = blog_item.find_element(
-                    by=self.selectors['blog_url']['selector'], value=self.selectors['blog_url']['value']
-                )
-                blog_url = blog_url_element.get_attribute('href')
-                print("\n 🎉 Located the blogs' urls!")
+        print(f"\n 🎉 Located {len(records)} blog items!")
+        return self.collect_posts(records, mode="browser"), ""
 
-                if not blog_url or blog_url in unique_urls:
-                    continue  # Skip duplicates
-                unique_urls.add(blog_url)
+    def extract_html_page_urls(self, html: str, page_url: str):
+        """ Extract blog posts' url and date from the static HTML of a single page, without a browser """
 
-                # Extract date
-                print("🔎 Locating the blogs' date..")
-                blog_date_element = blog_item.find_element(
-                    by=self.selectors['blog_date']['selector'], value=self.selectors['blog_date']['value']
-                )
-                blog_date_text = blog_date_element.text.strip()
-                blog_date = self.process_date(blog_date_text)
-                print("\n 🎉 Located the blogs' dates!\n")
+        posts_data = []
+        try:
+            with get_metrics().span("tool.extract_page", mode="http", url=page_url) as span:
+                root = parse_html(html, base_url=page_url)
+                records = []
+                for blog_item in find_static(root, self.selectors['blog_item']['selector'], self.selectors['blog_item']['value']):
+                    url_elements = find_static(blog_item, self.selectors['blog_url']['selector'], self.selectors['blog_url']['value'])
+                    date_elements = find_static(blog_item, self.selectors['blog_date']['selector'], self.selectors['blog_date']['value'])
+                    records.append({
+                        "url": element_href(url_elements[0]) if url_elements else None,
+                        "date_text": element_text(date_elements[0]) if date_elements else None,
+                    })
+                span.set(blog_items=len(records))
+
+        except Exception as e:
+            print(f"⚠️ Error finding blog item: {e}")
+            return posts_data, e
 
-                # Append post data
-                posts_data.append({
-                    "url": blog_url,
-                    "date": blog_date
-                })
-                print(f"🔗 Collected blog: {blog_url}, Date: {blog_date}")
+        print(f"\n 🎉 Located {len(records)} blog items in the static HTML!")
+        return self.collect_posts(records, mode="http"), ""
 
-            except Exception as e:
-                print(f"⚠️ Error processing blog item: {e}")
+    def collect_posts(self, records, mode: str = "browser"):
+        """Turn raw {url, date_text} records into deduplicated post data."""
+        posts_data = []
+        unique_urls = set()
+        # Parse all the dates of the page at once, against the same "now"
+        blog_dates = parse_many(record["date_text"] for record in records)
+
+        for record, blog_date in zip(records, blog_dates):
+            blog_url = record["url"]
+            if not blog_url or blog_url in unique_urls:
+                continue  # Skip duplicates
+            unique_urls.add(blog_url)
+
+            if record["date_text"] is None:
+                print(f"⚠️ Error processing blog item: no date found for {blog_url}")
                 continue
 
-        return posts_data, ""
+            # Append post data
+            posts_data.append({
+                "url": blog_url,
+                "date": blog_date
+            })
+            print(f"🔗 Collected blog: {blog_url}, Date: {blog_date}")
+
+        metrics = get_metrics()
+        metrics.increment("pages_extracted", mode=mode)
+        metrics.increment("posts_extracted", len(posts_data), mode=mode)
+        return posts_data
 
     def change_page(self, page_num, driver):
         """Navigate to the specified page."""
+        with get_metrics().span("tool.change_page", page_num=page_num) as span:
+            success, error = self._change_page(page_num, driver)
+            span.set(success=success)
+        return success, error
+
+    def _change_page(self, page_num, driver):
         success = False
 
         try:
@@ -127,16 +197,18 @@ class SeleniumExtractPostsTool():
                 page_num=str(page_num))
 
             
-            next_page_button = driver.find_element(
+            waiter = PageWaiter(driver)
+            next_page_button = waiter.element_clickable(
                 by=next_page_button_dict["selector"], value=next_page_selector_value)
             print("\n🎉 Located the button to change to next page")
 
-            time.sleep(5)
-
+            old_url = driver.current_url
+            mutations = waiter.mark_dom()
             next_page_button.click()
+            get_metrics().increment("webdriver_calls", call="click")
             print("\n🎉 Changed to next page")
 
-            time.sleep(1)
+            waiter.page_settled(mutations, old_url=old_url)
             success = True
             return success, ""
 
@@ -144,17 +216,225 @@ class SeleniumExtractPostsTool():
             print(f"⚠️ Error navigating to page {page_num}: {e}")
             return success, e
 
-    def __call__(self, driver, time_range_days=None):
+    def fetch_page_posts(self, page_num: int, base_url: str, use_http: bool, page_fetcher=None, driver=None):
+        """Load a result page by its URL, over HTTP or in a browser, and extract its posts.
+        The browser is the given driver, or else one checked out of the pool.
+        Returns None when the page cannot be loaded."""
+        page_url = build_page_url(self.selectors["page_url_template"], page_num, base_url=base_url)
+        try:
+            if use_http:
+                html = page_fetcher.http_fetch_tool(page_url)
+                if html:
+                    page_data, _ = self.extract_html_page_urls(html, page_url)
+                    return page_data
+
+            driver_pool = self.driver_pool or get_driver_pool()
+            if driver:
+                return self._load_page_posts(driver, driver_pool, page_url, page_num)
+            with driver_pool.driver(site_url=page_url) as page_driver:
+                return self._load_page_posts(page_driver, driver_pool, page_url, page_num)
+
+        except Exception as e:
+            print(f"⚠️ Error loading page {page_num} from {page_url}: {e}")
+            return None
+
+    def _load_page_posts(self, page_driver, driver_pool: DriverPool, page_url: str, page_num: int):
+        with get_metrics().span("page.load", url=page_url, page_num=page_num):
+            page_driver.set_page_load_timeout(10)
+            try:
+                page_driver.get(page_url)
+            except:
+                page_driver.execute_script("window.stop();")
+            driver_pool.record_page(page_driver)
+
+        waiter = PageWaiter(page_driver)
+        try:
+            waiter.element_present(
+                by=self.selectors['blog_item']['selector'], value=self.selectors['blog_item']['value'])
+        except NoSuchElementException:
+            return []
+        waiter.dom_quiet()
+        page_data, _ = self.extract_page_urls(page_driver)
+        return page_data
+
+    @staticmethod
+    def resolve_date_range(time_range_days=None, date_range=None):
+        """Return the (start, end) datetimes to collect. Either bound may be None (open)."""
+        if date_range:
+            return date_range
+        if time_range_days:
+            return datetime.now() - timedelta(days=time_range_days), None
+        return None, None
+
+    @staticmethod
+    def select_posts(page_data, date_range, sorted_by_date=False, checkpoint=None):
+        """
+        Keep the posts of a page that are inside date_range and were not collected before.
+        Returns (posts, stop): stop tells that the following pages cannot hold more posts to collect.
+        """
+        start, end = date_range
+        stop = False
+
+        if start or end:
+            in_range = [
+                post for post in page_data
+                if post["date"] and (start is None or post["date"] >= start) and (end is None or post["date"] <= end)
+            ]
+            has_older = start is not None and any(post["date"] and post["date"] < start for post in page_data)
+            has_newer = end is not None and any(post["date"] and post["date"] > end for post in page_data)
+
+            if sorted_by_date and has_older:
+                # results are sorted newest first, so everything after the first older post is older too
+                stop = True
+            elif not in_range and not has_newer:
+                stop = True
+        else:
+            in_range = page_data
+
+        # Keep only the posts that were not collected by a previous scrape. Only results sorted
+        # by date end at a collected post: in another order, the next pages can hold new posts
+        if checkpoint:
+            new_posts = checkpoint.new_posts(in_range, sorted_by_date=sorted_by_date)
+            if sorted_by_date and len(new_posts) < len(in_range):
+                stop = True
+            in_range = new_posts
+
+        return in_range, stop
+
+    @staticmethod
+    def oldest_date(page_data):
+        dates = [post["date"] for post in page_data if post["date"]]
+        return min(dates) if dates else None
+
+    def find_first_page_in_range(self, load_page, end: datetime):
+        """
+        On results sorted newest first, find the first page holding posts not newer than end,
+        by galloping over page numbers (1, 2, 4, 8, ...) and then binary searching.
+        Returns None when no such page exists.
+        """
+        def reaches_range(page_num):
+            page_data = load_page(page_num)
+            if not page_data:
+                return None  # past the last page
+            oldest = self.oldest_date(page_data)
+            return oldest is None or oldest <= end
+
+        if reaches_range(1):
+            return 1
+
+        # Gallop until a page reaches into the range, or the results end
+        too_new, probe = 1, 2
+        while probe <= self.max_pages:
+            reached = reaches_range(probe)
+            print(f"\n🔎 Probed page {probe}: {'in range' if reached else 'past the results' if reached is None else 'too new'}")
+            if reached is False:
+                too_new, probe = probe, probe * 2
+                continue
+            break
+        upper = min(probe, self.max_pages)
+
+        # Binary search for the first page after too_new that reaches into the range
+        first_page = None
+        low, high = too_new + 1, upper
+        while low <= high:
+            middle = (low + high) // 2
+            reached = reaches_range(middle)
+            if reached:
+                first_page, high = middle, middle - 1
+            elif reached is None:
+                high = middle - 1
+            else:
+                low = middle + 1
+        return first_page
+
+    def open_pages_by_url(self, driver, page_fetcher=None, release_driver=None):
+        """
+        Extract page 1 from the current driver and check that page 2 loads by URL, in the same
+        driver. Returns a PageLoader for the other pages, or None when the pages cannot be fetched
+        by URL, so that the caller falls back to clicking from page 1.
+        The other pages are loaded in pooled drivers: release_driver first returns the current
+        driver to the pool, so that concurrent scrapes sharing the pool cannot take every driver
+        and wait for each other.
+        """
+        base_url = driver.current_url
+        try:
+            build_page_url(self.selectors["page_url_template"], 2, base_url=base_url)
+        except ValueError as e:
+            print(f"⚠️ {e}")
+            return None
+        use_http = page_fetcher is not None and page_fetcher.get_fetch_mode(base_url) == HTTP_MODE
+
+        print("\nScraping Page 1...")
+        page_data, _ = self.extract_page_urls(driver)
+        pages = PageLoader(
+            lambda page_num: self.fetch_page_posts(page_num, base_url, use_http, page_fetcher),
+            first_page=page_data,
+        )
+
+        # Page 2 must load by URL, otherwise the template does not work for this search
+        if page_data:
+            page_two = self.fetch_page_posts(2, base_url, use_http, page_fetcher, driver=driver)
+            if page_two is None:
+                if driver.current_url != base_url:
+                    driver.get(base_url)
+                return None
+            pages.add(2, page_two)
+
+        if release_driver:
+            release_driver()
+        return pages
+
+    def iter_pages_by_url(self, pages, date_range=(None, None), checkpoint=None, sorted_by_date=False):
         """
-       Extracting URLs page-by-page while ensuring that only posts within the time_range_days are collected.
+        Yield the posts of the pages fetched by URL, a batch of pages at a time. The next batch is
+        only fetched once the posts of the previous one were consumed.
+        For a date range on sorted results, the pages before the range are skipped with a galloping search.
         """
-        all_data = []  # Collect valid data across all pages
         page_num = 1
+        end = date_range[1]
+        if sorted_by_date and end:
+            page_num = self.find_first_page_in_range(pages.load, end)
+            if page_num is None:
+                print("\nNo page holds posts in the date range. Stopping scraping.")
+                return
+            print(f"\n🎯 Date range starts on page {page_num}")
+
+        seen_urls = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while page_num <= self.max_pages:
+                if not pages.is_loaded(page_num):
+                    batch = [
+                        n for n in range(page_num, min(page_num + self.concurrency, self.max_pages + 1))
+                        if not pages.is_loaded(n)
+                    ]
+                    print(f"\nScraping Pages {batch[0]}-{batch[-1]} concurrently...")
+                    pages.prefetch(batch, executor)
+
+                page_data = pages.load(page_num)
+                if not page_data:
+                    print(f"\nNo more results after page {page_num - 1}. Stopping scraping.")
+                    break
+
+                posts, stop = self.select_posts(page_data, date_range, sorted_by_date, checkpoint)
+                for post in posts:
+                    if post["url"] not in seen_urls:
+                        seen_urls.add(post["url"])
+                        yield post
+
+                # the posts of this page are no longer needed
+                pages.forget(page_num)
+
+                if stop:
+                    print(f"\nNo more posts to collect after page {page_num}. Stopping scraping.")
+                    break
+
+                page_num += 1
+
+        print(f"\n 🎉 Scraping completed. Total pages loaded: {pages.loaded_count}")
 
-        # Define the time_range_days threshold
-        threshold_date = datetime.now(
-            # 1 day by default
-        ) - timedelta(days=time_range_days) if time_range_days else 1
+    def iter_clicked_pages(self, driver, date_range=(None, None), checkpoint=None, sorted_by_date=False):
+        """Yield the posts of each page, clicking on the next page button of the current driver."""
+        page_num = 1
 
         while True:
             print(f"\nScraping Page {page_num}...")
@@ -162,22 +442,17 @@ class SeleniumExtractPostsTool():
             # Extract data from the current page
             page_data, empty_error = self.extract_page_urls(driver)
 
-            # Filter posts based on time_range_days if provided
-            if time_range_days:
-                page_data = [
-                    post for post in page_data
-                    if post["date"] and post["date"] >= threshold_date
-                ]
+            # Filter posts based on the date range and the checkpoint
+            page_data, stop = self.select_posts(page_data, date_range, sorted_by_date, checkpoint)
+            yield from page_data
 
-                if not page_data:
-                    print(
-                        f"\nNo valid posts found on page {page_num}. Stopping scraping.")
-                    break
-
-            all_data.extend(page_data)
+            if stop:
+                print(
+                    f"\nNo more posts to collect after page {page_num}. Stopping scraping.")
+                break
 
             # Move to the next page
-            success = self.change_page(
+            success, _ = self.change_page(
                 page_num=page_num + 1,
                 driver=driver
             )
@@ -187,6 +462,52 @@ class SeleniumExtractPostsTool():
             page_num += 1
 
         print(f"\n 🎉 Scraping completed. Total pages scraped: {page_num}")
+
+    def iter_posts(self, driver, time_range_days=None, page_fetcher=None, checkpoint=None,
+                   date_range=None, sorted_by_date=False, sort_in_url=False, release_driver=None) -> Iterator[Dict]:
+        """
+       Yield each post within the time_range_days (or the (start, end) date_range) as soon as
+       its page is parsed. Pages are loaded lazily, so a slow consumer holds back the scraping.
+       When the results are sorted by date, stops at the first post older than the range.
+       When the result pages are addressable by URL, they are fetched concurrently, and the pages
+       newer than the date range are skipped.
+       sort_in_url tells that the sort changed the URL of the result page: a sort applied in the
+       page only is lost on the pages opened by URL, so sorted results are then clicked through.
+       With a checkpoint, only yields the new posts, and on results sorted by date stops at the
+       first already collected post.
+       release_driver returns driver to the pool before the pages are fetched by URL; driver must
+       not be used afterwards then.
+        """
+        date_range = self.resolve_date_range(time_range_days, date_range)
+
+        page_url_template = self.selectors.get("page_url_template")
+        # the page URLs are built on the current URL, so they keep a sort that is part of it
+        keeps_sort = bool(page_url_template) and sort_in_url
+        if page_url_template and sorted_by_date and not keeps_sort:
+            print("\n⚠️ The sort is not part of the page URLs. Clicking through the sorted result pages")
+        elif page_url_template:
+            pages = self.open_pages_by_url(driver, page_fetcher=page_fetcher, release_driver=release_driver)
+            if pages is not None:
+                yield from self.iter_pages_by_url(
+                    pages, date_range=date_range, checkpoint=checkpoint, sorted_by_date=sorted_by_date)
+                return
+            print("\n⚠️ Could not fetch the result pages by URL. Falling back to clicking through them")
+
+        yield from self.iter_clicked_pages(
+            driver, date_range=date_range, checkpoint=checkpoint, sorted_by_date=sorted_by_date)
+
+    def aiter_posts(self, driver, max_buffered: int = 20, **kwargs) -> AsyncIterator[Dict]:
+        """Async variant of iter_posts. The pages are scraped in a worker thread, at most
+        max_buffered posts ahead of the consumer."""
+        return aiter_in_thread(self.iter_posts(driver, **kwargs), max_buffered=max_buffered,
+                               executor=get_blocking_executor())
+
+    def __call__(self, driver, time_range_days=None, page_fetcher=None, checkpoint=None,
+                 date_range=None, sorted_by_date=False, sort_in_url=False):
+        """Collect all the posts of iter_posts in a list."""
+        all_data = list(self.iter_posts(
+            driver, time_range_days=time_range_days, page_fetcher=page_fetcher, checkpoint=checkpoint,
+            date_range=date_range, sorted_by_date=sorted_by_date, sort_in_url=sort_in_url))
         print(f"\n Total blogs collected: {len(all_data)}")
 
         return all_data
@@ -194,20 +515,7 @@ class SeleniumExtractPostsTool():
     @staticmethod
     def process_date(date_text):
         """Convert raw date text into a datetime object."""
-        date_regex = re.compile(
-            r"(\d+)\s*天前|(\d+)\s*小時前|(\d{4})年(\d{1,2})月(\d{1,2})日"
-        )
-        match = date_regex.search(date_text)
-        if match:
-            if match.group(1):  # Days ago
-                return datetime.now() - timedelta(days=int(match.group(1)))
-            elif match.group(2):  # Hours ago
-                return datetime.now() - timedelta(hours=int(match.group(2)))
-            elif match.group(3):  # Absolute date
-                year, month, day = int(match.group(3)), int(
-                    match.group(4)), int(match.group(5))
-                return datetime(year, month, day)
-        return None
+        return parse_date(date_text)
 
     @staticmethod
     def close_cookie_banner(driver):
@@ -228,7 +536,9 @@ class SeleniumExtractPostsTool():
             print("🔴 Cookie button detected. Closing it...")
             close_button.click()
 
-            time.sleep(2)  # Wait for the banner to close
+            # Wait for the banner to close
+            PageWaiter(driver, timeout=2).element_gone(
+                "css selector", ".dialog.floating")
 
         except Exception as e:
             print(f"⚠️ Error closing cookie banner: {e}")
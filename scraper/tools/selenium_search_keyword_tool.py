@@ -1,7 +1,9 @@
 from selenium.webdriver.common.keys import Keys
-import time
 from typing import Tuple
 
+from scraper.drivers import PageWaiter
+from utils.metrics import get_metrics
+
 
 
 class SeleniumSearchKeywordTool():
@@ -21,14 +23,19 @@ class SeleniumSearchKeywordTool():
        
             print(f"\n🔎 Starting searching for {keyword} with these selectors: {search_bar_selector}, {search_bar_value}")
             
-            search_bar = self.driver.find_element(
-                by=search_bar_selector, value=search_bar_value)
-            
-            search_bar.send_keys(keyword)
-            # Press "Enter" to submit the search
-            search_bar.send_keys(Keys.RETURN)
-            print("✅ Submitted search")
-            result_page_url = self.driver.current_url
+            with get_metrics().span("tool.search", keyword=keyword):
+                waiter = PageWaiter(self.driver)
+                search_bar = waiter.element_present(
+                    by=search_bar_selector, value=search_bar_value)
+
+                search_bar.send_keys(keyword)
+                # Press "Enter" to submit the search
+                old_url = self.driver.current_url
+                search_bar.send_keys(Keys.RETURN)
+                get_metrics().increment("webdriver_calls", 2, call="send_keys")
+                print("✅ Submitted search")
+                waiter.url_changed(old_url)
+                result_page_url = self.driver.current_url
             return result_page_url, ""
         
         except Exception as e:
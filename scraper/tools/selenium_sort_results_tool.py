@@ -1,7 +1,9 @@
 from selenium.webdriver.common.keys import Keys
-import time
 from typing import Tuple
 
+from scraper.drivers import PageWaiter
+from utils.metrics import get_metrics
+
 
 # This class use Selenium to click on a drop down menu and sort by Date
 
@@ -12,21 +14,20 @@ class SeleniumSortResultsTool():
     def __call__(self, driver):
         """Output the sorted searched page's URL."""
         self.driver = driver
+        waiter = PageWaiter(driver)
         success = False
         # Locate the drop down menu element and click
         try:
             print("\n🔎 Locating the dropdown menu for sorting...")
-            dropdown_menu = self.driver.find_element(
-
+            dropdown_menu = waiter.element_clickable(
                 by=self.selectors['sort_dropdown']['selector'], value=self.selectors['sort_dropdown']['value'])
 
             print("\n 🎉 Located the menu!")
             # open the dropdown menu
             dropdown_menu.click()
+            get_metrics().increment("webdriver_calls", call="click")
             print("\n ✅Clicked")
             
-            time.sleep(1)
-            
         except Exception as e:
             print("Dropdown exception", e)
         
@@ -34,18 +35,20 @@ class SeleniumSortResultsTool():
 
         # Locate the option and click
         try:
-            time.sleep(5)
             print("🔎 Locating the sorting by Date option...")
-            date_sort_option = self.driver.find_element(
+            date_sort_option = waiter.element_clickable(
                 by=self.selectors['sort_date_option']['selector'], value=self.selectors['sort_date_option']['value'])
             
             print("\n 🎉 Located the Date option!")
             # click on the sort option
+            old_url = driver.current_url
+            mutations = waiter.mark_dom()
             date_sort_option.click()
+            get_metrics().increment("webdriver_calls", call="click")
             print("\n ✅Clicked")
 
             # wait to sort the results
-            time.sleep(3)
+            waiter.page_settled(mutations, old_url=old_url)
             success = True
             return success, ""
 
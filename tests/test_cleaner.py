@@ -0,0 +1,43 @@
+from pathlib import Path
+
+import pytest
+
+from benchmarks.bench_html_cleaner import IGNORED_TAG_SETS, content_signature, synthetic_page
+from scraper.html.cleaner import clean_html_bs4, clean_html_lxml
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def result_page(with_doctype: bool) -> str:
+    html = (FIXTURES_DIR / "forum_results.html").read_text(encoding="utf-8")
+    return html if with_doctype else html.split("\n", 1)[1]
+
+
+@pytest.mark.parametrize("with_doctype", [True, False], ids=["doctype", "no_doctype"])
+@pytest.mark.parametrize("ignored_tags", IGNORED_TAG_SETS.values(), ids=IGNORED_TAG_SETS.keys())
+def test_engines_clean_a_result_page_alike(ignored_tags, with_doctype):
+    html = result_page(with_doctype)
+    lxml_output = clean_html_lxml(html, ignored_tags)
+    bs4_output = clean_html_bs4(html, ignored_tags)
+
+    assert content_signature(lxml_output) == content_signature(bs4_output)
+    expected_start = "<!DOCTYPE html><html" if with_doctype else "<html"
+    assert lxml_output.startswith(expected_start + ' lang="zh-Hant-TW"><head>')
+
+
+def test_engines_clean_the_synthetic_page_alike():
+    html = synthetic_page(posts=50)
+    ignored_tags = IGNORED_TAG_SETS["extract"]
+    assert content_signature(clean_html_lxml(html, ignored_tags)) == content_signature(clean_html_bs4(html, ignored_tags))
+
+
+@pytest.mark.parametrize("html", [
+    '<div class="results"><a href="/t?f=1&amp;t=2">post</a><br>3 天前</div>',
+    "<body><input type=checkbox checked name=q><p>text</p></body>",
+    "<!-- results --><ul><li>one</li><li>two</li></ul>",
+])
+def test_lxml_engine_does_not_add_a_doctype_or_document_tags(html):
+    lxml_output = clean_html_lxml(html, ("script",))
+    assert "DOCTYPE" not in lxml_output
+    assert "<html>" not in lxml_output
+    assert content_signature(lxml_output) == content_signature(clean_html_bs4(html, ("script",)))
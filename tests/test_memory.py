@@ -0,0 +1,52 @@
+from scraper.memories.failure_store import FailureStore
+from scraper.memories.memory import Memory, page_fingerprint
+
+
+def result_page(post_ids, keyword):
+    posts = "".join(
+        f'<li id="thread_{post_id}" class="topic thread-{post_id}">'
+        f'<a id="post_{post_id}" href="/topic/{post_id}">{keyword} {post_id}</a>'
+        f'<span class="date">2024-05-0{index % 9 + 1}</span></li>'
+        for index, post_id in enumerate(post_ids)
+    )
+    return f'<html><body><div id="results" class="results"><ul class="topics">{posts}</ul></div></body></html>'
+
+
+def test_result_pages_with_different_post_ids_share_a_fingerprint():
+    first = result_page([123, 98765, 4567], "iphone")
+    second = result_page([222, 31337], "pixel")
+    assert page_fingerprint(first) == page_fingerprint(second)
+
+
+def test_layout_change_changes_the_fingerprint():
+    table_page = '<html><body><table class="topics"><tr><td class="topic">iphone</td></tr></table></body></html>'
+    assert page_fingerprint(result_page([123], "iphone")) != page_fingerprint(table_page)
+
+
+def test_stored_failures_apply_to_later_result_pages(tmp_path):
+    store = FailureStore(tmp_path / "failures.sqlite")
+    candidate = {"blog_item": {"selector": "css selector", "value": "li.post"}}
+
+    memory = Memory(store=store)
+    memory.bind("https://forum.example.com", "extract")
+    memory.observe_page(result_page([123, 456], "iphone"))
+    memory.record_failure(candidate, "Message: no such element: Unable to locate element")
+
+    later = Memory(store=store)
+    later.bind("https://forum.example.com", "extract")
+    later.observe_page(result_page([789, 1011], "pixel"))
+    assert later.known_failure(candidate) == "NoSuchElementException"
+
+
+def test_transient_failures_are_not_stored(tmp_path):
+    store = FailureStore(tmp_path / "failures.sqlite")
+    candidate = {"blog_item": {"selector": "css selector", "value": "li.topic"}}
+
+    memory = Memory(store=store)
+    memory.bind("https://forum.example.com", "extract")
+    memory.record_failure(candidate, "Message: timed out waiting for the page")
+    assert memory.known_failure(candidate) == "TimeoutException"
+
+    later = Memory(store=store)
+    later.bind("https://forum.example.com", "extract")
+    assert later.known_failure(candidate) is None
@@ -1 +1,3 @@
-from .openai_llm import OpenAILLM
\ No newline at end of file
+from .openai_llm import OpenAILLM
+from .response_cache import LLMResponseCache, get_response_cache
+from .llm_client import LLMClient, LLMClientError, RetryPolicy, TokenBucketLimiter, get_llm_client
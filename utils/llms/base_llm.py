@@ -1,4 +1,7 @@
+import asyncio
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
 from token_count import TokenCount
 
 
@@ -12,6 +15,24 @@ class BaseLLM(ABC):
     def __call__(self, system_prompt: str, user_prompt: str) -> str:
         raise NotImplementedError
 
+    async def acall(self, system_prompt: str, user_prompt: str) -> str:
+        """Awaitable call. Runs the blocking call in a thread unless a subclass has a native async client."""
+        return await asyncio.to_thread(self, system_prompt, user_prompt)
+
+    def batch(self, prompts: List[Tuple[str, str]], concurrency: int = 8) -> List:
+        """Answer (system_prompt, user_prompt) pairs concurrently, in order."""
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(lambda prompt: self(*prompt), prompts))
+
+    async def abatch(self, prompts: List[Tuple[str, str]], concurrency: int = 8) -> List:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call(system_prompt, user_prompt):
+            async with semaphore:
+                return await self.acall(system_prompt, user_prompt)
+
+        return await asyncio.gather(*(call(*prompt) for prompt in prompts))
+
     def get_text_token(self, text: str) -> int:
-        tokens = self.tc.num_tokens_from_string(text)
+        tokens = self.token_counter.num_tokens_from_string(text)
         return tokens
\ No newline at end of file
@@ -0,0 +1,372 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Tuple
+
+import httpx
+
+from utils.metrics import get_metrics
+
+"""
+HTTP client layer for OpenAI-compatible chat completion APIs, used by OpenAILLM.
+
+- One shared connection pool (sync and async httpx clients) per base URL and API key.
+- A token-bucket limiter for requests per minute and tokens per minute, shared by all
+  the threads and coroutines using the client, so bursts queue up instead of hitting 429s.
+- Retries with exponential backoff and full jitter on 429, 5xx, timeouts and connection
+  errors, honoring Retry-After.
+- Optional hedged requests: when a call has not answered after hedge_after seconds, a
+  second identical call is sent and the first answer wins, which cuts the tail latency.
+  The hedge takes its own rate limit capacity, and is not sent when none is left.
+- Batched calls (batch / abatch) with bounded concurrency.
+
+Point base_url at utils/llms/stub_server.py to run it without the real API.
+Rate limits default to the LLM_REQUESTS_PER_MINUTE and LLM_TOKENS_PER_MINUTE variables.
+"""
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _env_float(name: str) -> float | None:
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+class LLMClientError(Exception):
+    """A request failed with a non-retryable error, or ran out of retries."""
+
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def estimate_request_tokens(request: Dict) -> int:
+    """Prompt tokens (about four characters each) plus the completion budget."""
+    characters = sum(len(message.get("content") or "") for message in request.get("messages", []))
+    return characters // 4 + request.get("max_tokens", 1000)
+
+
+class TokenBucketLimiter:
+    """Limits requests per minute and tokens per minute. A call reserves its capacity up front
+    and waits until the buckets have refilled enough; unused tokens are given back afterwards."""
+
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_level = requests_per_minute or 0
+        self._token_level = tokens_per_minute or 0
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed_minutes = (now - self._updated_at) / 60
+        self._updated_at = now
+        if self.requests_per_minute:
+            self._request_level = min(
+                self.requests_per_minute, self._request_level + elapsed_minutes * self.requests_per_minute)
+        if self.tokens_per_minute:
+            self._token_level = min(
+                self.tokens_per_minute, self._token_level + elapsed_minutes * self.tokens_per_minute)
+
+    def _bucket_tokens(self, tokens: int) -> int:
+        # a request larger than the whole bucket must still pass eventually
+        return min(tokens, self.tokens_per_minute) if self.tokens_per_minute else 0
+
+    def reserve(self, tokens: int) -> Tuple[float, int]:
+        """Take the capacity for one request. Returns how many seconds to wait before sending it,
+        and the tokens taken from the bucket."""
+        with self._lock:
+            self._refill(time.monotonic())
+            wait_seconds = 0.0
+            taken = self._bucket_tokens(tokens)
+            if self.requests_per_minute:
+                self._request_level -= 1
+                if self._request_level < 0:
+                    wait_seconds = max(wait_seconds, -self._request_level / self.requests_per_minute * 60)
+            if self.tokens_per_minute:
+                self._token_level -= taken
+                if self._token_level < 0:
+                    wait_seconds = max(wait_seconds, -self._token_level / self.tokens_per_minute * 60)
+            return wait_seconds, taken
+
+    def try_reserve(self, tokens: int) -> bool:
+        """Take the capacity for one request only when it is available right away."""
+        with self._lock:
+            self._refill(time.monotonic())
+            taken = self._bucket_tokens(tokens)
+            if self.requests_per_minute and self._request_level < 1:
+                return False
+            if self.tokens_per_minute and self._token_level < taken:
+                return False
+            if self.requests_per_minute:
+                self._request_level -= 1
+            self._token_level -= taken
+            return True
+
+    def release_tokens(self, tokens: int):
+        """Give back the reserved tokens a request did not use (or take more when it used more)."""
+        if not self.tokens_per_minute:
+            return
+        with self._lock:
+            self._token_level = min(self.tokens_per_minute, self._token_level + tokens)
+
+    def acquire(self, tokens: int) -> int:
+        """Wait for the capacity of one request. Returns the tokens taken from the bucket."""
+        wait_seconds, taken = self.reserve(tokens)
+        if wait_seconds:
+            get_metrics().observe("llm_rate_limit_wait_seconds", wait_seconds)
+            time.sleep(wait_seconds)
+        return taken
+
+    async def aacquire(self, tokens: int) -> int:
+        wait_seconds, taken = self.reserve(tokens)
+        if wait_seconds:
+            get_metrics().observe("llm_rate_limit_wait_seconds", wait_seconds)
+            await asyncio.sleep(wait_seconds)
+        return taken
+
+
+class RetryPolicy:
+    def __init__(self, max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 20):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: str = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_delay)
+            except ValueError:
+                pass
+        # exponential backoff with full jitter
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class LLMClient:
+    def __init__(
+        self,
+        base_url: str = None,
+        api_key: str = None,
+        timeout: float = 60,
+        max_connections: int = 20,
+        requests_per_minute: float = None,
+        tokens_per_minute: float = None,
+        retry_policy: RetryPolicy = None,
+        hedge_after: float = None,
+        batch_concurrency: int = 8,
+    ):
+        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY")
+        self.timeout = httpx.Timeout(timeout, connect=10)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.limiter = TokenBucketLimiter(
+            requests_per_minute if requests_per_minute is not None else _env_float("LLM_REQUESTS_PER_MINUTE"),
+            tokens_per_minute if tokens_per_minute is not None else _env_float("LLM_TOKENS_PER_MINUTE"),
+        )
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.hedge_after = hedge_after
+        self.batch_concurrency = batch_concurrency
+
+        self._client = None
+        # dropped with their event loop, e.g. at the end of each asyncio.run
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._hedge_executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def headers(self) -> Dict:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def _sync_client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(
+                    base_url=self.base_url, headers=self.headers, timeout=self.timeout, limits=self.limits)
+            return self._client
+
+    def _async_client(self) -> httpx.AsyncClient:
+        # an async client is bound to the event loop it was first used on
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None or client.is_closed:
+                client = self._async_clients[loop] = httpx.AsyncClient(
+                    base_url=self.base_url, headers=self.headers, timeout=self.timeout, limits=self.limits)
+            return client
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, LLMClientError):
+            return error.status_code in RETRY_STATUS_CODES
+        return isinstance(error, (httpx.TimeoutException, httpx.TransportError))
+
+    @staticmethod
+    def _read_response(response: httpx.Response) -> Dict:
+        if response.status_code >= 400:
+            error = LLMClientError(
+                f"LLM request failed with status {response.status_code}: {response.text[:300]}",
+                status_code=response.status_code,
+            )
+            error.retry_after = response.headers.get("retry-after")
+            raise error
+        return response.json()
+
+    def _settle_tokens(self, taken: int, body: Dict):
+        """Give back the tokens taken from the bucket that the request did not use."""
+        used = body.get("usage", {}).get("total_tokens")
+        if used is not None and taken:
+            self.limiter.release_tokens(taken - used)
+
+    def _reserve_hedge(self, tokens: int) -> bool:
+        if self.limiter.try_reserve(tokens):
+            get_metrics().increment("llm_hedged_requests")
+            return True
+        get_metrics().increment("llm_hedges_skipped")
+        return False
+
+    # sync calls
+
+    def _post(self, request: Dict) -> Dict:
+        response = self._sync_client().post("/chat/completions", json=request)
+        return self._read_response(response)
+
+    def _hedged_post(self, request: Dict, tokens: int) -> Dict:
+        if not self.hedge_after:
+            return self._post(request)
+
+        with self._lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+        futures = [self._hedge_executor.submit(self._post, request)]
+        done, _ = wait(futures, timeout=self.hedge_after)
+        if not done and self._reserve_hedge(tokens):
+            futures.append(self._hedge_executor.submit(self._post, request))
+
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    error = e
+        raise error
+
+    def chat(self, request: Dict) -> Dict:
+        """POST /chat/completions and return the response body, with rate limiting and retries."""
+        tokens = estimate_request_tokens(request)
+        for attempt in range(self.retry_policy.max_retries + 1):
+            taken = self.limiter.acquire(tokens)
+            try:
+                body = self._hedged_post(request, tokens)
+                self._settle_tokens(taken, body)
+                return body
+            except Exception as e:
+                if not self._is_retryable(e) or attempt == self.retry_policy.max_retries:
+                    raise
+                delay = self.retry_policy.delay(attempt, getattr(e, "retry_after", None))
+                get_metrics().increment("llm_retries", status=getattr(e, "status_code", None) or type(e).__name__)
+                print(f"⚠️ LLM request failed ({e}). Retrying in {delay:.1f}s...")
+                time.sleep(delay)
+
+    def batch(self, requests: List[Dict], concurrency: int = None) -> List[Dict | Exception]:
+        """Send the requests concurrently. Failed requests return their exception, in place."""
+        def call(request):
+            try:
+                return self.chat(request)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=concurrency or self.batch_concurrency) as executor:
+            return list(executor.map(call, requests))
+
+    # async calls
+
+    async def _apost(self, request: Dict) -> Dict:
+        response = await self._async_client().post("/chat/completions", json=request)
+        return self._read_response(response)
+
+    async def _ahedged_post(self, request: Dict, tokens: int) -> Dict:
+        if not self.hedge_after:
+            return await self._apost(request)
+
+        tasks = [asyncio.ensure_future(self._apost(request))]
+        done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+        if not done and self._reserve_hedge(tokens):
+            tasks.append(asyncio.ensure_future(self._apost(request)))
+
+        pending = set(tasks)
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def achat(self, request: Dict) -> Dict:
+        tokens = estimate_request_tokens(request)
+        for attempt in range(self.retry_policy.max_retries + 1):
+            taken = await self.limiter.aacquire(tokens)
+            try:
+                body = await self._ahedged_post(request, tokens)
+                self._settle_tokens(taken, body)
+                return body
+            except Exception as e:
+                if not self._is_retryable(e) or attempt == self.retry_policy.max_retries:
+                    raise
+                delay = self.retry_policy.delay(attempt, getattr(e, "retry_after", None))
+                get_metrics().increment("llm_retries", status=getattr(e, "status_code", None) or type(e).__name__)
+                print(f"⚠️ LLM request failed ({e}). Retrying in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+
+    async def abatch(self, requests: List[Dict], concurrency: int = None) -> List[Dict | Exception]:
+        semaphore = asyncio.Semaphore(concurrency or self.batch_concurrency)
+
+        async def call(request):
+            async with semaphore:
+                try:
+                    return await self.achat(request)
+                except Exception as e:
+                    return e
+
+        return await asyncio.gather(*(call(request) for request in requests))
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+            if self._hedge_executor is not None:
+                self._hedge_executor.shutdown(wait=False)
+                self._hedge_executor = None
+
+
+_shared_clients = {}
+_shared_clients_lock = threading.Lock()
+
+
+def get_llm_client(base_url: str = None, api_key: str = None, **client_kwargs) -> LLMClient:
+    """One client, i.e. one connection pool and one rate limiter, per base URL and API key.
+    Keyword arguments only take effect when the client is created."""
+    base_url = (base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+    api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY")
+    with _shared_clients_lock:
+        key = (base_url, api_key)
+        if key not in _shared_clients:
+            _shared_clients[key] = LLMClient(base_url=base_url, api_key=api_key, **client_kwargs)
+        return _shared_clients[key]
@@ -1,24 +1,33 @@
-from openai import OpenAI
 import json
 from dotenv import load_dotenv
 import os
 
+from utils.metrics import get_metrics
 from .base_llm import BaseLLM
+from .llm_client import LLMClient, get_llm_client
+from .response_cache import LLMResponseCache, get_response_cache, make_cache_key
 
 load_dotenv()
 
 
 class OpenAILLM(BaseLLM):
     def __init__(
-        self, model_name: str = "gpt-4o", temperature: float = 0.1, pydantic_format=None
+        self, model_name: str = "gpt-4o", temperature: float = 0.1, pydantic_format=None,
+        cache: bool | LLMResponseCache = None, client: LLMClient = None, base_url: str = None
     ):
         super().__init__(model_name=model_name, temperature=temperature)
         self.model_name = model_name
         self.pydantic_format = pydantic_format
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # shared connection pool, rate limiter and retries per API endpoint (see llm_client.py)
+        self.client = client or get_llm_client(base_url=base_url, api_key=os.getenv("OPENAI_API_KEY"))
 
-    def __call__(self, system_prompt: str, user_prompt: str) -> str:
-        response = self.client.chat.completions.create(
+        # opt-in response cache: cache=True, an LLMResponseCache, or the LLM_RESPONSE_CACHE variable
+        if cache is None:
+            cache = bool(os.getenv("LLM_RESPONSE_CACHE"))
+        self.cache = get_response_cache() if cache is True else (cache or None)
+
+    def _request_kwargs(self, system_prompt: str, user_prompt: str) -> dict:
+        return dict(
             model=self.model_name,
             temperature=self.temperature,
             response_format={"type": "json_object"},
@@ -27,7 +36,61 @@ class OpenAILLM(BaseLLM):
                 {"role": "user", "content": user_prompt},
             ],
         )
-        response_string = response.choices[0].message.content
-        response_dict = json.loads(response_string)
+
+    def _cache_key(self, request_kwargs: dict) -> str:
+        return make_cache_key(
+            model_name=request_kwargs["model"],
+            temperature=request_kwargs["temperature"],
+            response_format=request_kwargs["response_format"],
+            system_prompt=request_kwargs["messages"][0]["content"],
+            user_prompt=request_kwargs["messages"][1]["content"],
+        )
+
+    def _record_cache(self, span, response_string: str | None):
+        if self.cache:
+            hit = response_string is not None
+            get_metrics().increment("llm_cache_lookups", model=self.model_name, result="hit" if hit else "miss")
+            span.set(cache_hit=hit)
+
+    def _record_usage(self, span, response: dict):
+        """Count the prompt and completion tokens reported by the API."""
+        usage = response.get("usage") or {}
+        metrics = get_metrics()
+        for kind in ("prompt_tokens", "completion_tokens"):
+            if usage.get(kind) is not None:
+                metrics.increment("llm_tokens", usage[kind], model=self.model_name, kind=kind.split("_")[0])
+        span.set(prompt_tokens=usage.get("prompt_tokens"), completion_tokens=usage.get("completion_tokens"))
+
+    def __call__(self, system_prompt: str, user_prompt: str) -> str:
+        request_kwargs = self._request_kwargs(system_prompt, user_prompt)
+        with get_metrics().span("llm.call", model=self.model_name) as span:
+            cache_key = self._cache_key(request_kwargs) if self.cache else None
+            response_string = self.cache.get(cache_key) if self.cache else None
+            self._record_cache(span, response_string)
+
+            if response_string is None:
+                response = self.client.chat(request_kwargs)
+                self._record_usage(span, response)
+                response_string = response["choices"][0]["message"]["content"]
+                if self.cache:
+                    self.cache.put(cache_key, self.model_name, response_string)
+            response_dict = json.loads(response_string)
+
+        return response_dict
+
+    async def acall(self, system_prompt: str, user_prompt: str) -> str:
+        request_kwargs = self._request_kwargs(system_prompt, user_prompt)
+        with get_metrics().span("llm.call", model=self.model_name) as span:
+            cache_key = self._cache_key(request_kwargs) if self.cache else None
+            response_string = self.cache.get(cache_key) if self.cache else None
+            self._record_cache(span, response_string)
+
+            if response_string is None:
+                response = await self.client.achat(request_kwargs)
+                self._record_usage(span, response)
+                response_string = response["choices"][0]["message"]["content"]
+                if self.cache:
+                    self.cache.put(cache_key, self.model_name, response_string)
+            response_dict = json.loads(response_string)
 
         return response_dict
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict
+
+"""
+Opt-in persistent cache of LLM responses, addressed by the content of the request:
+the key hashes the model, temperature, response format and both prompts, so a repeated
+request (re-inspecting an unchanged website, re-running a benchmark) is answered from
+disk without calling the API.
+
+Responses live in a SQLite database (WAL mode), which is safe to share between threads
+and processes. Above max_size_mb, the least recently used responses are evicted.
+
+Enable it with OpenAILLM(cache=True), by passing an LLMResponseCache, or for every
+OpenAILLM with the LLM_RESPONSE_CACHE environment variable set to a database path.
+"""
+
+DEFAULT_CACHE_PATH = Path(__file__).parent / "cache" / "responses.sqlite"
+
+
+def make_cache_key(model_name: str, temperature: float, response_format: Dict,
+                   system_prompt: str, user_prompt: str) -> str:
+    prompt_hash = hashlib.sha256(f"{system_prompt}\x00{user_prompt}".encode("utf-8")).hexdigest()
+    request = json.dumps(
+        {"model": model_name, "temperature": temperature, "response_format": response_format,
+         "prompt": prompt_hash},
+        sort_keys=True,
+    )
+    return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    def __init__(self, path: str | Path = None, max_size_mb: float = 100):
+        self.path = Path(path) if path else DEFAULT_CACHE_PATH
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL
+                )""")
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # one connection per thread; SQLite serializes the writers across threads and processes
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, key: str) -> str | None:
+        connection = self._connection()
+        row = connection.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+
+        with connection:
+            connection.execute("UPDATE responses SET last_used_at = ? WHERE key = ?", (time.time(), key))
+        self._count("hits")
+        return row[0]
+
+    def put(self, key: str, model_name: str, response: str):
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name, response, len(response.encode("utf-8")), now, now),
+            )
+        self._evict()
+
+    def _evict(self):
+        connection = self._connection()
+        with connection:
+            total_size = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total_size <= self.max_size_bytes:
+                return
+
+            # evict down to 90% of the limit, so that eviction does not run on every put
+            target_size = self.max_size_bytes * 0.9
+            evicted_keys = []
+            for key, size in connection.execute("SELECT key, size FROM responses ORDER BY last_used_at"):
+                if total_size <= target_size:
+                    break
+                evicted_keys.append((key,))
+                total_size -= size
+            connection.executemany("DELETE FROM responses WHERE key = ?", evicted_keys)
+
+        with self._stats_lock:
+            self.evictions += len(evicted_keys)
+
+    def clear(self):
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict:
+        entries, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "size_mb": round(size / (1024 * 1024), 3),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+_shared_caches = {}
+_shared_caches_lock = threading.Lock()
+
+
+def get_response_cache(path: str | Path = None, **cache_kwargs) -> LLMResponseCache:
+    """One cache per database path in the process, so that its statistics are shared."""
+    path = Path(path or os.getenv("LLM_RESPONSE_CACHE") or DEFAULT_CACHE_PATH).resolve()
+    with _shared_caches_lock:
+        if path not in _shared_caches:
+            _shared_caches[path] = LLMResponseCache(path, **cache_kwargs)
+        return _shared_caches[path]
@@ -0,0 +1,140 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List
+
+"""
+A local stub of the OpenAI chat completions endpoint, to run the LLM client layer
+(llm_client.py) and OpenAILLM without the real API, e.g. in benchmarks:
+
+    with StubLLMServer(latency=0.2, failures=[429, 500]) as server:
+        llm = OpenAILLM(base_url=server.url)
+
+By default it answers {"echo": <user prompt>} as the JSON content of the message.
+failures is a list of status codes returned by the first requests, in order;
+slow_every makes every n-th request take slow_latency, to exercise hedged requests.
+It can also run on its own: python -m utils.llms.stub_server --port 8765
+"""
+
+
+def echo_responder(request: Dict) -> Dict:
+    user_messages = [m["content"] for m in request.get("messages", []) if m.get("role") == "user"]
+    return {"echo": user_messages[-1] if user_messages else None}
+
+
+class StubLLMServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        responder: Callable[[Dict], Dict] = echo_responder,
+        latency: float = 0.0,
+        failures: List[int] = None,
+        slow_every: int = 0,
+        slow_latency: float = 2.0,
+    ):
+        self.responder = responder
+        self.latency = latency
+        self.failures = list(failures or [])
+        self.slow_every = slow_every
+        self.slow_latency = slow_latency
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: Dict, headers: Dict = None):
+                payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                if not self.path.endswith("/chat/completions"):
+                    self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with stub._lock:
+                    stub.requests.append(request)
+                    number = len(stub.requests)
+                    failure = stub.failures.pop(0) if stub.failures else None
+
+                if failure:
+                    self._send(failure, {"error": {"message": f"stub failure {failure}"}},
+                               headers={"Retry-After": "0"} if failure == 429 else None)
+                    return
+
+                slow = stub.slow_every and number % stub.slow_every == 0
+                time.sleep(stub.slow_latency if slow else stub.latency)
+
+                content = json.dumps(stub.responder(request), ensure_ascii=False)
+                prompt_tokens = sum(len(m.get("content") or "") for m in request.get("messages", [])) // 4
+                completion_tokens = len(content) // 4
+                self._send(200, {
+                    "id": f"stub-{number}",
+                    "object": "chat.completion",
+                    "model": request.get("model"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                })
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubLLMServer(port=args.port, latency=args.latency)
+    print(f"Stub LLM server listening on {server.url}")
+    server._server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
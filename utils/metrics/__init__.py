@@ -0,0 +1,2 @@
+from .registry import MetricsRegistry, Span, get_metrics
+from .server import MetricsServer
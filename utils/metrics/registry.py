@@ -0,0 +1,239 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+"""
+In-process metrics and tracing of the scrapes, shared by MarketScraper, the agents, the
+Selenium tools, the driver pool and the LLM layer:
+
+- span(name, **attributes): a timed block of work. Spans nest (a page load inside a search
+  inside a scrape) and share the trace id of their root span; the wall time of each span
+  name is also aggregated in the span_seconds observation.
+- increment(name, value, **labels): counters, e.g. pages loaded, posts, WebDriver calls,
+  retries, cache hits and LLM tokens.
+- observe(name, value, **labels): count, sum and max of a measure, e.g. the browser RSS.
+
+Finished spans, and snapshots of the counters and observations, are appended as JSON lines
+to the file in the METRICS_JSONL environment variable (or given to configure). The
+counters and observations are served in the Prometheus text format by MetricsServer
+(server.py), started on the port in the METRICS_PORT variable.
+"""
+
+PROMETHEUS_PREFIX = "scraper_"
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _label_key(name: str, labels: Dict) -> LabelKey:
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels) + "}"
+
+
+class Span:
+    """A timed block of work. Attributes can be added while it runs with set()."""
+
+    def __init__(self, name: str, attributes: Dict, parent: "Span" = None):
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:16]
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.seconds = None
+        self.status = "ok"
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self, error: BaseException = None):
+        self.seconds = time.perf_counter() - self._start
+        if error is not None and not isinstance(error, GeneratorExit):
+            self.status = "error"
+            self.error = f"{type(error).__name__}: {str(error).splitlines()[0] if str(error) else ''}"[:200]
+
+    def to_record(self) -> Dict:
+        return {
+            "type": "span",
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "started_at": self.started_at,
+            "duration_ms": round(self.seconds * 1000, 2),
+            "status": self.status,
+            "error": self.error,
+            "thread": threading.current_thread().name,
+            "attributes": self.attributes,
+        }
+
+
+class MetricsRegistry:
+    def __init__(self, jsonl_path: str | Path = None):
+        self._counters: Dict[LabelKey, float] = {}
+        # observation -> [count, sum, max]
+        self._observations: Dict[LabelKey, list] = {}
+        self._lock = threading.Lock()
+        self._jsonl_file = None
+        self._jsonl_lock = threading.Lock()
+        self.jsonl_path = None
+        if jsonl_path:
+            self.configure(jsonl_path=jsonl_path)
+
+    def configure(self, jsonl_path: str | Path = None):
+        """Append the spans and snapshots to jsonl_path from now on (None stops writing them)."""
+        with self._jsonl_lock:
+            if self._jsonl_file:
+                self._jsonl_file.close()
+                self._jsonl_file = None
+            self.jsonl_path = Path(jsonl_path) if jsonl_path else None
+            if self.jsonl_path:
+                self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+                self._jsonl_file = open(self.jsonl_path, "a", encoding="utf-8", buffering=1)
+
+    def _write(self, record: Dict):
+        if self._jsonl_file is None:
+            return
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._jsonl_lock:
+            if self._jsonl_file:
+                self._jsonl_file.write(line + "\n")
+
+    # counters and observations
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = _label_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _label_key(name, labels)
+        with self._lock:
+            observation = self._observations.get(key)
+            if observation is None:
+                self._observations[key] = [1, value, value]
+            else:
+                observation[0] += 1
+                observation[1] += value
+                observation[2] = max(observation[2], value)
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(_label_key(name, labels), 0)
+
+    # spans
+
+    @staticmethod
+    def current_span() -> Span | None:
+        return _current_span.get()
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """Time the block as a child of the current span of the thread (or coroutine)."""
+        span = Span(name, attributes, parent=_current_span.get())
+        token = _current_span.set(span)
+        error = None
+        try:
+            yield span
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # a generator closed in another context than the one it started in
+                pass
+            span.finish(error)
+            self.observe("span_seconds", span.seconds, span=name)
+            if span.status == "error":
+                self.increment("span_errors", span=name)
+            self._write(span.to_record())
+
+    # exports
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            observations = [{"name": name, "labels": dict(labels), "count": count, "sum": total, "max": maximum}
+                            for (name, labels), (count, total, maximum) in sorted(self._observations.items())]
+        return {"counters": counters, "observations": observations}
+
+    def write_snapshot(self, **attributes):
+        """Append the current counters and observations to the JSON lines file, e.g. after a scrape."""
+        self._write({"type": "metrics", "at": time.time(), "attributes": attributes, **self.snapshot()})
+
+    def render_prometheus(self) -> str:
+        """Counters and observations in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            observations = sorted(self._observations.items())
+
+        lines, typed = [], set()
+        for (name, labels), value in counters:
+            metric = f"{PROMETHEUS_PREFIX}{name}_total"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+        # the samples of a metric family must be grouped, so the maxima follow each summary
+        families = {}
+        for (name, labels), observation in observations:
+            families.setdefault(name, []).append((labels, observation))
+        for name, samples in families.items():
+            metric = f"{PROMETHEUS_PREFIX}{name}"
+            lines.append(f"# TYPE {metric} summary")
+            for labels, (count, total, _) in samples:
+                lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+                lines.append(f"{metric}_sum{_format_labels(labels)} {total}")
+            lines.append(f"# TYPE {metric}_max gauge")
+            for labels, (_, _, maximum) in samples:
+                lines.append(f"{metric}_max{_format_labels(labels)} {maximum}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._observations.clear()
+
+    def close(self):
+        self.configure(jsonl_path=None)
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Process-wide registry. On first use, writes to METRICS_JSONL and serves METRICS_PORT when set."""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = MetricsRegistry(jsonl_path=os.getenv("METRICS_JSONL"))
+            if os.getenv("METRICS_PORT"):
+                from .server import MetricsServer
+                try:
+                    MetricsServer(_default_registry, port=int(os.getenv("METRICS_PORT"))).start()
+                except OSError as e:
+                    print(f"⚠️ Could not start the metrics endpoint: {e}")
+        return _default_registry
@@ -0,0 +1,66 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .registry import MetricsRegistry, get_metrics
+
+"""
+HTTP endpoint serving the metrics of a registry (registry.py) in the Prometheus text format,
+for a scraper process or a batch of scrapes to be scraped in turn:
+
+    MetricsServer(get_metrics(), port=9108).start()
+
+GET /metrics returns the counters and observations; any other path returns 404.
+get_metrics starts it on its own when the METRICS_PORT variable is set.
+"""
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsServer:
+    def __init__(self, registry: MetricsRegistry = None, host: str = "127.0.0.1", port: int = 9108):
+        self.registry = registry or get_metrics()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                payload = server.registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="metrics-server")
+        self._thread.start()
+        print(f"📈 Serving metrics on {self.url}")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+